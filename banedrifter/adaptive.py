@@ -0,0 +1,252 @@
+###################################################
+# imports
+
+import sys
+import numpy as np
+import banedrifter as bd
+import sweep as sw
+
+###################################################
+# confidence intervals
+
+def wilson_interval(wins,games,z=1.96):
+    """
+    Wilson score interval for a win rate, elementwise.  Cells without any
+    games get the whole [0, 1] interval.
+    """
+
+    wins = np.asarray(wins,dtype=float)
+    games = np.asarray(games,dtype=float)
+    n = np.maximum(games,1.0)
+    p = wins/n
+    center = (p + z*z/(2*n))/(1 + z*z/n)
+    halfwidth = z*np.sqrt(p*(1-p)/n + z*z/(4*n*n))/(1 + z*z/n)
+    low = np.where(games > 0,np.clip(center-halfwidth,0.0,1.0),0.0)
+    high = np.where(games > 0,np.clip(center+halfwidth,0.0,1.0),1.0)
+    return low, high
+
+def interval(counts,z=1.96):
+    """
+    Win rate and Wilson interval of the first deck, from outcome counts.
+    """
+
+    counts = np.asarray(counts)
+    wins = counts[...,sw.i_p1_life] + counts[...,sw.i_p1_mill]
+    games = counts.sum(axis=-1)
+    low, high = wilson_interval(wins,games,z=z)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        rate = wins/games
+    return rate, low, high
+
+###################################################
+# a single matchup
+
+def adaptive_matchup(deck1,deck2,halfwidth=0.01,batchsize=200,max_games=10000,z=1.96,rulesets=None,engine='batch',rng=None):
+    """
+    Play games between two decks in batches of batchsize (half with each deck
+    going first) until the win rate's confidence interval is no wider than
+    plus or minus halfwidth, or max_games have been played.  Returns the
+    outcome counts.
+    """
+
+    counts = np.zeros(len(sw.outcomes),dtype=np.int64)
+    while counts.sum() < max_games:
+        N = min(batchsize,max_games-counts.sum())
+        counts += sw.play_matchups([deck1],[deck2],N,rulesets=rulesets,engine=engine,rng=rng)[0]
+        rate, low, high = interval(counts,z=z)
+        if (high-low)/2 <= halfwidth:
+            break
+    return counts
+
+###################################################
+# a whole grid
+
+def priorities(counts,halfwidth=0.01,z=1.96,mirrors=False):
+    """
+    How much each matchup cell would benefit from more games.  Cells that
+    are already precise enough get zero; the others are ranked by how far
+    their interval is from the target, boosted when the interval still
+    straddles 50% or when the cell can still change which deck has the
+    highest average (HAWR) or highest minimum (HMWR) win rate.  If mirrors
+    is set, the diagonal is a grid of mirror matchups and is exactly 50%.
+    """
+
+    rate, low, high = interval(counts,z=z)
+    if mirrors:
+        np.fill_diagonal(rate,0.5)
+        np.fill_diagonal(low,0.5)
+        np.fill_diagonal(high,0.5)
+    excess = np.maximum((high-low)/2/halfwidth - 1.0,0.0)
+
+    # matchups that could still go either way
+    undecided = (low < 0.5) & (high > 0.5)
+
+    # decks that could still have the highest average win rate
+    mean_low = low.mean(axis=1)
+    mean_high = high.mean(axis=1)
+    hawr = (mean_high >= mean_low.max())[:,None]
+
+    # cells that could still be the minimum of a deck that could still have the highest minimum win rate
+    min_low = low.min(axis=1)
+    min_high = high.min(axis=1)
+    hmwr = (min_high >= min_low.max())[:,None] & (low <= min_high[:,None])
+
+    return excess*(1.0 + undecided + hawr + 2.0*hmwr)
+
+def adaptive_sweep(deck_specs_1,deck_specs_2,budget=None,halfwidth=0.01,batchsize=200,min_games=200,max_games=10000,roundgames=200000,z=1.96,rulesets=None,engine='batch',rng=None,verbose=True):
+    """
+    Sweep a matchup grid with sequential sampling.  Every cell first gets
+    min_games games; after that, each round spends about roundgames games on
+    the cells with the highest priority, batchsize games at a time, until
+    every cell is precise enough, has max_games games, or the total budget
+    of games runs out.  Returns the outcome counts, of shape
+    (len(deck_specs_1), len(deck_specs_2), 5).
+
+    A symmetric grid (the same decks on both sides) only plays one of each
+    (i, j) and (j, i) pair and fills in the other with the seat-swapped
+    counts; mirror matchups are exactly even and are left empty, as in
+    sweep.winrate with mirrors set.
+    """
+
+    deck_specs_1 = np.atleast_2d(np.asarray(deck_specs_1,dtype=np.int64))
+    deck_specs_2 = np.atleast_2d(np.asarray(deck_specs_2,dtype=np.int64))
+    if rng is None:
+        rng = bd.rng
+    shape = (len(deck_specs_1),len(deck_specs_2))
+    symmetric = (deck_specs_1.shape == deck_specs_2.shape) and (deck_specs_1 == deck_specs_2).all()
+    if symmetric:
+        i, j = sw.symmetric_cells(shape[0]).T
+    else:
+        i, j = np.meshgrid(np.arange(shape[0]),np.arange(shape[1]),indexing='ij')
+        i = i.ravel()
+        j = j.ravel()
+
+    # the played cells' counts as a whole grid
+    def grid(counts):
+        full = np.zeros(shape+(len(sw.outcomes),),dtype=counts.dtype)
+        full[i,j] = counts
+        if symmetric:
+            full[j,i] = sw.swap_seats(counts)
+        return full
+
+    if budget is None:
+        budget = max_games*len(i)
+
+    # a first look at every cell
+    counts = sw.play_matchups(deck_specs_1[i],deck_specs_2[j],min_games,rulesets=rulesets,engine=engine,rng=rng)
+    spent = min_games*len(i)
+
+    while spent + batchsize <= budget:
+
+        # pick the cells that most need more games, and that are still allowed some
+        # (a pair of cells is as urgent as the more urgent of the two)
+        priority = priorities(grid(counts),halfwidth=halfwidth,z=z,mirrors=symmetric)
+        priority = np.maximum(priority[i,j],priority[j,i]) if symmetric else priority[i,j]
+        priority[counts.sum(axis=-1) + batchsize > max_games] = 0.0
+        N_cells = min(int(np.count_nonzero(priority)),roundgames//batchsize,(budget-spent)//batchsize)
+        if N_cells == 0:
+            break
+        chosen = np.argpartition(-priority,N_cells-1)[:N_cells]
+
+        counts[chosen] += sw.play_matchups(deck_specs_1[i[chosen]],deck_specs_2[j[chosen]],batchsize,rulesets=rulesets,engine=engine,rng=rng)
+        spent += N_cells*batchsize
+        if verbose:
+            print('\r%d games played, %d cells still short of the target' % (spent,np.count_nonzero(priority)),end='',file=sys.stderr,flush=True)
+    if verbose:
+        print('',file=sys.stderr)
+
+    return grid(counts)
+
+###################################################
+# racing for the best deck
+
+def halving_search(deck_specs,objective='hawr',min_games=20,max_games=10000,growth=2,keep=None,z=3.0,engine='batch',rng=None,verbose=True):
+    """
+    Find the deck with the highest average (objective='hawr') or highest
+    minimum (objective='hmwr') win rate against every deck in deck_specs
+    without playing the whole grid, by successive halving.  Each round
+    brings the matchups of the surviving decks up to the round's number of
+    games, starting from min_games and growing by a factor of growth;
+    decks whose upper confidence bound is beaten by another deck's lower
+    bound are dropped.  If keep is given, only the better keep fraction of
+    the rest (ranked by their upper bounds) go on to the next round, which
+    is cheaper but can drop a deck that's still in the running.  For the
+    highest minimum, later rounds only play the opponents that could still
+    be a deck's worst matchup.  Returns the index of the best deck, the
+    outcome counts of every matchup played (of shape (N_decks, N_decks, 5),
+    with mirror matchups left empty) and the number of games played.
+    """
+
+    if objective not in ('hawr','hmwr'):
+        raise Exception("The objective has to be either 'hawr' or 'hmwr'!")
+    deck_specs = np.atleast_2d(np.asarray(deck_specs,dtype=np.int64))
+    if rng is None:
+        rng = bd.rng
+    N_decks = len(deck_specs)
+    counts = np.zeros((N_decks,N_decks,len(sw.outcomes)),dtype=np.int64)
+    alive = np.ones(N_decks,dtype=bool)
+    low = np.zeros((N_decks,N_decks))
+    high = np.ones((N_decks,N_decks))
+    N_games = min(min_games,max_games)
+    spent = 0
+
+    while True:
+
+        # the cells the surviving decks need this round, played once per pair
+        needed = np.zeros((N_decks,N_decks),dtype=bool)
+        if objective == 'hawr':
+            needed[alive] = True
+        else:
+            needed[alive] = (low[alive] <= high[alive].min(axis=1)[:,None])
+        needed |= needed.T
+        np.fill_diagonal(needed,False)
+        cells = np.argwhere(np.triu(needed,k=1))
+        deficit = N_games - counts[cells[:,0],cells[:,1]].sum(axis=-1)
+        for N in np.unique(deficit[deficit > 0]):
+            chosen = cells[deficit == N]
+            played = sw.play_matchups(deck_specs[chosen[:,0]],deck_specs[chosen[:,1]],int(N),engine=engine,rng=rng)
+            counts[chosen[:,0],chosen[:,1]] += played
+            counts[chosen[:,1],chosen[:,0]] += sw.swap_seats(played)
+            spent += int(N)*len(chosen)
+
+        # mirror matchups are exactly even
+        rate, low, high = interval(counts,z=z)
+        np.fill_diagonal(rate,0.5)
+        np.fill_diagonal(low,0.5)
+        np.fill_diagonal(high,0.5)
+
+        # bounds on each deck's average or minimum win rate
+        if objective == 'hawr':
+            # each cell's standard error is read off its Wilson interval,
+            # which stays open at 0% and 100% unlike rate*(1-rate)/n
+            variances = np.where(counts.sum(axis=-1) > 0,((high-low)/(2*z))**2,0.25)
+            np.fill_diagonal(variances,0.0)
+            score = rate.mean(axis=1)
+            halfwidth = z*np.sqrt(variances.sum(axis=1))/N_decks
+            upper = score + halfwidth
+            lower = score - halfwidth
+        else:
+            upper = high.min(axis=1)
+            lower = low.min(axis=1)
+
+        # drop the decks that are beaten for sure, then halve what's left
+        alive &= (upper >= lower[alive].max())
+        survivors = np.flatnonzero(alive)
+        N_keep = len(survivors) if keep is None else max(int(np.ceil(keep*len(survivors))),1)
+        if (N_games < max_games) and (len(survivors) > N_keep):
+            alive[:] = False
+            alive[survivors[np.argsort(-upper[survivors],kind='stable')[:N_keep]]] = True
+        if verbose:
+            print('\r%d games played, %d games per matchup, %d decks left' % (spent,N_games,alive.sum()),end='',file=sys.stderr,flush=True)
+
+        if (alive.sum() == 1) or (N_games >= max_games):
+            break
+        N_games = min(N_games*growth,max_games)
+
+    if verbose:
+        print('',file=sys.stderr)
+
+    # the best of whatever is left, by its estimated objective
+    survivors = np.flatnonzero(alive)
+    estimate = rate.mean(axis=1) if objective == 'hawr' else rate.min(axis=1)
+    return int(survivors[np.argmax(estimate[survivors])]), counts, spent
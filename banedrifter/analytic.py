@@ -0,0 +1,206 @@
+###################################################
+# imports
+
+import sys
+import numpy as np
+import sweep as sw
+import exact
+
+###################################################
+# degenerate regions
+
+def never_casts_bane(deck):
+    """
+    Whether a (N_bane, N_mull, N_land) deck (or each of an array of them)
+    can never resolve a Baneslayer: it has none, or fewer than 5 lands.
+    """
+
+    deck = np.asarray(deck)
+    return (deck[...,0] == 0) | (deck[...,2] < 5)
+
+def analytic_cells(deck_specs_1,deck_specs_2,cells,rulesets=None):
+    """
+    Which of a set of (i, j) cells can be solved in closed form.  Under
+    Ruleset 01, when one of the decks can never resolve a Baneslayer, no
+    creature ever blocks or is blocked, and the two players don't interact
+    at all until one of them is milled or takes 20 damage; each player's
+    game can then be solved on its own.  Other rulesets aren't covered.
+    """
+
+    cells = np.asarray(cells,dtype=np.int64).reshape(-1,2)
+    if (rulesets is not None) and (tuple(rulesets) != sw.rulesets_01):
+        return np.zeros(len(cells),dtype=bool)
+    deck_specs_1 = np.atleast_2d(np.asarray(deck_specs_1,dtype=np.int64))
+    deck_specs_2 = np.atleast_2d(np.asarray(deck_specs_2,dtype=np.int64))
+    return never_casts_bane(deck_specs_1[cells[:,0]]) | never_casts_bane(deck_specs_2[cells[:,1]])
+
+###################################################
+# solo solver class
+
+class solo_solver:
+    """
+    Exact probabilities of how and when a single Ruleset 01 player's game
+    ends, when the opponent never interferes: either the player is milled
+    at the start of a turn, or its unblocked Baneslayers finish dealing 20
+    damage in combat
+    """
+
+    def __init__(self):
+
+        # outcomes of the cardplay phase, by (library, hand, lands) counts
+        self.cardplays = dict()
+
+        # ending probabilities, by deck and seat
+        self.cache = dict()
+
+    # the first card played is a land, then Baneslayers and Mulldrifters are
+    # cast as in rulesets.cardplay_01; returns {(library, hand, lands, N_cast): probability}
+    def cardplay(self,library,hand,lands):
+        key = (library,hand,lands)
+        if key in self.cardplays:
+            return self.cardplays[key]
+        if hand[2] > 0:
+            hand = (hand[0],hand[1],hand[2]-1)
+            lands += 1
+        outcomes = dict()
+        for (library_after, hand_after, N_cast), p in self.cast(library,hand,lands,0,False).items():
+            outcomes[(library_after,hand_after,lands,N_cast)] = p
+        self.cardplays[key] = outcomes
+        return outcomes
+
+    # the casting loop, with the same decisions as exact.solver.cast
+    def cast(self,library,hand,untapped,N_cast,evoking):
+        hand = list(hand)
+        if not evoking:
+            N = min(hand[0],untapped//5)
+            hand[0] -= N
+            N_cast += N
+            untapped -= 5*N
+            if (untapped >= 5) & (hand[1] > 0) & (sum(library) >= 2):
+                hand[1] -= 1
+                return self.cast_draws(library,tuple(hand),untapped-5,N_cast,False)
+        if (untapped >= 3) & (hand[1] > 0) & (sum(library) >= 2):
+            hand[1] -= 1
+            return self.cast_draws(library,tuple(hand),untapped-3,N_cast,True)
+        return {(library,tuple(hand),N_cast): 1.0}
+
+    # draw two cards off a Mulldrifter and keep casting
+    def cast_draws(self,library,hand,untapped,N_cast,evoking):
+        outcomes = dict()
+        for p, drawn in exact.draw_outcomes(library,2):
+            library_after = tuple([library[code]-drawn[code] for code in range(3)])
+            hand_after = tuple([hand[code]+drawn[code] for code in range(3)])
+            for key, q in self.cast(library_after,hand_after,untapped,N_cast,evoking).items():
+                outcomes[key] = outcomes.get(key,0.0) + p*q
+        return outcomes
+
+    # probabilities that the game ends on each of the player's turns, via
+    # milling and via damage, as two arrays indexed by turn number
+    def endings(self,deck,first=False,handsize=7):
+        deck = tuple([int(N) for N in deck])
+        key = (deck,first,handsize)
+        if key in self.cache:
+            return self.cache[key]
+
+        mill = [0.0]
+        kill = [0.0]
+
+        # turn-start states: (library, hand, lands, ready Baneslayers, damage dealt)
+        states = dict()
+        for p, hand in exact.draw_outcomes(deck,min(handsize,sum(deck))):
+            library = tuple([deck[code]-hand[code] for code in range(3)])
+            states[(library,hand,0,0,0)] = p
+
+        turn = 0
+        while len(states) > 0:
+            turn += 1
+            mill.append(0.0)
+            kill.append(0.0)
+            after = dict()
+            for (library, hand, lands, banes, damage), p in states.items():
+
+                # draw a card, unless it's the first player's first turn
+                if first and (turn == 1):
+                    draws = [(1.0,library,hand)]
+                elif sum(library) < 1:
+                    mill[turn] += p
+                    continue
+                else:
+                    draws = [(q,tuple([library[code]-drawn[code] for code in range(3)]),tuple([hand[code]+drawn[code] for code in range(3)]))
+                             for q, drawn in exact.draw_outcomes(library,1)]
+
+                for q, library_drawn, hand_drawn in draws:
+                    for (library_after, hand_after, lands_after, N_cast), r in self.cardplay(library_drawn,hand_drawn,lands).items():
+
+                        # every Baneslayer cast before this turn attacks, unblocked
+                        if damage + banes >= 4:
+                            kill[turn] += p*q*r
+                            continue
+
+                        # Baneslayers beyond the ones needed to finish the job don't matter
+                        state = (library_after,exact.discard_01(hand_after),lands_after,min(banes+N_cast,4-damage-banes),damage+banes)
+                        after[state] = after.get(state,0.0) + p*q*r
+            states = after
+
+        self.cache[key] = (np.array(mill),np.array(kill))
+        return self.cache[key]
+
+###################################################
+# solving matchups
+
+def combine(first,second):
+    """
+    Outcome probabilities of a game, from the first player's side, given the
+    (mill, kill) ending probabilities of each player's own game.  The first
+    player's turn t comes just before the second player's turn t.
+    """
+
+    length = max(len(first[0]),len(second[0]))
+    mill1, kill1 = [np.pad(a,(0,length-len(a))) for a in first]
+    mill2, kill2 = [np.pad(a,(0,length-len(a))) for a in second]
+
+    # chance that each player's game is still going at the start of turn t
+    going1 = 1.0 - np.concatenate(([0.0],np.cumsum(mill1+kill1)[:-1]))
+    going2 = 1.0 - np.concatenate(([0.0],np.cumsum(mill2+kill2)[:-1]))
+
+    # the first player's game ends on turn t if the second's is still going
+    # on turn t, and the second's ends on turn t if the first's goes past it
+    outcome = np.zeros(len(sw.outcomes))
+    outcome[sw.i_p1_life] = (kill1*going2).sum()
+    outcome[sw.i_p2_mill] = (mill1*going2).sum()
+    outcome[sw.i_p2_life] = (kill2*(going1-mill1-kill1)).sum()
+    outcome[sw.i_p1_mill] = (mill2*(going1-mill1-kill1)).sum()
+    return outcome
+
+def solve_matchup(deck1,deck2,solver_=None):
+    """
+    Exact outcome probabilities of a matchup in which at least one deck can
+    never resolve a Baneslayer, with each deck going first half of the time,
+    in the layout of sweep.outcomes.
+    """
+
+    if not (never_casts_bane(deck1) or never_casts_bane(deck2)):
+        raise Exception("Only matchups where a deck never resolves a Baneslayer can be solved this way!")
+    if solver_ is None:
+        solver_ = solo_solver()
+    first = combine(solver_.endings(deck1,first=True),solver_.endings(deck2))
+    second = sw.swap_seats(combine(solver_.endings(deck2,first=True),solver_.endings(deck1)))
+    return (first + second)/2
+
+def solve_cells(deck_specs_1,deck_specs_2,cells,solver_=None,verbose=True):
+    """
+    Exact outcome probabilities of a set of analytic (i, j) cells, of shape
+    (len(cells), 5).
+    """
+
+    if solver_ is None:
+        solver_ = solo_solver()
+    cells = np.asarray(cells,dtype=np.int64).reshape(-1,2)
+    probs = np.zeros((len(cells),len(sw.outcomes)))
+    for k, (i, j) in enumerate(cells):
+        probs[k] = solve_matchup(deck_specs_1[i],deck_specs_2[j],solver_)
+        if verbose:
+            print('\r%d/%d analytic matchups' % (k+1,len(cells)),end='',file=sys.stderr,flush=True)
+    if verbose and (len(cells) > 0):
+        print('',file=sys.stderr)
+    return probs
@@ -2,8 +2,14 @@
 # imports
 
 import numpy as np
+from collections import namedtuple
 rng = np.random.default_rng()
 
+# the random number generator for a single game, spawned from a sweep seed
+# by the game's matchup index and game index
+def game_rng(seed,matchup=0,game=0):
+    return np.random.default_rng(np.random.SeedSequence(seed,spawn_key=(matchup,game)))
+
 ###################################################
 # useful constants
 
@@ -20,6 +26,124 @@ black = "Black"
 red = "Red"
 green = "Green"
 
+###################################################
+# card prototypes
+
+# the fixed properties of a card, shared by every copy of it
+prototype = namedtuple('prototype',['type','cmc','mc','color','altcost'])
+
+prototypes = dict()
+prototypes[ba] = prototype(creature,5,'3WW',white,0)
+prototypes[md] = prototype(creature,5,'4U',blue,3)
+prototypes["Plains"] = prototype(land,0,'0',None,0)
+prototypes["Island"] = prototype(land,0,'0',None,0)
+prototypes["Tundra"] = prototype(land,0,'0',None,0)
+
+# integer codes used for cards in compact decks
+codenames = np.array([ba,md,bl])
+codes = {ba: 0, md: 1, bl: 2}
+
+# the player attribute holding each card once it is on the field
+fieldnames = {ba: 'banes', md: 'mulls', bl: 'lands'}
+
+###################################################
+# game log events
+
+# log levels
+log_off = 0
+log_events = 1
+log_full = 2
+
+# kinds of logged event
+ev_text = 0
+ev_turn = 1
+ev_draw = 2
+ev_mill = 3
+ev_lose_life = 4
+ev_dead = 5
+ev_gain_life = 6
+ev_discard = 7
+ev_tap = 8
+ev_play = 9
+ev_evoke = 10
+ev_attack = 11
+ev_die_attacking = 12
+ev_die_blocking = 13
+ev_board = 14
+ev_fast_forward = 15
+
+# render a recorded hand as text
+def render_hand(cardnames,linelength=80):
+    strout = '*'*linelength + '\n'
+    strout += ('* Hand:').ljust(linelength-1) + '*' + '\n'
+    for cardname in cardnames:
+        strout += ('*       '+cardname).ljust(linelength-1) + '*' + '\n'
+    return strout
+
+# render a recorded board state as text
+def render_board(record,linelength=80):
+    cardnames, life, handsize, decksize, gravesize, lands, mulls, banes = record
+
+    strout = '*'*linelength + '\n'
+    strout += ('* Life total: ' + str(life)).ljust(linelength-1) + '*' + '\n'
+    strout += ('* Cards in hand: ' + str(handsize)).ljust(linelength-1) + '*' + '\n'
+    strout += ('* Cards in deck: ' + str(decksize)).ljust(linelength-1) + '*' + '\n'
+    strout += ('* Cards in graveyard: ' + str(gravesize)).ljust(linelength-1) + '*' + '\n'
+    strout += '* ' + '-'*(linelength-4) + ' *' + '\n'
+
+    for letter, tapped_flags in (('L',lands),('M',mulls),('B',banes)):
+        strcard = '* '
+        for tapped in tapped_flags:
+            if tapped:
+                strcard += letter + '(T) '
+            else:
+                strcard += letter + ' '
+        strcard = strcard.ljust(linelength-1) + '*' + '\n'
+        strout += strcard
+
+    strout += '*'*linelength + '\n'
+    return strout
+
+# render a single logged event as text
+def render_event(event,linelength=80):
+    kind = event[0]
+    if kind == ev_text:
+        return event[1]
+    if kind == ev_turn:
+        return '-'*linelength + '\n' + 'Turn ' + str(event[1]) + '\n' + '\n'
+    if kind == ev_draw:
+        if event[1] == 1:
+            return 'Drawing 1 card.' + '\n'
+        return 'Drawing ' + str(event[1]) + ' cards.' + '\n'
+    if kind == ev_mill:
+        return 'Attempting to draw ' + str(event[1]) + ' cards.' + '\n' + 'PLAYER LOSES VIA MILLING' + '\n'
+    if kind == ev_lose_life:
+        return 'Losing ' + str(event[1]) + ' life.' + '\n'
+    if kind == ev_dead:
+        return 'PLAYER LOSES VIA LIFE TOTAL' + '\n'
+    if kind == ev_gain_life:
+        return 'Gaining ' + str(event[1]) + ' life.' + '\n'
+    if kind == ev_discard:
+        return 'Discarding ' + event[1] + '.' + '\n'
+    if kind == ev_tap:
+        return 'Tapping ' + str(event[1]) + ' lands.' + '\n'
+    if kind == ev_play:
+        return 'Playing ' + event[1] + '.' + '\n'
+    if kind == ev_evoke:
+        return 'Evoking ' + event[1] + '.' + '\n'
+    if kind == ev_attack:
+        return 'Attacking with ' + event[1] + '.' + '\n'
+    if kind == ev_die_attacking:
+        return str(event[1]) + ' ' + event[2] + 's die attacking.' + '\n'
+    if kind == ev_die_blocking:
+        return str(event[1]) + ' ' + event[2] + 's die blocking.' + '\n'
+    if kind == ev_board:
+        record = event[1]
+        return '\n' + render_hand(record[0],linelength) + render_board(record,linelength) + '\n'
+    if kind == ev_fast_forward:
+        return 'Skipping ' + str(event[1]) + ' turns that only draw lands.' + '\n'
+    raise Exception("Log event not recognized!")
+
 ###################################################
 # card class
 
@@ -41,40 +165,8 @@ class card:
         self.color = None
         self.altcost = None
 
-        if (name == ba):
-            self.type = creature
-            self.cmc = 5
-            self.mc = '3WW'
-            self.color = white
-            self.altcost = 0
-
-        if (name == md):
-            self.type = creature
-            self.cmc = 5
-            self.mc = '4U'
-            self.color = blue
-            self.altcost = 3
-
-        if (name == "Plains"):
-            self.type = land
-            self.cmc = 0
-            self.mc = '0'
-            self.color = None
-            self.altcost = 0
-
-        if (name == "Island"):
-            self.type = land
-            self.cmc = 0
-            self.mc = '0'
-            self.color = None
-            self.altcost = 0
-
-        if (name == "Tundra"):
-            self.type = land
-            self.cmc = 0
-            self.mc = '0'
-            self.color = None
-            self.altcost = 0
+        if name in prototypes:
+            self.type, self.cmc, self.mc, self.color, self.altcost = prototypes[name]
 
     # show the card name when printed
     def __repr__(self):
@@ -88,37 +180,106 @@ class deck:
     The cards in the deck
     """
 
-    def __init__(self,N_bane,N_mull,N_land):
+    # a lazy deck gets a lazy deck
+    def __new__(cls,*args,lazy=False,**kwargs):
+        if (cls is deck) and lazy:
+            cls = lazy_deck
+        return object.__new__(cls)
+
+    def __init__(self,N_bane,N_mull,N_land,compact=False,rng=None,lazy=False):
+
+        # a compact deck holds integer card codes instead of card objects
+        self.compact = compact
+
+        # the deck shuffles with its own random number generator if it has one
+        self.rng = rng
 
         # add the appropriate cards to the deck
-        self.cards = list()
-        for i in range(N_bane):
-            self.cards.append(card(ba))
-        for i in range(N_mull):
-            self.cards.append(card(md))
-        for i in range(N_land):
-            self.cards.append(card(bl))
-        self.cards = np.array(self.cards)
+        if compact:
+            cards = np.repeat(np.arange(3,dtype=np.int8),[N_bane,N_mull,N_land])
+        else:
+            cards = list()
+            for i in range(N_bane):
+                cards.append(card(ba))
+            for i in range(N_mull):
+                cards.append(card(md))
+            for i in range(N_land):
+                cards.append(card(bl))
+        self.cards = cards
 
         # start with the deck randomly shuffled
         self.shuffle()
 
+    # the cards still in the library, as a view of the buffer below the cursor
+    @property
+    def cards(self):
+        return self.buffer[self.top:]
+
+    # replacing the cards starts a new buffer with the cursor at the top
+    @cards.setter
+    def cards(self,cards):
+        self.buffer = np.array(cards)
+        self.top = 0
+        self.above = None
+
     # show the list of cards when printed
     def __repr__(self):
         return '\n'.join(self.cardnames())
 
     # count the cards
     def count(self):
-        return len(self.cards)
+        return len(self.buffer) - self.top
 
     # list of card names
     def cardnames(self):
+        if self.compact:
+            return codenames[self.cards]
         return np.array([c.name for c in self.cards])
 
-    # shuffle the deck
-    def shuffle(self):
-        ind = rng.permutation(self.count())
-        self.cards = self.cards[ind]
+    # how many cards of each card code are left
+    def count_codes(self):
+
+        # above[k] counts the cards of each code in the buffer above position k
+        if self.above is None:
+            if self.compact:
+                buffercodes = self.buffer
+            else:
+                buffercodes = np.array([codes[c.name] for c in self.buffer],dtype=np.int8)
+            self.above = np.zeros((len(buffercodes)+1,3),dtype=np.int64)
+            self.above[1:] = np.cumsum(buffercodes[:,None] == np.arange(3),axis=0)
+        return tuple((self.above[-1] - self.above[self.top]).tolist())
+
+    # shuffle the cards still in the library, in place
+    def shuffle(self,generator=None):
+        if generator is None:
+            generator = self.rng
+        if generator is None:
+            generator = rng
+        ind = generator.permutation(self.count())
+        self.buffer[self.top:] = self.cards[ind]
+        self.above = None
+
+    # look at the top N cards without drawing them
+    def peek(self,N=1):
+        if (N < 0):
+            raise Exception("I don't know how to look at a negative number of cards.")
+        return self.buffer[self.top:self.top+N]
+
+    # the random number generator the deck draws on
+    def generator(self):
+        if self.rng is None:
+            return rng
+        return self.rng
+
+    # capture the library and the state of its random number generator
+    def snapshot(self):
+        return (self.top,self.buffer.copy(),self.above,self.generator().bit_generator.state)
+
+    # go back to a captured library
+    def restore(self,state):
+        self.top, buffer, self.above, generatorstate = state
+        self.buffer = buffer.copy()
+        self.generator().bit_generator.state = generatorstate
 
     # draw some cards
     def draw(self,N=1):
@@ -126,12 +287,117 @@ class deck:
             raise Exception("I don't know how to draw a negative number of cards.")
         if (N > 0) & (self.count() == 0):
             print("No more cards left to draw!")
-        else:
-            cards_to_be_drawn = self.cards[:N]
-            self.cards = self.cards[N:]
+
+        # the drawn cards are a view of the buffer, which is never written above the cursor
+        cards_to_be_drawn = self.buffer[self.top:self.top+N]
+        self.top += len(cards_to_be_drawn)
 
         return cards_to_be_drawn
 
+###################################################
+# lazy deck class
+
+class lazy_deck(deck):
+    """
+    The cards in the deck, kept as a count of each card code, with every card
+    picked at random from what's left only when it's drawn
+    """
+
+    def __init__(self,N_bane,N_mull,N_land,compact=False,rng=None,lazy=True):
+
+        self.compact = compact
+        self.rng = rng
+
+        # how many of each card code are left, not counting the revealed ones
+        self.counts = [N_bane, N_mull, N_land]
+        self.N_unrevealed = N_bane + N_mull + N_land
+
+        # card codes already picked for the top of the deck by peeking, top first
+        self.revealed = list()
+
+    # the cards still in the library: the revealed ones on top, and the rest in no particular order
+    @property
+    def cards(self):
+        cardcodes = np.concatenate((np.array(self.revealed,dtype=np.int8),np.repeat(np.arange(3,dtype=np.int8),self.counts)))
+        return self.make_cards(cardcodes)
+
+    # the form the player expects its cards in
+    def make_cards(self,cardcodes):
+        if self.compact:
+            return cardcodes
+        return np.array([card(str(codenames[code])) for code in cardcodes],dtype=object)
+
+    # count the cards
+    def count(self):
+        return self.N_unrevealed + len(self.revealed)
+
+    # list of card names
+    def cardnames(self):
+        return codenames[np.concatenate((np.array(self.revealed,dtype=np.int8),np.repeat(np.arange(3,dtype=np.int8),self.counts)))]
+
+    # how many cards of each card code are left
+    def count_codes(self):
+        counts = list(self.counts)
+        for code in self.revealed:
+            counts[code] += 1
+        return tuple(counts)
+
+    # put the revealed cards back; the order is only decided as cards are drawn,
+    # so a generator given here is the one the next cards are picked with
+    def shuffle(self,generator=None):
+        if generator is not None:
+            self.rng = generator
+        for code in self.revealed:
+            self.counts[code] += 1
+        self.N_unrevealed += len(self.revealed)
+        self.revealed = list()
+
+    # capture the remaining counts and the state of the random number generator
+    def snapshot(self):
+        return (tuple(self.counts),self.N_unrevealed,tuple(self.revealed),self.generator().bit_generator.state)
+
+    # go back to captured counts
+    def restore(self,state):
+        counts, self.N_unrevealed, revealed, generatorstate = state
+        self.counts = list(counts)
+        self.revealed = list(revealed)
+        self.generator().bit_generator.state = generatorstate
+
+    # pick the next N cards from the remaining counts
+    def reveal(self,N):
+        N = min(N,self.N_unrevealed)
+        for u in self.generator().random(N):
+            u *= self.N_unrevealed
+            if u < self.counts[0]:
+                code = 0
+            elif u < self.counts[0] + self.counts[1]:
+                code = 1
+            else:
+                code = 2
+            self.counts[code] -= 1
+            self.N_unrevealed -= 1
+            self.revealed.append(code)
+
+    # look at the top N cards without drawing them
+    def peek(self,N=1):
+        if (N < 0):
+            raise Exception("I don't know how to look at a negative number of cards.")
+        if N > len(self.revealed):
+            self.reveal(N-len(self.revealed))
+        return self.make_cards(np.array(self.revealed[:N],dtype=np.int8))
+
+    # draw some cards
+    def draw(self,N=1):
+        if (N < 0):
+            raise Exception("I don't know how to draw a negative number of cards.")
+        if (N > 0) & (self.count() == 0):
+            print("No more cards left to draw!")
+        if N > len(self.revealed):
+            self.reveal(N-len(self.revealed))
+        cards_to_be_drawn = self.make_cards(np.array(self.revealed[:N],dtype=np.int8))
+        self.revealed = self.revealed[N:]
+        return cards_to_be_drawn
+
 ###################################################
 # hand class
 
@@ -160,15 +426,128 @@ class hand:
     def add_cards(self,cards):
         self.cards = np.concatenate((self.cards,cards))
 
+###################################################
+# compact zone classes
+
+class pile:
+    """
+    A hand or graveyard kept as a count of each card code
+    """
+
+    def __init__(self,cards=()):
+
+        self.counts = [0, 0, 0]
+        self.add_cards(cards)
+
+    # show the list of cards when printed
+    def __repr__(self):
+        return '\n'.join(self.cardnames())
+
+    # count the cards
+    def count(self):
+        return self.counts[0] + self.counts[1] + self.counts[2]
+
+    # count the cards with a given name
+    def count_name(self,cardname):
+        return self.counts[codes[cardname]]
+
+    # list of card names
+    def cardnames(self):
+        return np.repeat(codenames,self.counts)
+
+    # add some cards, given as card codes
+    def add_cards(self,cards):
+        for code in cards:
+            self.counts[code] += 1
+
+    # add some cards with a given name
+    def add(self,cardname,N=1):
+        self.counts[codes[cardname]] += N
+
+    # take away some cards with a given name
+    def remove(self,cardname,N=1):
+        self.counts[codes[cardname]] -= N
+
+# the state of a single compact permanent, as seen when iterating over its zone
+permanent_state = namedtuple('permanent_state',['name','tapped','sick'])
+
+class permanents:
+    """
+    The copies of one card on the field, kept as counts by tapped and sick state
+    """
+
+    def __init__(self,name):
+
+        self.name = name
+
+        # counts[tapped][sick]
+        self.counts = [[0, 0], [0, 0]]
+
+    # show the list of cards when printed
+    def __repr__(self):
+        return '\n'.join([self.name]*len(self))
+
+    # total number of copies on the field
+    def __len__(self):
+        return self.counts[0][0] + self.counts[0][1] + self.counts[1][0] + self.counts[1][1]
+
+    # iterate over the copies in the order a player's field would list them
+    def __iter__(self):
+        for tapped in (True, False):
+            for sick in (False, True):
+                for i in range(self.counts[tapped][sick]):
+                    yield permanent_state(self.name,tapped,sick)
+
+    # count the copies in a given tapped state
+    def count(self,tapped=False):
+        return self.counts[tapped][0] + self.counts[tapped][1]
+
+    # count the untapped copies without summoning sickness
+    def count_ready(self):
+        return self.counts[0][0]
+
+    # put some new copies onto the field
+    def add(self,N=1):
+        self.counts[0][1] += N
+
+    # tap N untapped copies, preferring ones without summoning sickness
+    def tap(self,N=1):
+        for sick in (0, 1):
+            n = min(N,self.counts[0][sick])
+            self.counts[0][sick] -= n
+            self.counts[1][sick] += n
+            N -= n
+
+    # take away N copies in a given tapped state, preferring ones without summoning sickness
+    def remove(self,N,tapped=False):
+        for sick in (0, 1):
+            n = min(N,self.counts[tapped][sick])
+            self.counts[tapped][sick] -= n
+            N -= n
+
+    # untap everything and remove summoning sickness
+    def reset(self):
+        self.counts = [[len(self), 0], [0, 0]]
+
 ###################################################
 # player class
 
+# everything about a player that can change during a game, as captured by player.snapshot
+player_snapshot = namedtuple('player_snapshot',['deck','hand','grave','lands','mulls','banes','life','alive','loss_reason','fast_forwarded','turncount','N_events'])
+
 class player:
     """
     A player and associated board state
     """
 
-    def __init__(self,starting_deck,handsize=7,linelength=80):
+    # a compact deck gets a compact player; copying and unpickling make
+    # players without a deck, and already know which class they want
+    def __new__(cls,starting_deck=None,*args,**kwargs):
+        if (cls is player) and (starting_deck is not None) and starting_deck.compact:
+            cls = compact_player
+        return object.__new__(cls)
+
+    def __init__(self,starting_deck,handsize=7,linelength=80,loglevel=log_full):
 
         self.deck = starting_deck
 
@@ -178,76 +557,104 @@ class player:
         # start out not being dead
         self.alive = True
         self.loss_reason = None
+        self.fast_forwarded = False
         self.life = 20
 
         # start out with nothing on the field
-        self.banes = self.deck.draw(0)
-        self.mulls = self.deck.draw(0)
-        self.lands = self.deck.draw(0)
+        self.banes = np.empty(0,dtype=object)
+        self.mulls = np.empty(0,dtype=object)
+        self.lands = np.empty(0,dtype=object)
 
         # start out with nothing in the graveyard
-        self.grave = self.deck.draw(0)
+        self.grave = np.empty(0,dtype=object)
 
         # initialize a game log
         self.linelength = linelength
         self.turncount = 0
-        self.gamelog = '='*self.linelength + '\n'
+        self.loglevel = loglevel
+        self.events = [None]*64
+        self.N_events = 0
 
     # show the board state when printed
     def __repr__(self):
         return self.boardstate()
 
-    def boardstate(self):
-        strout = '*'*self.linelength + '\n'
-        strout += ('* Life total: ' + str(self.life)).ljust(self.linelength-1) + '*' + '\n'
-        strout += ('* Cards in hand: ' + str(self.handsize())).ljust(self.linelength-1) + '*' + '\n'
-        strout += ('* Cards in deck: ' + str(self.decksize())).ljust(self.linelength-1) + '*' + '\n'
-        strout += ('* Cards in graveyard: ' + str(self.gravesize())).ljust(self.linelength-1) + '*' + '\n'
-        strout += '* ' + '-'*(self.linelength-4) + ' *' + '\n'
-
-        strcard = '* '
-        for land in self.lands:
-            if land.tapped:
-                strcard += 'L(T) '
-            else:
-                strcard += 'L '
-        strcard = strcard.ljust(self.linelength-1) + '*' + '\n'
-        strout += strcard
-
-        strcard = '* '
-        for mull in self.mulls:
-            if mull.tapped:
-                strcard += 'M(T) '
-            else:
-                strcard += 'M '
-        strcard = strcard.ljust(self.linelength-1) + '*' + '\n'
-        strout += strcard
+    # the game log is only rendered as text when asked for
+    @property
+    def gamelog(self):
+        strout = '='*self.linelength + '\n'
+        strout += ''.join([render_event(event,self.linelength) for event in self.events[:self.N_events]])
+        return strout
 
-        strcard = '* '
-        for bane in self.banes:
-            if bane.tapped:
-                strcard += 'B(T) '
-            else:
-                strcard += 'B '
-        strcard = strcard.ljust(self.linelength-1) + '*' + '\n'
-        strout += strcard
+    # text written directly into the game log replaces the recorded events
+    @gamelog.setter
+    def gamelog(self,text):
+        header = '='*self.linelength + '\n'
+        if text.startswith(header):
+            text = text[len(header):]
+        self.N_events = 0
+        if self.loglevel > log_off:
+            self.log(ev_text,text)
+
+    # record an event in the game log
+    def log(self,*event):
+        if self.loglevel < log_events:
+            return
+        if self.N_events == len(self.events):
+            self.events.extend([None]*len(self.events))
+        self.events[self.N_events] = event
+        self.N_events += 1
+
+    # the information shown by the board and hand renders
+    def boardrecord(self):
+        lands = tuple([landcard.tapped for landcard in self.lands])
+        mulls = tuple([mull.tapped for mull in self.mulls])
+        banes = tuple([bane.tapped for bane in self.banes])
+        return (tuple(self.hand.cardnames()), self.life, self.handsize(), self.decksize(), self.gravesize(), lands, mulls, banes)
 
-        strout += '*'*self.linelength + '\n'
-        return strout
+    def boardstate(self):
+        return render_board(self.boardrecord(),self.linelength)
 
     def handstate(self):
-        strout = '*'*self.linelength + '\n'
-        strout += ('* Hand:').ljust(self.linelength-1) + '*' + '\n'
-        for cardname in self.hand.cardnames():
-            strout += ('*       '+cardname).ljust(self.linelength-1) + '*' + '\n'
-        return strout
+        return render_hand(self.hand.cardnames(),self.linelength)
 
     # log the current board state
     def log_boardstate(self):
-        self.gamelog += '\n'
-        self.gamelog += self.handstate()
-        self.gamelog += self.boardstate()
-        self.gamelog += '\n'
+        if self.loglevel >= log_full:
+            self.log(ev_board,self.boardrecord())
+
+    # capture the state of the player, to come back to it later with restore
+    def snapshot(self):
+        fields = [(zone,tuple([(c.tapped,c.sick) for c in zone])) for zone in (self.lands,self.mulls,self.banes)]
+        return player_snapshot(self.deck.snapshot(),self.hand.cards,self.grave,fields[0],fields[1],fields[2],
+                               self.life,self.alive,self.loss_reason,self.fast_forwarded,self.turncount,self.N_events)
+
+    # go back to a captured state; events logged since then are forgotten
+    def restore(self,state):
+        self.deck.restore(state.deck)
+        self.hand = hand(state.hand)
+        self.grave = state.grave
+        for name, (zone, flags) in zip(('lands','mulls','banes'),(state.lands,state.mulls,state.banes)):
+            setattr(self,name,zone)
+            for c, (tapped, sick) in zip(zone,flags):
+                c.tapped = tapped
+                c.sick = sick
+
+        # cards that have left the hand or library since have to be as good as
+        # new (a lazy library makes new cards as they're drawn anyway)
+        cards = self.hand.cards
+        if not isinstance(self.deck,lazy_deck):
+            cards = np.concatenate((cards,self.deck.cards))
+        for c in cards:
+            c.tapped = False
+            c.sick = True
+
+        self.life = state.life
+        self.alive = state.alive
+        self.loss_reason = state.loss_reason
+        self.fast_forwarded = state.fast_forwarded
+        self.turncount = state.turncount
+        self.N_events = state.N_events
 
     # how many cards in hand
     def handsize(self):
@@ -257,6 +664,11 @@ class player:
     def decksize(self):
         return self.deck.count()
 
+    # how many cards of each card code in hand
+    def hand_counts(self):
+        names = self.hand.cardnames()
+        return tuple([int((names == name).sum()) for name in codenames])
+
     # how many cards in graveyard
     def gravesize(self):
         return len(self.grave)
@@ -264,33 +676,29 @@ class player:
     # lose life
     def lose_life(self,N):
         self.life -= N
-        self.gamelog += 'Losing ' + str(N) + ' life.' + '\n'
+        self.log(ev_lose_life,N)
         if self.life <= 0:
             self.alive = False
-            self.gamelog += 'PLAYER LOSES VIA LIFE TOTAL' +'\n'
+            self.log(ev_dead)
             self.loss_reason = 'life'
 
     # gain life
     def gain_life(self,N):
         self.life += N
-        self.gamelog += 'Gaining ' + str(N) + ' life.' + '\n'
+        self.log(ev_gain_life,N)
 
     # draw some cards
     def draw(self,N=1):
         if N > self.deck.count():
             self.alive = False
-            self.gamelog += 'Attempting to draw ' + str(N) + ' cards.' + '\n'
-            self.gamelog += 'PLAYER LOSES VIA MILLING' +'\n'
+            self.log(ev_mill,N)
             self.loss_reason = 'mill'
             return 0
         cards_drawn = self.deck.draw(N)
         self.hand.add_cards(cards_drawn)
 
         # log it
-        if N == 1:
-            self.gamelog += 'Drawing 1 card.' + '\n'
-        else:
-            self.gamelog += 'Drawing ' + str(N) + ' cards.' + '\n'
+        self.log(ev_draw,N)
 
     # discard a card
     def discard(self,cardname):
@@ -313,7 +721,7 @@ class player:
         self.grave = np.concatenate((self.grave,[card_to_discard]))
 
         # log it
-        self.gamelog += 'Discarding ' + cardname + '.' + '\n'
+        self.log(ev_discard,cardname)
 
     # count how many untapped lands you have
     def count_untapped_lands(self):
@@ -323,6 +731,33 @@ class player:
                 i += 1
         return i
 
+    # the field zone holding cards with a given name
+    def field(self,cardname):
+        return getattr(self,fieldnames[cardname])
+
+    # count the untapped creatures of a given name
+    def count_untapped(self,cardname):
+        i = 0
+        for creaturecard in self.field(cardname):
+            if not creaturecard.tapped:
+                i += 1
+        return i
+
+    # count the creatures of a given name that are able to attack
+    def count_ready(self,cardname):
+        i = 0
+        for creaturecard in self.field(cardname):
+            if (not creaturecard.tapped) & (not creaturecard.sick):
+                i += 1
+        return i
+
+    # move the first N cards of a given name and tapped state from the field to the graveyard
+    def destroy(self,cardname,N,tapped=False):
+        zone = self.field(cardname)
+        ind = [i for i, c in enumerate(zone) if c.tapped == tapped][:N]
+        self.grave = np.concatenate((self.grave,zone[ind]))
+        setattr(self,fieldnames[cardname],np.delete(zone,ind))
+
     # play a card
     def play(self,cardname,use_altcost=False):
         
@@ -354,7 +789,7 @@ class player:
                 if manacount == cost:
                     break
         if manacount > 0:
-            self.gamelog += 'Tapping ' + str(manacount) + ' lands.' + '\n'
+            self.log(ev_tap,manacount)
 
         # remove the card from hand
         card_to_play = self.hand.cards[ind]
@@ -363,17 +798,17 @@ class player:
         # place the card on the field or into the graveyard, as appropriate
         if cardname == ba:
             self.banes = np.concatenate((self.banes,[card_to_play]))
-            self.gamelog += 'Playing ' + ba + '.' + '\n'
+            self.log(ev_play,ba)
         if cardname == md:
             if not use_altcost:
                 self.mulls = np.concatenate((self.mulls,[card_to_play]))
-                self.gamelog += 'Playing ' + md + '.' + '\n'
+                self.log(ev_play,md)
             else:
                 self.grave = np.concatenate((self.grave,[card_to_play]))
-                self.gamelog += 'Evoking ' + md + '.' + '\n'
+                self.log(ev_evoke,md)
         if cardname == bl:
             self.lands = np.concatenate((self.lands,[card_to_play]))
-            self.gamelog += 'Playing ' + bl + '.' + '\n'
+            self.log(ev_play,bl)
 
         # additional effects
         if cardname == md:
@@ -414,14 +849,14 @@ class player:
             for bane in self.banes:
                 if ((not bane.sick) & (not bane.tapped)):
                     bane.tapped = True
-                    self.gamelog += 'Attacking with '+ ba + '.' + '\n'
+                    self.log(ev_attack,ba)
                     break
         if cardname == md:
             for mull in self.mulls:
                 if ((not mull.sick) & (not mull.tapped)):
                     mull.tapped = True
                     attackcount += 1
-                    self.gamelog += 'Attacking with '+ md + '.' + '\n'
+                    self.log(ev_attack,md)
                     break
 
         # additional effects
@@ -433,16 +868,14 @@ class player:
         if self.turncount != 0:
             raise Warning("Just noting that it's a bit odd to call this first turn function when it's not the first turn.")
         self.turncount += 1
-        self.gamelog += '-'*self.linelength + '\n'
-        self.gamelog += 'Turn ' + str(self.turncount) + '\n' + '\n'
+        self.log(ev_turn,self.turncount)
 
     # reset things at the beginning of the turn
     def start_turn(self):
 
         # log the start of the turn
         self.turncount += 1
-        self.gamelog += '-'*self.linelength + '\n'
-        self.gamelog += 'Turn ' + str(self.turncount) + '\n' + '\n'
+        self.log(ev_turn,self.turncount)
 
         # untap everything and remove summoning sickness
         for land in self.lands:
@@ -459,97 +892,391 @@ class player:
         self.draw(1)
 
 ###################################################
-# gameplay function
+# compact player class
 
+class compact_player(player):
+    """
+    A player whose zones are kept as counts of card codes rather than card objects
+    """
 
-def play_game(p1,p2,cardplay_ruleset=None,combat_ruleset=None,discard_ruleset=None,verbose=False):
+    def __init__(self,starting_deck,handsize=7,linelength=80,loglevel=log_full):
+
+        self.deck = starting_deck
+
+        # start with a hand of cards randomly drawn from the deck
+        self.hand = pile(self.deck.draw(handsize))
+
+        # start out not being dead
+        self.alive = True
+        self.loss_reason = None
+        self.fast_forwarded = False
+        self.life = 20
+
+        # start out with nothing on the field
+        self.banes = permanents(ba)
+        self.mulls = permanents(md)
+        self.lands = permanents(bl)
+
+        # start out with nothing in the graveyard
+        self.grave = pile()
+
+        # initialize a game log
+        self.linelength = linelength
+        self.turncount = 0
+        self.loglevel = loglevel
+        self.events = [None]*64
+        self.N_events = 0
+
+    # how many cards in graveyard
+    def gravesize(self):
+        return self.grave.count()
+
+    # how many cards of each card code in hand
+    def hand_counts(self):
+        return tuple(self.hand.counts)
+
+    # capture the state of the player, to come back to it later with restore
+    def snapshot(self):
+        fields = [(tuple(zone.counts[0]),tuple(zone.counts[1])) for zone in (self.lands,self.mulls,self.banes)]
+        return player_snapshot(self.deck.snapshot(),tuple(self.hand.counts),tuple(self.grave.counts),fields[0],fields[1],fields[2],
+                               self.life,self.alive,self.loss_reason,self.fast_forwarded,self.turncount,self.N_events)
+
+    # go back to a captured state; events logged since then are forgotten
+    def restore(self,state):
+        self.deck.restore(state.deck)
+        self.hand.counts = list(state.hand)
+        self.grave.counts = list(state.grave)
+        for zone, counts in zip((self.lands,self.mulls,self.banes),(state.lands,state.mulls,state.banes)):
+            zone.counts = [list(counts[0]), list(counts[1])]
+        self.life = state.life
+        self.alive = state.alive
+        self.loss_reason = state.loss_reason
+        self.fast_forwarded = state.fast_forwarded
+        self.turncount = state.turncount
+        self.N_events = state.N_events
+
+    # draw some cards
+    def draw(self,N=1):
+        if N > self.deck.count():
+            self.alive = False
+            self.log(ev_mill,N)
+            self.loss_reason = 'mill'
+            return 0
+        self.hand.add_cards(self.deck.draw(N))
+
+        # log it
+        self.log(ev_draw,N)
+
+    # discard a card
+    def discard(self,cardname):
+
+        # check that we know this card at all
+        if cardname not in codes:
+            raise Exception("Card not recognized!")
+
+        # check that you have the card in your hand
+        if self.hand.count_name(cardname) == 0:
+            raise Exception("You can't discard a card that you aren't holding!")
+
+        # move the card from hand to the graveyard
+        self.hand.remove(cardname)
+        self.grave.add(cardname)
+
+        # log it
+        self.log(ev_discard,cardname)
+
+    # count how many untapped lands you have
+    def count_untapped_lands(self):
+        return self.lands.count(tapped=False)
+
+    # count the untapped creatures of a given name
+    def count_untapped(self,cardname):
+        return self.field(cardname).count(tapped=False)
+
+    # count the creatures of a given name that are able to attack
+    def count_ready(self,cardname):
+        return self.field(cardname).count_ready()
+
+    # move N cards of a given name and tapped state from the field to the graveyard
+    def destroy(self,cardname,N,tapped=False):
+        self.field(cardname).remove(N,tapped)
+        self.grave.add(cardname,N)
+
+    # play a card
+    def play(self,cardname,use_altcost=False):
+
+        # check that we know this card at all
+        if cardname not in codes:
+            raise Exception("Card not recognized!")
+
+        # check that you have the card in your hand
+        if self.hand.count_name(cardname) == 0:
+            raise Exception("You can't play a card that you aren't holding!")
+
+        # check that you have enough mana to play this card
+        if not use_altcost:
+            cost = prototypes[cardname].cmc
+        else:
+            cost = prototypes[cardname].altcost
+        if self.count_untapped_lands() < cost:
+            raise Exception("You do not have enough mana to play this card!")
+
+        # otherwise, tap the necessary amount of mana
+        if cost > 0:
+            self.lands.tap(cost)
+            self.log(ev_tap,cost)
+
+        # remove the card from hand
+        self.hand.remove(cardname)
+
+        # place the card on the field or into the graveyard, as appropriate
+        if cardname == ba:
+            self.banes.add()
+            self.log(ev_play,ba)
+        if cardname == md:
+            if not use_altcost:
+                self.mulls.add()
+                self.log(ev_play,md)
+            else:
+                self.grave.add(md)
+                self.log(ev_evoke,md)
+        if cardname == bl:
+            self.lands.add()
+            self.log(ev_play,bl)
+
+        # additional effects
+        if cardname == md:
+            self.draw(2)
+
+    # attack with a creature
+    def attack(self,cardname):
+
+        # check that we know this card at all
+        if cardname not in codes:
+            raise Exception("Card not recognized!")
+
+        # make sure we're not attacking with a land
+        if cardname == bl:
+            raise Exception("Lands can't attack!")
+
+        # check that you have the card on the field
+        if len(self.field(cardname)) < 1:
+            raise Exception("You can't attack with a creature that's not on the field!")
+
+        # check that the creature isn't tapped and doesn't have summoning sickness
+        if self.count_ready(cardname) < 1:
+            raise Exception("You have no "+cardname+"s able to attack!")
+
+        # otherwise, attack with it
+        self.field(cardname).tap()
+        self.log(ev_attack,cardname)
+
+        # additional effects
+        if cardname == ba:
+            self.gain_life(5)
+
+    # reset things at the beginning of the turn
+    def start_turn(self):
+
+        # log the start of the turn
+        self.turncount += 1
+        self.log(ev_turn,self.turncount)
+
+        # untap everything and remove summoning sickness
+        self.lands.reset()
+        self.banes.reset()
+        self.mulls.reset()
+
+        # draw a card
+        self.draw(1)
+
+###################################################
+# fast-forwarding
+
+def frozen(p):
     """
-    Play out a game.
+    Whether a player can no longer do anything under Ruleset 01 but play a
+    land and draw one card each turn: no Baneslayers on the field or that
+    could ever be cast, and no Mulldrifters that could ever be cast.
     """
 
-    ######################################
-    # first turns
+    if len(p.banes) > 0:
+        return False
+    hand = p.hand_counts()
+    library = p.deck.count_codes()
+    N_lands = len(p.lands) + hand[2] + library[2]
+    if (hand[0] + library[0] > 0) & (N_lands >= 5):
+        return False
+    if (hand[1] + library[1] > 0) & (N_lands >= 3) & (p.decksize() >= 2):
+        return False
+    return True
+
+def fast_forward_game(p1,p2):
+    """
+    If neither player can change anything but how many cards are left in
+    their library, end the game right away, just before p1's turn.  Whoever
+    runs out of cards first loses via milling, and p1 draws first.  Returns
+    whether the game was ended.
+    """
 
-    # first turn for player 1
-    p1.first_turn()
-    cardplay_ruleset(p1,p2)
-    combat_ruleset(p1,p2)
-    discard_ruleset(p1,p2)
-    p1.log_boardstate()
+    if (len(p1.banes) > 0) or (len(p2.banes) > 0) or (not frozen(p1)) or (not frozen(p2)):
+        return False
+
+    # p1 survives one draw per card in library, and loses on the next one
+    N1 = p1.decksize()
+    N2 = p2.decksize()
+    if N1 <= N2:
+        loser, turns1, turns2 = p1, N1+1, N1
+    else:
+        loser, turns1, turns2 = p2, N2+1, N2+1
+    for p, turns in ((p1,turns1),(p2,turns2)):
+        p.log(ev_fast_forward,turns)
+        p.turncount += turns
+        p.fast_forwarded = True
+    loser.alive = False
+    loser.log(ev_mill,1)
+    loser.loss_reason = 'mill'
+    return True
 
-    # first turn for player 2
-    p2.start_turn()
-    cardplay_ruleset(p2,p1)
-    combat_ruleset(p2,p1)
-    discard_ruleset(p2,p1)
-    p2.log_boardstate()
+###################################################
+# gameplay functions
 
-    # subsequent turns
-    while (p1.alive & p2.alive):
+# the phases of a turn, in order
+phases = ('start','cardplay','combat','discard')
+
+# functions called before and after every phase, and around whole games, as
+# (before, after) pairs; each is called with (active, opponent, phase)
+hooks = dict([(phase,[]) for phase in phases + ('game',)])
+
+def add_hook(phase,before=None,after=None):
+    """
+    Register functions to call before and/or after a phase (one of phases,
+    or 'game' for a whole game) in every game played from now on.
+    """
+
+    if phase not in hooks:
+        raise Exception("Phase not recognized!")
+    hooks[phase].append((before,after))
+
+def remove_hook(phase,before=None,after=None):
+    """
+    Stop calling a pair of functions registered with add_hook.
+    """
+
+    hooks[phase].remove((before,after))
+
+def call_hooks(phase,which,active,opponent):
+    """
+    Call the before (which=0) or after (which=1) functions hooked to a phase.
+    """
 
-        ######################################
-        # first player's turn
+    for pair in hooks[phase]:
+        if pair[which] is not None:
+            pair[which](active,opponent,phase)
 
-        # alive check
-        if not p1.alive:
-            break
+def run_phase(phase,function,active,opponent):
+    """
+    Run one phase of a turn, with any hooks around it.
+    """
 
-        # begin the turn
-        p1.start_turn()
+    if not hooks[phase]:
+        function(active,opponent)
+        return
+    call_hooks(phase,0,active,opponent)
+    function(active,opponent)
+    call_hooks(phase,1,active,opponent)
 
-        # alive check
-        if not p1.alive:
-            break
+# the start of a turn, as a phase
+def start_turn(active,opponent):
+    active.start_turn()
 
-        # play things
-        cardplay_ruleset(p1,p2)
+# the start of the first player's first turn, as a phase
+def first_turn(active,opponent):
+    active.first_turn()
 
-        # alive check
-        if not p1.alive:
-            break
+def play_turn(active,opponent,cardplay_ruleset,combat_ruleset,discard_ruleset,phase='start'):
+    """
+    Play the active player's turn, starting from the given phase, and
+    stopping early if the active player dies.
+    """
 
-        # combat
-        combat_ruleset(p1,p2)
+    start = phases.index(phase)
 
-        # alive check
-        if not p1.alive:
-            break
+    # begin the turn
+    if start <= 0:
+        run_phase('start',start_turn,active,opponent)
+        if not active.alive:
+            return
 
-        # end turn
-        discard_ruleset(p1,p2)
-        p1.log_boardstate()
+    # play things
+    if start <= 1:
+        run_phase('cardplay',cardplay_ruleset,active,opponent)
+        if not active.alive:
+            return
 
-        ######################################
-        # second player's turn
+    # combat
+    if start <= 2:
+        run_phase('combat',combat_ruleset,active,opponent)
+        if not active.alive:
+            return
 
-        # alive check
-        if not p2.alive:
-            break
+    # end turn
+    run_phase('discard',discard_ruleset,active,opponent)
+    active.log_boardstate()
 
-        # begin the turn
-        p2.start_turn()
+def play_turns(p1,p2,cardplay_ruleset,combat_ruleset,discard_ruleset,fast_forward=False):
+    """
+    Alternate full turns, starting with p1's, until one of the players dies.
+    """
 
-        # alive check
-        if not p2.alive:
-            break
+    while (p1.alive & p2.alive):
+        for active, opponent in ((p1,p2),(p2,p1)):
 
-        # play things
-        cardplay_ruleset(p2,p1)
+            # skip ahead if the game is decided
+            if fast_forward and fast_forward_game(active,opponent):
+                break
 
-        # alive check
-        if not p2.alive:
-            break
+            play_turn(active,opponent,cardplay_ruleset,combat_ruleset,discard_ruleset)
+            if not (active.alive & opponent.alive):
+                break
 
-        # combat
-        combat_ruleset(p2,p1)
 
-        # alive check
-        if not p2.alive:
-            break
+def play_game(p1,p2,cardplay_ruleset=None,combat_ruleset=None,discard_ruleset=None,verbose=False,loglevel=None,fast_forward=False):
+    """
+    Play out a game.
+
+    If loglevel is given (log_off, log_events or log_full), it overrides the
+    log level of both players for this game.  If fast_forward is set, a Ruleset
+    01 game that only milling can still decide is ended as soon as it gets
+    there (see fast_forward_game), and both players are flagged as
+    fast_forwarded.
+    """
 
-        # end turn
-        discard_ruleset(p2,p1)
-        p2.log_boardstate()
+    if loglevel is not None:
+        p1.loglevel = loglevel
+        p2.loglevel = loglevel
+
+    ######################################
+    # first turns
+
+    call_hooks('game',0,p1,p2)
+
+    # first turn for player 1
+    run_phase('start',first_turn,p1,p2)
+    run_phase('cardplay',cardplay_ruleset,p1,p2)
+    run_phase('combat',combat_ruleset,p1,p2)
+    run_phase('discard',discard_ruleset,p1,p2)
+    p1.log_boardstate()
+
+    # first turn for player 2
+    run_phase('start',start_turn,p2,p1)
+    run_phase('cardplay',cardplay_ruleset,p2,p1)
+    run_phase('combat',combat_ruleset,p2,p1)
+    run_phase('discard',discard_ruleset,p2,p1)
+    p2.log_boardstate()
+
+    # subsequent turns
+    play_turns(p1,p2,cardplay_ruleset,combat_ruleset,discard_ruleset,fast_forward)
 
     ######################################
     # return the results
@@ -570,4 +1297,45 @@ def play_game(p1,p2,cardplay_ruleset=None,combat_ruleset=None,discard_ruleset=No
         winner = 0
         loss_reason = None
 
+    call_hooks('game',1,p1,p2)
     return p1, p2, winner, loss_reason
+
+def rollout(active,opponent,cardplay_ruleset,combat_ruleset,discard_ruleset,phase='cardplay',fast_forward=False):
+    """
+    Play out the rest of a game from the middle of the active player's turn,
+    starting with the given phase (see phases).  Returns the winner: 1 if it's
+    the active player, 2 if it's the opponent, and 0 for a draw.  Together with
+    player.snapshot and player.restore, this lets a ruleset try out several
+    continuations of a game before deciding what to do.
+    """
+
+    play_turn(active,opponent,cardplay_ruleset,combat_ruleset,discard_ruleset,phase)
+    if active.alive & opponent.alive:
+        play_turns(opponent,active,cardplay_ruleset,combat_ruleset,discard_ruleset,fast_forward)
+    if active.alive & (not opponent.alive):
+        return 1
+    if opponent.alive & (not active.alive):
+        return 2
+    return 0
+
+###################################################
+# replaying games
+
+def replay_game(seed_key,deck1,deck2,cardplay_ruleset=None,combat_ruleset=None,discard_ruleset=None,compact=False,loglevel=log_full):
+    """
+    Replay a single game from its (seed, matchup index, game index) key.
+
+    Both decks are shuffled, deck1 first, with the game's own random number
+    generator; deck1's player goes first in even-numbered games and second
+    in odd-numbered ones.  Returns the same as play_game, so the full
+    gamelog of each player can be inspected.
+    """
+
+    seed, matchup, game = seed_key
+    game_generator = game_rng(seed,matchup,game)
+    p1 = player(deck(*deck1,compact=compact,rng=game_generator),loglevel=loglevel)
+    p2 = player(deck(*deck2,compact=compact,rng=game_generator),loglevel=loglevel)
+    if game % 2 == 1:
+        p1, p2 = p2, p1
+
+    return play_game(p1,p2,cardplay_ruleset,combat_ruleset,discard_ruleset)
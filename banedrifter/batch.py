@@ -0,0 +1,500 @@
+###################################################
+# imports
+
+import numpy as np
+import banedrifter as bd
+import rulesets as rs
+import tables as tb
+
+###################################################
+# useful constants
+
+# integer codes for the cards in a batch library
+i_ba = 0
+i_md = 1
+i_bl = 2
+
+# integer codes for the ways a game can be lost
+loss_none = 0
+loss_life = 1
+loss_mill = 2
+
+# the play_game form of each loss code
+loss_reasons = np.array([None,'life','mill'],dtype=object)
+
+# the decision table the batch discard phase is read from
+discard_table = tb.get_table(rs.discard_01,hand_only=True)
+
+###################################################
+# batch seat class
+
+class seat:
+    """
+    The zone counts for one seat across a batch of games
+    """
+
+    def __init__(self,specs,rng,handsize=7,orders=None,lazy=False,hands=None):
+
+        # an opening hand given up front is taken out of the deck before it's shuffled
+        specs = np.asarray(specs,dtype=np.int64)
+        if hands is not None:
+            hands = np.asarray(hands,dtype=np.int64).reshape(-1,3)
+            if (orders is not None) or (hands > specs).any():
+                raise Exception("These opening hands can't be drawn from these decks!")
+            specs = specs - hands
+        N_games = len(specs)
+        decksize = specs.sum(axis=1)
+        self.rng = rng
+
+        # how many of each card code are left in every library; a lazy
+        # library is nothing more, and every card is picked at random from
+        # these counts as it's drawn
+        self.library = None
+        self.library_counts = specs.copy()
+
+        # otherwise, lay out every library as (banes, mulls, lands, padding)
+        # and shuffle each row, either at random or into the given orders
+        if not lazy:
+            width = max(int(decksize.max()),1)
+            slots = np.arange(width)
+            self.library = np.full((N_games,width),-1,dtype=np.int8)
+            self.library[slots < specs[:,:1]] = i_ba
+            self.library[(slots >= specs[:,:1]) & (slots < specs[:,:2].sum(axis=1,keepdims=True))] = i_md
+            self.library[(slots >= specs[:,:2].sum(axis=1,keepdims=True)) & (slots < decksize[:,None])] = i_bl
+            if orders is None:
+                keys = rng.random((N_games,width))
+                keys[slots >= decksize[:,None]] = 2.0
+                orders = np.argsort(keys,axis=1)
+            self.library = np.take_along_axis(self.library,orders,axis=1)
+
+        # position of the top card and number of cards left in each library
+        self.top = np.zeros(N_games,dtype=np.int64)
+        self.remaining = decksize.copy()
+
+        # cards in hand, counted by card code
+        self.hand = np.zeros((N_games,3),dtype=np.int64)
+
+        # permanents on the field
+        self.lands = np.zeros(N_games,dtype=np.int64)
+        self.untapped = np.zeros(N_games,dtype=np.int64)
+        self.mulls = np.zeros(N_games,dtype=np.int64)
+        self.banes = np.zeros(N_games,dtype=np.int64)
+        self.banes_tapped = np.zeros(N_games,dtype=np.int64)
+        self.banes_sick = np.zeros(N_games,dtype=np.int64)
+
+        # everything else
+        self.grave = np.zeros(N_games,dtype=np.int64)
+        self.life = np.full(N_games,20,dtype=np.int64)
+        self.alive = np.ones(N_games,dtype=bool)
+        self.loss_reason = np.zeros(N_games,dtype=np.int8)
+        self.turncount = np.zeros(N_games,dtype=np.int64)
+
+        # start with a hand of cards drawn from the deck
+        if hands is not None:
+            self.hand[:] = hands
+            return
+        everyone = np.arange(N_games)
+        for i in range(handsize):
+            self.draw(everyone[self.remaining > 0])
+
+    # draw one card in each of the games g
+    def draw(self,g):
+        if self.library is None:
+            u = self.rng.random(len(g))*self.remaining[g]
+            codes = (u >= self.library_counts[g,i_ba]).astype(np.int64) + (u >= self.library_counts[g,i_ba] + self.library_counts[g,i_md])
+        else:
+            codes = self.library[g,self.top[g]]
+        self.library_counts[g,codes] -= 1
+        self.top[g] += 1
+        self.remaining[g] -= 1
+        self.hand[g,codes] += 1
+
+    # reset things at the beginning of the turn in each of the games g
+    def start_turn(self,g):
+        self.turncount[g] += 1
+        self.untapped[g] = self.lands[g]
+        self.banes_tapped[g] = 0
+        self.banes_sick[g] = 0
+
+        # players with an empty library lose via milling
+        milled = self.remaining[g] < 1
+        self.alive[g[milled]] = False
+        self.loss_reason[g[milled]] = loss_mill
+        self.draw(g[~milled])
+
+    # which of the games g this seat can no longer do anything in but play a
+    # land and draw a card each turn (see banedrifter.frozen)
+    def frozen(self,g):
+        N_lands = self.lands[g] + self.hand[g,i_bl] + self.library_counts[g,i_bl]
+        banes = (self.banes[g] > 0) | ((self.hand[g,i_ba] + self.library_counts[g,i_ba] > 0) & (N_lands >= 5))
+        mulls = (self.hand[g,i_md] + self.library_counts[g,i_md] > 0) & (N_lands >= 3) & (self.remaining[g] >= 2)
+        return ~(banes | mulls)
+
+###################################################
+# batch rulesets
+
+def cardplay_01(p1,p2,g):
+
+    everyone = g
+
+    # start by playing a land
+    gl = g[p1.hand[g,i_bl] > 0]
+    p1.hand[gl,i_bl] -= 1
+    p1.lands[gl] += 1
+    p1.untapped[gl] += 1
+
+    # then try to play cards regularly
+    while len(g) > 0:
+
+        # play as many Baneslayer Angels as possible
+        N_cast = np.minimum(p1.hand[g,i_ba],p1.untapped[g]//5)
+        p1.hand[g,i_ba] -= N_cast
+        p1.banes[g] += N_cast
+        p1.banes_sick[g] += N_cast
+        p1.untapped[g] -= 5*N_cast
+
+        # if there's still mana open, play a Mulldrifter
+        g = g[(p1.untapped[g] >= 5) & (p1.hand[g,i_md] > 0) & (p1.remaining[g] >= 2)]
+        p1.hand[g,i_md] -= 1
+        p1.mulls[g] += 1
+        p1.untapped[g] -= 5
+        p1.draw(g)
+        p1.draw(g)
+
+    # otherwise, try to evoke a Mulldrifter
+    g = everyone
+    while len(g) > 0:
+        g = g[(p1.untapped[g] >= 3) & (p1.hand[g,i_md] > 0) & (p1.remaining[g] >= 2)]
+        p1.hand[g,i_md] -= 1
+        p1.grave[g] += 1
+        p1.untapped[g] -= 3
+        p1.draw(g)
+        p1.draw(g)
+
+def combat_01(p1,p2,g):
+
+    # attack with all Baneslayers that are able to
+    N_attacking = p1.banes[g] - p1.banes_sick[g]
+    p1.banes_tapped[g] = N_attacking
+    p1.life[g] += 5*N_attacking
+
+    # the opposing player blocks with as many untapped Baneslayers as possible
+    N_blocking = p2.banes[g] - p2.banes_tapped[g]
+    N_dead = np.minimum(N_attacking,N_blocking)
+    p2.life[g] += 5*N_dead
+    p2.life[g] -= 5*np.maximum(N_attacking-N_blocking,0)
+
+    # blocked attackers and the blockers that met them die
+    p1.banes[g] -= N_dead
+    p1.banes_tapped[g] -= N_dead
+    p1.grave[g] += N_dead
+    p2.banes[g] -= N_dead
+    p2.grave[g] += N_dead
+
+    # the opposing player may have lost via life total
+    dead = g[(N_attacking > N_blocking) & (p2.life[g] <= 0)]
+    p2.alive[dead] = False
+    p2.loss_reason[dead] = loss_life
+
+def discard_01(p1,p2,g):
+
+    # look up the whole discard phase in the compiled rulesets.discard_01
+    g = g[p1.hand[g].sum(axis=1) > 7]
+    if len(g) == 0:
+        return
+    hands = p1.hand[g]
+    discards = discard_table.discard_array(int(hands.sum(axis=1).max()))[hands[:,0],hands[:,1],hands[:,2]]
+    p1.hand[g] -= discards
+    p1.grave[g] += discards.sum(axis=1)
+
+###################################################
+# batch ruleset variants
+
+class variant_table:
+    """
+    The parameters of a set of ruleset variants (see
+    rulesets.ruleset_params), laid out per game, so that every game of a
+    batch can be played under its own variant
+    """
+
+    def __init__(self,variants,variant):
+
+        variants = [rs.check_params(params) for params in variants]
+
+        # the variant each game is played under
+        self.variant = np.asarray(variant,dtype=np.int64)
+
+        # every parameter of every game
+        self.land_first = np.array([params.land_first for params in variants],dtype=bool)[self.variant]
+        self.cast_at = np.array([params.cast_at for params in variants],dtype=np.int64)[self.variant]
+        self.evoke_at = np.array([params.evoke_at for params in variants],dtype=np.int64)[self.variant]
+        self.max_hand = np.array([params.max_hand for params in variants],dtype=np.int64)[self.variant]
+        self.max_blocks = np.array([np.iinfo(np.int64).max if params.max_blocks is None else params.max_blocks for params in variants],dtype=np.int64)[self.variant]
+
+        # each variant's discard phase is read from the decision table of
+        # its object-engine ruleset, as with discard_01
+        self.tables = [tb.get_table(rs.make_rulesets(params)[2],hand_only=True) for params in variants]
+        self.arrays = dict()
+
+    # discard counts for every variant and hand of up to max_hand cards
+    def discard_array(self,max_hand):
+        size = 8
+        while size < max_hand:
+            size *= 2
+        if size not in self.arrays:
+            self.arrays[size] = np.stack([table.discard_array(size) for table in self.tables])
+        return self.arrays[size]
+
+def cardplay_variant(p1,p2,g,params):
+
+    everyone = g
+
+    # start by playing a land, in the games whose variant does
+    gl = g[params.land_first[g] & (p1.hand[g,i_bl] > 0)]
+    p1.hand[gl,i_bl] -= 1
+    p1.lands[gl] += 1
+    p1.untapped[gl] += 1
+
+    # then try to play cards regularly, as long as there are cast_at lands untapped
+    while len(g) > 0:
+
+        # play as many Baneslayer Angels as possible
+        N_cast = np.minimum(p1.hand[g,i_ba],np.maximum((p1.untapped[g] - params.cast_at[g])//5 + 1,0))
+        p1.hand[g,i_ba] -= N_cast
+        p1.banes[g] += N_cast
+        p1.banes_sick[g] += N_cast
+        p1.untapped[g] -= 5*N_cast
+
+        # if there's still mana open, play a Mulldrifter
+        g = g[(p1.untapped[g] >= params.cast_at[g]) & (p1.hand[g,i_md] > 0) & (p1.remaining[g] >= 2)]
+        p1.hand[g,i_md] -= 1
+        p1.mulls[g] += 1
+        p1.untapped[g] -= 5
+        p1.draw(g)
+        p1.draw(g)
+
+    # otherwise, try to evoke a Mulldrifter
+    g = everyone
+    while len(g) > 0:
+        g = g[(p1.untapped[g] >= params.evoke_at[g]) & (p1.hand[g,i_md] > 0) & (p1.remaining[g] >= 2)]
+        p1.hand[g,i_md] -= 1
+        p1.grave[g] += 1
+        p1.untapped[g] -= 3
+        p1.draw(g)
+        p1.draw(g)
+
+    # the land comes last in the other games
+    gl = everyone[~params.land_first[everyone] & (p1.hand[everyone,i_bl] > 0)]
+    p1.hand[gl,i_bl] -= 1
+    p1.lands[gl] += 1
+    p1.untapped[gl] += 1
+
+def combat_variant(p1,p2,g,params):
+
+    # attack with all Baneslayers that are able to
+    N_attacking = p1.banes[g] - p1.banes_sick[g]
+    p1.banes_tapped[g] = N_attacking
+    p1.life[g] += 5*N_attacking
+
+    # the opposing player blocks with as many untapped Baneslayers as its variant allows
+    N_blocking = np.minimum(p2.banes[g] - p2.banes_tapped[g],params.max_blocks[g])
+    N_dead = np.minimum(N_attacking,N_blocking)
+    p2.life[g] += 5*N_dead
+    p2.life[g] -= 5*np.maximum(N_attacking-N_blocking,0)
+
+    # blocked attackers and the blockers that met them die
+    p1.banes[g] -= N_dead
+    p1.banes_tapped[g] -= N_dead
+    p1.grave[g] += N_dead
+    p2.banes[g] -= N_dead
+    p2.grave[g] += N_dead
+
+    # the opposing player may have lost via life total
+    dead = g[(N_attacking > N_blocking) & (p2.life[g] <= 0)]
+    p2.alive[dead] = False
+    p2.loss_reason[dead] = loss_life
+
+def discard_variant(p1,p2,g,params):
+
+    # look up the whole discard phase in each game's variant's decision table
+    g = g[p1.hand[g].sum(axis=1) > params.max_hand[g]]
+    if len(g) == 0:
+        return
+    hands = p1.hand[g]
+    discards = params.discard_array(int(hands.sum(axis=1).max()))[params.variant[g],hands[:,0],hands[:,1],hands[:,2]]
+    p1.hand[g] -= discards
+    p1.grave[g] += discards.sum(axis=1)
+
+###################################################
+# reproducible shuffles
+
+def random_orders(decks,N_games,rng):
+    """
+    Library orders for N_games games of every deck, shuffled with rng the
+    same way a seat shuffles its own.  Returns one row per deck and game,
+    decks outermost, for passing to play_games_batch.
+    """
+
+    decks = np.asarray(decks,dtype=np.int64).reshape(-1,3)
+    decksize = np.repeat(decks.sum(axis=1),N_games)
+    width = max(int(decks.sum(axis=1).max()),1)
+    keys = rng.random((len(decksize),width))
+    keys[np.arange(width) >= decksize[:,None]] = 2.0
+    return np.argsort(keys,axis=1)
+
+def game_orders(decks1,decks2,seed,matchups,games):
+    """
+    The order each deck of a set of games is shuffled into by its own
+    (seed, matchup index, game index) random number generator, exactly as
+    banedrifter.replay_game would shuffle it: deck1 first, then deck2.
+    Returns one (N, width) array of library orders per deck, for passing to
+    play_games_batch.
+    """
+
+    decks1 = np.asarray(decks1,dtype=np.int64).reshape(-1,3)
+    decks2 = np.asarray(decks2,dtype=np.int64).reshape(-1,3)
+    orders = list()
+    for decks in (decks1,decks2):
+        width = max(int(decks.sum(axis=1).max()),1)
+        orders.append(np.tile(np.arange(width),(len(games),1)))
+    for k, (matchup, game) in enumerate(zip(matchups,games)):
+        game_generator = bd.game_rng(seed,int(matchup),int(game))
+        for decks, order in zip((decks1,decks2),orders):
+            N = decks[k].sum()
+            order[k,:N] = game_generator.permutation(N)
+    return orders[0], orders[1]
+
+def common_orders(decks,seed,stream,games):
+    """
+    Library orders built from random keys that depend only on (seed, stream,
+    game index), not on the deck: card slot k of every deck in game g gets the
+    same key, and the library is the slots sorted by key.  Libraries are laid
+    out as (banes, mulls, lands), so the libraries of two decks of the same
+    size differ in exactly as many positions as their layouts do: |change in
+    N_bane| + |change in N_land|.  Trading a Baneslayer or a land for a
+    Mulldrifter changes a single position, while trading a Baneslayer for a
+    land changes two.  Differences between neighboring decks are thus
+    measured with common random numbers.  Returns one row per deck and game,
+    decks outermost, for passing to play_games_batch.
+    """
+
+    decks = np.asarray(decks,dtype=np.int64).reshape(-1,3)
+    games = np.asarray(games,dtype=np.int64)
+    decksize = decks.sum(axis=1)
+    width = max(int(decksize.max()),1)
+
+    # the keys come in blocks of 1024 games by 64 card slots, so that a
+    # game's keys don't depend on which other games are played or on the
+    # size of the widest deck
+    keys = np.zeros((len(games),width))
+    for block in np.unique(games//1024):
+        inblock = (games//1024 == block)
+        for column in range(0,width,64):
+            blockkeys = np.random.default_rng(np.random.SeedSequence(seed,spawn_key=(stream,int(block),column//64))).random((1024,64))
+            keys[inblock,column:column+64] = blockkeys[games[inblock] % 1024,:min(64,width-column)]
+
+    keys = np.tile(keys,(len(decks),1))
+    keys[np.arange(width) >= np.repeat(decksize,len(games))[:,None]] = 2.0
+    return np.argsort(keys,axis=1,kind='stable')
+
+###################################################
+# gameplay function
+
+def play_games_batch(decks1,decks2,N_games,rng=None,orders1=None,orders2=None,lazy=False,fast_forward=True,hands1=None,hands2=None,variants=None):
+    """
+    Play out many games at once, in lockstep.
+
+    decks1 and decks2 are either a single (N_bane, N_mull, N_land) triple or a
+    list of them, one per matchup; N_games games are played for every matchup,
+    always with the decks1 player going first.  Returns the winner (0, 1 or 2)
+    and loss reason (None, 'life' or 'mill') of every game, in the same form as
+    play_game, as arrays of shape (N_matchups, N_games), or (N_games,) when both
+    decks are given as single triples.
+
+    Libraries are shuffled with rng unless orders1 and orders2 give the
+    order of every game's library (as from game_orders), one row per game.
+    If lazy is set, libraries aren't shuffled at all; every card is picked
+    at random from what's left as it's drawn, so that the cost of a game
+    doesn't grow with the size of the decks.  hands1 and hands2 can fix
+    the opening hand of every game, as (N_bane, N_mull, N_land) counts with
+    one row per game; the rest of each deck is then shuffled as usual.
+
+    Games that only milling can still decide are ended as soon as they get
+    there, as in banedrifter.fast_forward_game, unless fast_forward is unset;
+    this never changes a game's result.
+
+    Ruleset 01 is played unless variants gives a variant_table with the
+    ruleset variant of every game, matchups outermost.
+    """
+
+    if rng is None:
+        rng = bd.rng
+    if lazy and ((orders1 is not None) or (orders2 is not None)):
+        raise Exception("Lazy libraries can't be drawn in a given order!")
+
+    # one row of deck specs per game
+    decks1 = np.asarray(decks1,dtype=np.int64)
+    decks2 = np.asarray(decks2,dtype=np.int64)
+    single = (decks1.ndim == 1) & (decks2.ndim == 1)
+    decks1, decks2 = np.broadcast_arrays(np.atleast_2d(decks1),np.atleast_2d(decks2))
+    shape = (len(decks1),N_games)
+    p1 = seat(np.repeat(decks1,N_games,axis=0),rng,orders=orders1,lazy=lazy,hands=hands1)
+    p2 = seat(np.repeat(decks2,N_games,axis=0),rng,orders=orders2,lazy=lazy,hands=hands2)
+    everyone = np.arange(len(p1.life))
+    cardplay, combat, discard = cardplay_01, combat_01, discard_01
+    if variants is not None:
+        if len(variants.variant) != len(everyone):
+            raise Exception("Every game needs a ruleset variant!")
+        cardplay = lambda active, opponent, g: cardplay_variant(active,opponent,g,variants)
+        combat = lambda active, opponent, g: combat_variant(active,opponent,g,variants)
+        discard = lambda active, opponent, g: discard_variant(active,opponent,g,variants)
+
+    ######################################
+    # first turns
+
+    # first turn for player 1
+    p1.turncount += 1
+    cardplay(p1,p2,everyone)
+    combat(p1,p2,everyone)
+    discard(p1,p2,everyone)
+
+    # first turn for player 2
+    p2.start_turn(everyone)
+    cardplay(p2,p1,everyone)
+    combat(p2,p1,everyone)
+    discard(p2,p1,everyone)
+
+    # subsequent turns, played only in the games that are still going
+    g = everyone[p1.alive & p2.alive]
+    while len(g) > 0:
+        for active, opponent in ((p1,p2),(p2,p1)):
+
+            # skip ahead in the games that are decided; whoever runs out of cards first loses
+            if fast_forward:
+                gf = g[active.frozen(g) & opponent.frozen(g)]
+                if len(gf) > 0:
+                    loser = np.where(active.remaining[gf] <= opponent.remaining[gf],1,2)
+                    for seat_, code in ((active,1),(opponent,2)):
+                        seat_.alive[gf[loser == code]] = False
+                        seat_.loss_reason[gf[loser == code]] = loss_mill
+                    g = g[active.alive[g] & opponent.alive[g]]
+
+            active.start_turn(g)
+            g = g[active.alive[g]]
+            cardplay(active,opponent,g)
+            combat(active,opponent,g)
+            discard(active,opponent,g)
+            g = g[opponent.alive[g]]
+
+    ######################################
+    # return the results
+
+    winner = np.zeros(len(everyone),dtype=np.int8)
+    winner[p1.alive & ~p2.alive] = 1
+    winner[p2.alive & ~p1.alive] = 2
+    loss_code = np.where(winner == 1,p2.loss_reason,np.where(winner == 2,p1.loss_reason,loss_none))
+    loss_reason = loss_reasons[loss_code]
+
+    if single:
+        return winner, loss_reason
+    return winner.reshape(shape), loss_reason.reshape(shape)
@@ -0,0 +1,255 @@
+###################################################
+# imports
+
+import sys
+import json
+import time
+import platform
+import argparse
+import numpy as np
+import banedrifter as bd
+import rulesets as rs
+import tables as tb
+import batch
+
+###################################################
+# useful constants
+
+# representative matchups of 40-card decks, as (N_bane, N_mull, N_land) pairs
+matchups = {'mirror': ((12,12,16),(12,12,16)),
+            'mill_heavy': ((2,24,14),(2,24,14)),
+            'bane24_land16': ((24,0,16),(24,0,16)),
+            'few_lands': ((20,16,4),(12,12,16))}
+
+# board sizes (Baneslayers ready to attack) for the combat benchmarks, and
+# hand sizes for the discard benchmarks
+board_sizes = (1,5,20)
+hand_sizes = (10,30,100)
+
+###################################################
+# setting up players
+
+def stacked_player(hand_counts,library_counts=(0,0,0),N_lands=0,N_banes=0,compact=True):
+    """
+    A player holding a known hand, with a library of known card counts and
+    some untapped lands and ready Baneslayers already on the field.
+    """
+
+    hand_codes = np.repeat(np.arange(3,dtype=np.int8),hand_counts)
+    library_codes = np.repeat(np.arange(3,dtype=np.int8),library_counts)
+    starting_deck = bd.deck(0,0,0,compact=compact)
+    if compact:
+        starting_deck.cards = np.concatenate((hand_codes,library_codes))
+    else:
+        starting_deck.cards = np.array([bd.card(bd.codenames[code]) for code in np.concatenate((hand_codes,library_codes))],dtype=object)
+    p = bd.player(starting_deck,handsize=len(hand_codes),loglevel=bd.log_off)
+
+    # lands and Baneslayers that have been on the field since last turn
+    if compact:
+        p.lands.counts = [[N_lands, 0], [0, 0]]
+        p.banes.counts = [[N_banes, 0], [0, 0]]
+    else:
+        p.lands = np.array([ready_card(bd.bl) for i in range(N_lands)],dtype=object)
+        p.banes = np.array([ready_card(bd.ba) for i in range(N_banes)],dtype=object)
+    return p
+
+def ready_card(cardname):
+    """
+    A card that's been on the field since last turn.
+    """
+
+    c = bd.card(cardname)
+    c.sick = False
+    return c
+
+###################################################
+# timing
+
+def timeit(setup,run,min_time=0.2,repeats=5,ops_per_run=1):
+    """
+    Seconds per operation of run(state), for states made beforehand by
+    setup(i).  Runs are batched until a batch takes at least min_time, and
+    the fastest of several batches is kept.
+    """
+
+    N = 1
+    while True:
+        states = [setup(i) for i in range(N)]
+        start = time.perf_counter()
+        for state in states:
+            run(state)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        N *= 2 if elapsed <= 0 else min(max(int(1.2*min_time/elapsed),2),100)
+
+    best = elapsed
+    for repeat in range(repeats-1):
+        states = [setup(i) for i in range(N)]
+        start = time.perf_counter()
+        for state in states:
+            run(state)
+        best = min(best,time.perf_counter() - start)
+    return best/(N*ops_per_run)
+
+###################################################
+# benchmarks
+
+def benchmarks(seed=0,batch_games=2000):
+    """
+    Every benchmark, as a dictionary of name -> (setup, run, ops_per_run,
+    unit).  Engine-level benchmarks are run for both object and compact
+    players.
+    """
+
+    cases = dict()
+    for engine, compact in (('object',False),('compact',True)):
+
+        # building and shuffling a deck
+        generator = np.random.default_rng(seed)
+        cases['deck_shuffle_'+engine] = (lambda i: None,
+                                         lambda state, compact=compact, generator=generator: bd.deck(12,12,16,compact=compact,rng=generator),
+                                         1,'decks')
+
+        # drawing a card
+        cases['draw_'+engine] = (lambda i, compact=compact: stacked_player((0,0,0),(12,12,16),compact=compact),
+                                 lambda p: p.draw(1),
+                                 1,'draws')
+
+        # casting a Baneslayer and evoking a Mulldrifter
+        cases['cast_'+engine] = (lambda i, compact=compact: stacked_player((1,0,0),N_lands=5,compact=compact),
+                                 lambda p: p.play(bd.ba),
+                                 1,'plays')
+        cases['evoke_'+engine] = (lambda i, compact=compact: stacked_player((0,1,0),(4,4,4),N_lands=3,compact=compact),
+                                  lambda p: p.play(bd.md,use_altcost=True),
+                                  1,'plays')
+
+        # combat, with half as many blockers as attackers
+        for N in board_sizes:
+            cases['combat_%d_%s' % (N,engine)] = (lambda i, N=N, compact=compact: (stacked_player((0,0,0),N_banes=N,compact=compact),
+                                                                                    stacked_player((0,0,0),N_banes=N//2,compact=compact)),
+                                                  lambda players: rs.combat_01(*players),
+                                                  1,'combats')
+
+        # discarding down from a large hand
+        for N in hand_sizes:
+            cases['discard_%d_%s' % (N,engine)] = (lambda i, N=N, compact=compact: stacked_player((N//2,N//4,N-N//2-N//4),compact=compact),
+                                                   lambda p: rs.discard_01(p,p),
+                                                   1,'discards')
+
+    # whole games with the original rulesets on object players, with the
+    # compiled ones on compact players (as in sweeps), and with the batch engine
+    compiled_rulesets = tb.compile_rulesets((rs.cardplay_01,rs.combat_01,rs.discard_01))
+    for k, (name, (deck1, deck2)) in enumerate(matchups.items()):
+        for engine, compact, which, fast_forward in (('object',False,(rs.cardplay_01,rs.combat_01,rs.discard_01),False),
+                                                     ('compact',True,compiled_rulesets,True)):
+            cases['game_%s_%s' % (name,engine)] = (lambda i, k=k, deck1=deck1, deck2=deck2, compact=compact: game_players(seed,k,i,deck1,deck2,compact),
+                                                   lambda players, which=which, fast_forward=fast_forward: bd.play_game(*players,*which,fast_forward=fast_forward),
+                                                   1,'games')
+        cases['game_%s_batch' % name] = (lambda i, k=k: np.random.default_rng(np.random.SeedSequence(seed,spawn_key=(k,i))),
+                                         lambda generator, deck1=deck1, deck2=deck2: batch.play_games_batch(deck1,deck2,batch_games,rng=generator),
+                                         batch_games,'games')
+
+    return cases
+
+def game_players(seed,matchup,game,deck1,deck2,compact):
+    """
+    The two players of a reproducible game.
+    """
+
+    game_generator = bd.game_rng(seed,matchup,game)
+    p1 = bd.player(bd.deck(*deck1,compact=compact,rng=game_generator),loglevel=bd.log_off)
+    p2 = bd.player(bd.deck(*deck2,compact=compact,rng=game_generator),loglevel=bd.log_off)
+    return (p1,p2)
+
+def run_benchmarks(names=None,seed=0,min_time=0.2,repeats=5,verbose=True):
+    """
+    Run the benchmarks whose names contain any of the given substrings (or
+    all of them), and return the results as a JSON-ready dictionary.
+    """
+
+    results = dict()
+    for name, (setup, run, ops_per_run, unit) in benchmarks(seed).items():
+        if (names is not None) and not any([part in name for part in names]):
+            continue
+        seconds = timeit(setup,run,min_time=min_time,repeats=repeats,ops_per_run=ops_per_run)
+        results[name] = {'per_sec': 1.0/seconds, 'unit': unit, 'seconds': seconds}
+        if verbose:
+            print('%-32s %14.1f %s/sec' % (name,1.0/seconds,unit),file=sys.stderr,flush=True)
+
+    meta = {'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'seed': seed,
+            'min_time': min_time,
+            'repeats': repeats}
+    return {'meta': meta, 'results': results}
+
+###################################################
+# regression tracking
+
+def compare(results,baseline,tolerance=0.1):
+    """
+    Compare benchmark results against a baseline.  Returns a list of (name,
+    baseline rate, new rate, ratio, regressed) for every benchmark in both,
+    where a benchmark has regressed if its rate dropped by more than the
+    tolerance (as a fraction of the baseline rate).
+    """
+
+    rows = list()
+    for name, new in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        old = baseline['results'][name]['per_sec']
+        ratio = new['per_sec']/old
+        rows.append((name,old,new['per_sec'],ratio,ratio < 1.0-tolerance))
+    return rows
+
+def render_comparison(rows):
+    """
+    The rows of a comparison as a text table.
+    """
+
+    lines = ['%-32s %14s %14s %8s' % ('benchmark','baseline/sec','new/sec','ratio')]
+    for name, old, new, ratio, regressed in rows:
+        lines.append('%-32s %14.1f %14.1f %7.2fx%s' % (name,old,new,ratio,'  REGRESSION' if regressed else ''))
+    return '\n'.join(lines)
+
+###################################################
+# command line interface
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Benchmark the simulator hot paths, and check for regressions against a baseline.')
+    parser.add_argument('--output',default=None,help='where to save the results (.json)')
+    parser.add_argument('--baseline',default=None,help='earlier results (.json) to compare against')
+    parser.add_argument('--results',default=None,help='compare these saved results (.json) against the baseline instead of running the benchmarks')
+    parser.add_argument('--tolerance',type=float,default=0.1,help='fractional slowdown beyond which a benchmark counts as a regression')
+    parser.add_argument('--only',nargs='+',default=None,help='only run the benchmarks whose names contain one of these')
+    parser.add_argument('--seed',type=int,default=0,help='seed for the random number generators')
+    parser.add_argument('--mintime',type=float,default=0.2,help='minimum seconds per timed batch')
+    parser.add_argument('--repeats',type=int,default=5,help='number of timed batches per benchmark (the fastest is kept)')
+    args = parser.parse_args(argv)
+
+    if args.results is not None:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        results = run_benchmarks(args.only,seed=args.seed,min_time=args.mintime,repeats=args.repeats)
+    if args.output is not None:
+        with open(args.output,'w') as f:
+            json.dump(results,f,indent=2)
+
+    # a regression fails the run
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results,baseline,tolerance=args.tolerance)
+        print(render_comparison(rows))
+        if any([row[-1] for row in rows]):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
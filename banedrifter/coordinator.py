@@ -0,0 +1,250 @@
+###################################################
+# imports
+
+import os
+import sys
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import multiprocessing
+import numpy as np
+import sweep as sw
+import results
+
+###################################################
+# useful constants
+
+# the status of each work unit in a job database
+job_pending = 0
+job_leased = 1
+job_done = 2
+
+schema = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS units (id INTEGER PRIMARY KEY, cells TEXT, status INTEGER, worker TEXT, lease_until REAL, attempts INTEGER);
+CREATE TABLE IF NOT EXISTS partials (unit INTEGER PRIMARY KEY, worker TEXT, counts BLOB);
+"""
+
+###################################################
+# job database
+
+def connect(path):
+    """
+    Open a job database.  SQLite's default rollback journal is used rather
+    than write-ahead logging, which doesn't work on network filesystems.
+    """
+
+    conn = sqlite3.connect(path,timeout=60.0,isolation_level=None)
+    conn.executescript(schema)
+    return conn
+
+def read_meta(conn):
+    """
+    The sweep settings stored in a job database.
+    """
+
+    return dict([(key,json.loads(value)) for key, value in conn.execute('SELECT key, value FROM meta')])
+
+def create_jobs(path,N_games,decksize=40,N_land=None,engine='batch',unitgames=50000,seed=None,replayable=False,lazy=False,common=False):
+    """
+    Split a Ruleset 01 sweep of all matchups between decks of a given size
+    (or only those running N_land lands) into work units queued in the job
+    database at path.  Every unit's seed is fixed here, so a unit that's
+    played twice (e.g., after its lease ran out) gives the same counts both
+    times.  Settings work as in results.sweep_to_store.
+    """
+
+    if os.path.exists(path):
+        raise Exception("There's already a job database here!")
+    if replayable and (seed is None):
+        raise Exception("A replayable sweep needs a seed!")
+    if common and (seed is None):
+        raise Exception("A sweep with common random numbers needs a seed!")
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+
+    decks = sw.deck_grid(decksize)
+    cells = sw.symmetric_cells(len(decks))
+    if N_land is not None:
+        cells = cells[(decks[cells[:,0],2] == N_land) & (decks[cells[:,1],2] == N_land)]
+    units = sw.make_units(decks,decks,N_games,unitgames=unitgames,cells=cells)
+
+    meta = {'decksize': decksize, 'N_games': N_games, 'engine': engine, 'seed': seed,
+            'replayable': replayable, 'lazy': lazy, 'common': common}
+    conn = connect(path)
+    conn.execute('BEGIN IMMEDIATE')
+    conn.executemany('INSERT INTO meta VALUES (?, ?)',[(key,json.dumps(value)) for key, value in meta.items()])
+    conn.executemany('INSERT INTO units VALUES (?, ?, ?, NULL, 0, 0)',[(k,json.dumps(unit.tolist()),job_pending) for k, unit in enumerate(units)])
+    conn.execute('COMMIT')
+    conn.close()
+    return len(units)
+
+def lease(conn,worker,lease_seconds=600.0):
+    """
+    Take the next unit that's pending, or whose lease has run out because
+    its worker crashed or stalled, and lease it to a worker.  Returns the
+    unit's id and cells, or None if there's nothing left to lease.
+    """
+
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')
+    row = conn.execute('SELECT id, cells FROM units WHERE status = ? OR (status = ? AND lease_until < ?) ORDER BY id LIMIT 1',
+                       (job_pending,job_leased,now)).fetchone()
+    if row is None:
+        conn.execute('COMMIT')
+        return None
+    conn.execute('UPDATE units SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?',
+                 (job_leased,worker,now+lease_seconds,row[0]))
+    conn.execute('COMMIT')
+    return row[0], np.array(json.loads(row[1]),dtype=np.int64).reshape(-1,2)
+
+def complete(conn,unit_id,worker,counts):
+    """
+    Record the counts of a finished unit.  A unit finished more than once
+    only keeps its latest counts, so nothing is ever counted twice.
+    """
+
+    conn.execute('BEGIN IMMEDIATE')
+    conn.execute('INSERT OR REPLACE INTO partials VALUES (?, ?, ?)',(unit_id,worker,np.asarray(counts,dtype=np.int64).tobytes()))
+    conn.execute('UPDATE units SET status = ?, worker = ?, lease_until = 0 WHERE id = ?',(job_done,worker,unit_id))
+    conn.execute('COMMIT')
+
+def progress(conn):
+    """
+    Number of units by status, and the number of times units have been
+    leased in total.
+    """
+
+    N = dict([(status,0) for status in (job_pending,job_leased,job_done)])
+    for status, count in conn.execute('SELECT status, COUNT(*) FROM units GROUP BY status'):
+        N[status] = count
+    attempts = conn.execute('SELECT SUM(attempts) FROM units').fetchone()[0] or 0
+    return {'pending': N[job_pending], 'leased': N[job_leased], 'done': N[job_done], 'attempts': attempts}
+
+###################################################
+# workers
+
+def work(path,worker=None,lease_seconds=600.0,max_units=None,verbose=True):
+    """
+    Lease and play units from the job database at path until none are left
+    (or max_units have been played), and return the number played.  Units
+    must finish well within lease_seconds, or they'll be handed to another
+    worker as well.
+    """
+
+    if worker is None:
+        worker = '%s:%d' % (socket.gethostname(),os.getpid())
+    conn = connect(path)
+    meta = read_meta(conn)
+    decks = sw.deck_grid(meta['decksize'])
+    replay_seed = meta['seed'] if meta['replayable'] else None
+    common_seed = meta['seed'] if meta['common'] else None
+
+    N_played = 0
+    while (max_units is None) or (N_played < max_units):
+        leased = lease(conn,worker,lease_seconds)
+        if leased is None:
+            break
+        unit_id, unit = leased
+
+        # seeds are tied to a unit's first cell, as in results.sweep_to_store
+        seedseq = np.random.SeedSequence(meta['seed'],spawn_key=(int(unit[0,0]),int(unit[0,1])))
+        unit, counts = sw.run_unit((unit,decks,decks,meta['N_games'],None,meta['engine'],seedseq,replay_seed,meta['lazy'],common_seed))
+        complete(conn,unit_id,worker,counts)
+        N_played += 1
+        if verbose:
+            print('%s: unit %d done (%d cells)' % (worker,unit_id,len(unit)),file=sys.stderr,flush=True)
+    conn.close()
+    return N_played
+
+def work_locally(path,processes=None,lease_seconds=600.0,verbose=True):
+    """
+    Run several workers as local processes, each with its own connection to
+    the job database, standing in for separate machines.
+    """
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    workers = [multiprocessing.Process(target=work,args=(path,None,lease_seconds,None,verbose)) for k in range(processes)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+###################################################
+# merging
+
+def merge(path,store_path):
+    """
+    Write the counts of every finished unit in the job database into the
+    result store at store_path (creating it if needed), and mark their cells
+    as done.  Cells are overwritten rather than added to, so merging again
+    after more units have finished is always safe.
+    """
+
+    conn = connect(path)
+    meta = read_meta(conn)
+    store = results.result_store.open(store_path,decksize=meta['decksize'])
+    query = 'SELECT units.cells, partials.counts FROM partials JOIN units ON units.id = partials.unit WHERE units.status = ?'
+    for cells, counts in conn.execute(query,(job_done,)):
+        unit = np.array(json.loads(cells),dtype=np.int64).reshape(-1,2)
+        store.set(unit,np.frombuffer(counts,dtype=np.int64).reshape(len(unit),-1))
+        store.mark(unit)
+    store.checkpoint()
+    conn.close()
+    return store
+
+###################################################
+# command line interface
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Coordinate a Ruleset 01 sweep between workers sharing a job database.')
+    commands = parser.add_subparsers(dest='command',required=True)
+
+    create = commands.add_parser('create',help='split a sweep into work units')
+    create.add_argument('db',help='job database to create (.sqlite)')
+    create.add_argument('--decksize',type=int,default=40,help='number of cards in every deck')
+    create.add_argument('--lands',type=int,default=None,help='only sweep the decks running this many lands')
+    create.add_argument('--games',type=int,default=10000,help='games per matchup, split between both seat orders')
+    create.add_argument('--engine',default='batch',choices=('batch','object'),help='game engine to use')
+    create.add_argument('--unitgames',type=int,default=50000,help='approximate number of games per work unit')
+    create.add_argument('--seed',type=int,default=None,help='seed for the random number generators')
+    create.add_argument('--replayable',action='store_true',help='give every game its own random number generator, so it can be replayed')
+    create.add_argument('--lazy',action='store_true',help='pick cards from the libraries as they are drawn instead of shuffling them')
+    create.add_argument('--common',action='store_true',help='shuffle every matchup with the same random keys (common random numbers)')
+
+    worker = commands.add_parser('work',help='play units until none are left')
+    worker.add_argument('db',help='job database')
+    worker.add_argument('--processes',type=int,default=1,help='number of local worker processes')
+    worker.add_argument('--lease',type=float,default=600.0,help='seconds before an unfinished unit is handed to another worker')
+
+    merger = commands.add_parser('merge',help='write finished units into a result store')
+    merger.add_argument('db',help='job database')
+    merger.add_argument('store',help='directory holding the result store')
+
+    status = commands.add_parser('status',help='show how many units are pending, leased and done')
+    status.add_argument('db',help='job database')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        N_units = create_jobs(args.db,args.games,decksize=args.decksize,N_land=args.lands,engine=args.engine,unitgames=args.unitgames,
+                              seed=args.seed,replayable=args.replayable,lazy=args.lazy,common=args.common)
+        print('%d units queued' % N_units)
+    if args.command == 'work':
+        if args.processes > 1:
+            work_locally(args.db,processes=args.processes,lease_seconds=args.lease)
+        else:
+            work(args.db,lease_seconds=args.lease)
+    if args.command == 'merge':
+        merge(args.db,args.store)
+    if args.command == 'status':
+        conn = connect(args.db)
+        print(json.dumps(progress(conn)))
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+###################################################
+# imports
+
+import sys
+import argparse
+import numpy as np
+import banedrifter as bd
+import rulesets as rs
+import tables as tb
+import sweep as sw
+
+###################################################
+# useful constants
+
+# positions in the per-player state tuples used by the solver:
+# library and hand are counted by card code (Baneslayer, Mulldrifter, land),
+# and "fresh" counts the Baneslayers cast on the player's last turn, which
+# are the ones left untapped to block
+s_lib_ba = 0
+s_lib_md = 1
+s_lib_bl = 2
+s_hand_ba = 3
+s_hand_md = 4
+s_hand_bl = 5
+s_lands = 6
+s_banes = 7
+s_fresh = 8
+s_life = 9
+
+# the certain outcomes of a game, seen from the active player's side
+active_wins_life = (1.0,0.0,0.0,0.0,0.0)
+opponent_wins_mill = (0.0,0.0,0.0,1.0,0.0)
+
+# the decision table the discard phase is read from, as in the batch engine
+discard_table = tb.get_table(rs.discard_01,hand_only=True)
+
+###################################################
+# drawing cards
+
+def draw_outcomes(library,N):
+    """
+    Every way of drawing N cards from a library counted by card code, with
+    its hypergeometric probability, as a list of (probability, drawn counts).
+    """
+
+    outcomes = [(1.0,(0,0,0),tuple(library))]
+    for i in range(N):
+        after = dict()
+        for p, drawn, left in outcomes:
+            size = sum(left)
+            for code in range(3):
+                if left[code] > 0:
+                    key = (drawn[:code] + (drawn[code]+1,) + drawn[code+1:],left[:code] + (left[code]-1,) + left[code+1:])
+                    after[key] = after.get(key,0.0) + p*left[code]/size
+        outcomes = [(p,drawn,left) for (drawn, left), p in after.items()]
+    return [(p,drawn) for p, drawn, left in outcomes]
+
+def add_draws(state,drawn):
+    """
+    Move some drawn card counts from a player's library to their hand.
+    """
+
+    state = list(state)
+    for code in range(3):
+        state[s_lib_ba+code] -= drawn[code]
+        state[s_hand_ba+code] += drawn[code]
+    return tuple(state)
+
+def swap_outcome(outcome):
+    """
+    The same outcome probabilities, seen from the other player's side.
+    """
+
+    return (outcome[2],outcome[3],outcome[0],outcome[1],outcome[4])
+
+###################################################
+# Ruleset 01 decisions on card counts
+
+def discard_01(hand):
+    """
+    The hand left after discarding down to seven cards, read from the
+    decision table compiled from rulesets.discard_01, which the batch
+    engine discards by as well.
+    """
+
+    if sum(hand) <= 7:
+        return tuple(hand)
+    hand = tuple([int(N) for N in hand])
+    actions, finished = discard_table.lookup(discard_table.key(hand,0,0))
+    left = list(hand)
+    for action in actions:
+        left[bd.codes[action[1]]] -= 1
+    return tuple(left)
+
+###################################################
+# solver class
+
+class solver:
+    """
+    Exact outcome probabilities for Ruleset 01 games, found by walking every
+    reachable game state as card counts and memoizing the value of each one
+    """
+
+    def __init__(self):
+
+        # outcome probabilities of every turn-start state solved so far
+        self.cache = dict()
+
+    # forget every solved state
+    def clear(self):
+        self.cache = dict()
+
+    # number of solved states
+    def N_states(self):
+        return len(self.cache)
+
+    # outcome probabilities from the start of the active player's turn
+    def turn(self,active,opponent,first=False):
+        key = (active,opponent,first)
+        if key in self.cache:
+            return self.cache[key]
+
+        # the first player skips the draw on their first turn
+        if first:
+            outcome = self.cardplay(active,opponent)
+
+        # players with an empty library lose via milling
+        elif active[s_lib_ba] + active[s_lib_md] + active[s_lib_bl] < 1:
+            outcome = opponent_wins_mill
+
+        else:
+            outcome = [0.0]*5
+            for p, drawn in draw_outcomes(active[:3],1):
+                sub = self.cardplay(add_draws(active,drawn),opponent)
+                for k in range(5):
+                    outcome[k] += p*sub[k]
+            outcome = tuple(outcome)
+
+        self.cache[key] = outcome
+        return outcome
+
+    # play a land, then hand over to the casting loop with every land untapped
+    def cardplay(self,active,opponent):
+        active = list(active)
+        if active[s_hand_bl] > 0:
+            active[s_hand_bl] -= 1
+            active[s_lands] += 1
+        active[s_fresh] = 0
+        return self.cast(tuple(active),active[s_lands],opponent,False)
+
+    # cast Baneslayers and Mulldrifters the way rulesets.cardplay_01 does
+    def cast(self,active,untapped,opponent,evoking):
+        active = list(active)
+        library = active[s_lib_ba] + active[s_lib_md] + active[s_lib_bl]
+
+        if not evoking:
+
+            # play as many Baneslayer Angels as possible
+            N_cast = min(active[s_hand_ba],untapped//5)
+            active[s_hand_ba] -= N_cast
+            active[s_banes] += N_cast
+            active[s_fresh] += N_cast
+            untapped -= 5*N_cast
+
+            # if there's still mana open, play a Mulldrifter
+            if (untapped >= 5) & (active[s_hand_md] > 0) & (library >= 2):
+                active[s_hand_md] -= 1
+                return self.cast_draws(tuple(active),untapped-5,opponent,False)
+
+        # otherwise, try to evoke a Mulldrifter
+        if (untapped >= 3) & (active[s_hand_md] > 0) & (library >= 2):
+            active[s_hand_md] -= 1
+            return self.cast_draws(tuple(active),untapped-3,opponent,True)
+
+        return self.end_turn(tuple(active),opponent)
+
+    # draw two cards off a Mulldrifter and keep casting
+    def cast_draws(self,active,untapped,opponent,evoking):
+        outcome = [0.0]*5
+        for p, drawn in draw_outcomes(active[:3],2):
+            sub = self.cast(add_draws(active,drawn),untapped,opponent,evoking)
+            for k in range(5):
+                outcome[k] += p*sub[k]
+        return tuple(outcome)
+
+    # combat and discard, then the opponent's turn
+    def end_turn(self,active,opponent):
+        active = list(active)
+        opponent = list(opponent)
+
+        # attack with every Baneslayer not cast this turn, and block with the opponent's untapped ones
+        N_attacking = active[s_banes] - active[s_fresh]
+        N_blocking = opponent[s_fresh]
+        N_dead = min(N_attacking,N_blocking)
+        active[s_life] += 5*N_attacking
+        opponent[s_life] += 5*N_dead - 5*max(N_attacking-N_blocking,0)
+        active[s_banes] -= N_dead
+        opponent[s_banes] -= N_dead
+        if (N_attacking > N_blocking) & (opponent[s_life] <= 0):
+            return active_wins_life
+
+        # discard down to seven cards
+        active[s_hand_ba:s_hand_bl+1] = discard_01(active[s_hand_ba:s_hand_bl+1])
+
+        # the opponent's untapped Baneslayers are only needed while they block
+        opponent[s_fresh] = 0
+        return swap_outcome(self.turn(tuple(opponent),tuple(active)))
+
+    # outcome probabilities of a game, from the first player's side
+    def play_game(self,deck1,deck2,handsize=7):
+        outcome = [0.0]*5
+        hands1 = draw_outcomes(tuple(deck1),min(handsize,sum(deck1)))
+        hands2 = draw_outcomes(tuple(deck2),min(handsize,sum(deck2)))
+        for p1, hand1 in hands1:
+            start1 = add_draws(tuple(deck1) + (0,0,0,0,0,0,20),hand1)
+            for p2, hand2 in hands2:
+                start2 = add_draws(tuple(deck2) + (0,0,0,0,0,0,20),hand2)
+                sub = self.turn(start1,start2,first=True)
+                for k in range(5):
+                    outcome[k] += p1*p2*sub[k]
+        return tuple(outcome)
+
+###################################################
+# solving matchups
+
+def solve_matchup(deck1,deck2,solver_=None):
+    """
+    Exact outcome probabilities of a matchup between two (N_bane, N_mull,
+    N_land) decks, with each deck going first half of the time, in the same
+    layout as the outcome counts from sweep.play_matchups.
+    """
+
+    if solver_ is None:
+        solver_ = solver()
+    deck1 = tuple([int(N) for N in deck1])
+    deck2 = tuple([int(N) for N in deck2])
+
+    # the game tree is deep, and the solver walks it recursively
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit,20*(sum(deck1)+sum(deck2))+1000))
+    try:
+        first = solver_.play_game(deck1,deck2)
+        second = swap_outcome(solver_.play_game(deck2,deck1))
+    finally:
+        sys.setrecursionlimit(limit)
+    return np.array([(a+b)/2 for a, b in zip(first,second)])
+
+def tractable(deck1,deck2,max_cards=40):
+    """
+    Whether a matchup is small enough to solve exactly; the number of
+    reachable states grows steeply with the size of the decks.
+    """
+
+    return sum(deck1) + sum(deck2) <= max_cards
+
+def solve_cells(deck_specs_1,deck_specs_2,cells,solver_=None,verbose=True):
+    """
+    Exact outcome probabilities of a set of (i, j) cells, of shape
+    (len(cells), 5), sharing one solver's memoized states between them.
+    """
+
+    if solver_ is None:
+        solver_ = solver()
+    cells = np.asarray(cells,dtype=np.int64).reshape(-1,2)
+    probs = np.zeros((len(cells),len(sw.outcomes)))
+    for k, (i, j) in enumerate(cells):
+        probs[k] = solve_matchup(deck_specs_1[i],deck_specs_2[j],solver_)
+        if verbose:
+            print('\r%d/%d matchups, %d states' % (k+1,len(cells),solver_.N_states()),end='',file=sys.stderr,flush=True)
+    if verbose and (len(cells) > 0):
+        print('',file=sys.stderr)
+    return probs
+
+def solve_grid(deck_specs_1,deck_specs_2,verbose=True):
+    """
+    Exact outcome probabilities for every matchup between a deck in
+    deck_specs_1 and a deck in deck_specs_2, of shape (len(deck_specs_1),
+    len(deck_specs_2), 5).  These can stand in for outcome counts wherever
+    only rates are needed (e.g., sweep.winrate).
+    """
+
+    deck_specs_1 = np.atleast_2d(np.asarray(deck_specs_1,dtype=np.int64))
+    deck_specs_2 = np.atleast_2d(np.asarray(deck_specs_2,dtype=np.int64))
+    probs = np.zeros((len(deck_specs_1),len(deck_specs_2),len(sw.outcomes)))
+
+    # a symmetric grid only needs one of each pair, and mirrors are even
+    symmetric = (deck_specs_1.shape == deck_specs_2.shape) and (deck_specs_1 == deck_specs_2).all()
+    if symmetric:
+        cells = sw.symmetric_cells(len(deck_specs_1),mirrors=True)
+    else:
+        i, j = np.meshgrid(np.arange(len(deck_specs_1)),np.arange(len(deck_specs_2)),indexing='ij')
+        cells = np.stack((i.ravel(),j.ravel()),axis=1)
+
+    cell_probs = solve_cells(deck_specs_1,deck_specs_2,cells,verbose=verbose)
+    probs[cells[:,0],cells[:,1]] = cell_probs
+    if symmetric:
+        probs[cells[:,1],cells[:,0]] = sw.swap_seats(cell_probs)
+
+    return probs
+
+###################################################
+# command line interface
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Solve Ruleset 01 exactly over a grid of deck matchups.')
+    parser.add_argument('output',help='where to save the (N_decks, N_decks, 5) array of outcome probabilities (.npy)')
+    parser.add_argument('--decksize',type=int,default=10,help='number of cards in every deck')
+    parser.add_argument('--lands',type=int,default=None,help='only solve the decks running this many lands')
+    args = parser.parse_args(argv)
+
+    decks = sw.deck_grid(args.decksize,N_land=args.lands)
+    np.save(args.output,solve_grid(decks,decks))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+###################################################
+# imports
+
+import sys
+import time
+import banedrifter as bd
+
+###################################################
+# profiler class
+
+class profiler:
+    """
+    Per-phase timing and call counts for every game played while it's running,
+    plus call counts for playing and drawing cards, turns and cards drawn.
+    Memory use is tracked as the net change in allocated memory blocks.
+    Only games played in this process are seen, so a sweep has to be run with
+    a single process to be profiled.  The probe players that fill in decision
+    tables (see tables.probe_player) aren't counted.
+    """
+
+    def __init__(self):
+
+        # [calls, seconds, blocks] for every phase of a turn
+        self.phases = dict([(phase,[0,0.0,0]) for phase in bd.phases])
+
+        # [calls, blocks] for the player methods that are wrapped while running
+        self.methods = {'play': [0,0], 'draw': [0,0]}
+
+        self.games = 0
+        self.cards_drawn = 0
+
+        # when and with how many blocks allocated the current phase started
+        self.started = None
+
+        # the original player methods, while they're wrapped, and the classes
+        # of the players whose calls are counted
+        self.originals = list()
+        self.classes = (bd.player,bd.compact_player)
+
+    # phase hooks
+    def before(self,active,opponent,phase):
+        self.started = (time.perf_counter(),sys.getallocatedblocks())
+
+    def after(self,active,opponent,phase):
+        stats = self.phases[phase]
+        stats[0] += 1
+        stats[1] += time.perf_counter() - self.started[0]
+        stats[2] += sys.getallocatedblocks() - self.started[1]
+
+    def count_game(self,p1,p2,phase):
+        self.games += 1
+
+    # a player method that also counts its calls and allocations
+    def wrap(self,name,method):
+        stats = self.methods[name]
+        def wrapper(p,*args,**kwargs):
+            if type(p) not in self.classes:
+                return method(p,*args,**kwargs)
+            blocks = sys.getallocatedblocks()
+            result = method(p,*args,**kwargs)
+            stats[0] += 1
+            stats[1] += sys.getallocatedblocks() - blocks
+            if (name == 'draw') and p.alive:
+                self.cards_drawn += args[0] if args else kwargs.get('N',1)
+            return result
+        return wrapper
+
+    # start profiling every game played from now on
+    def start(self):
+        for phase in bd.phases:
+            bd.add_hook(phase,self.before,self.after)
+        bd.add_hook('game',after=self.count_game)
+        for cls in self.classes:
+            for name in self.methods:
+                self.originals.append((cls,name,cls.__dict__[name]))
+                setattr(cls,name,self.wrap(name,cls.__dict__[name]))
+
+    # stop profiling
+    def stop(self):
+        for phase in bd.phases:
+            bd.remove_hook(phase,self.before,self.after)
+        bd.remove_hook('game',after=self.count_game)
+        for cls, name, method in self.originals:
+            setattr(cls,name,method)
+        self.originals = list()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self,*args):
+        self.stop()
+
+    # everything recorded so far, as a dictionary
+    def summary(self):
+        turns = self.phases['start'][0]
+        games = max(self.games,1)
+        return {'games': self.games,
+                'turns': turns,
+                'turns_per_game': turns/games,
+                'cards_drawn': self.cards_drawn,
+                'cards_drawn_per_game': self.cards_drawn/games,
+                'phases': dict([(phase,{'calls': stats[0], 'seconds': stats[1], 'blocks': stats[2]}) for phase, stats in self.phases.items()]),
+                'methods': dict([(name,{'calls': stats[0], 'blocks': stats[1]}) for name, stats in self.methods.items()])}
+
+    # a short text report of the summary
+    def report(self):
+        summary = self.summary()
+        lines = ['%d games, %.1f turns and %.1f cards drawn per game' % (summary['games'],summary['turns_per_game'],summary['cards_drawn_per_game'])]
+        total = sum([stats['seconds'] for stats in summary['phases'].values()])
+        for phase, stats in summary['phases'].items():
+            lines.append('%-10s %9d calls %9.3f s (%5.1f%%) %+10d blocks' % (phase,stats['calls'],stats['seconds'],100*stats['seconds']/max(total,1e-12),stats['blocks']))
+        for name, stats in summary['methods'].items():
+            lines.append('%-10s %9d calls %+33d blocks' % (name,stats['calls'],stats['blocks']))
+        return '\n'.join(lines)
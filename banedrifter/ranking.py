@@ -0,0 +1,205 @@
+###################################################
+# imports
+
+import numpy as np
+import sweep as sw
+import results
+import adaptive
+
+###################################################
+# ranking index class
+
+class ranking_index:
+    """
+    Every deck's mean and minimum win rate, the opponent it does worst
+    against and its k best responses (the opponents that beat it most
+    often), kept up to date as matchup counts come in, so that ranking
+    queries never rescan the whole grid.  Decks are indexed as in a result
+    store (blog number minus one), and cells that haven't been played yet
+    are left out of every statistic.
+    """
+
+    def __init__(self,N_decks,k=5,mirrors=True):
+
+        self.k = k
+
+        # wins[i,j] and games[i,j] for deck #i+1 against deck #j+1
+        self.wins = np.zeros((N_decks,N_decks))
+        self.games = np.zeros((N_decks,N_decks))
+        self.rates = np.full((N_decks,N_decks),np.nan)
+
+        # per-deck running sums of win rates and of their variances
+        self.N_known = np.zeros(N_decks,dtype=np.int64)
+        self.sums = np.zeros(N_decks)
+        self.variances = np.zeros(N_decks)
+
+        # worst matchup of every deck, and the opponents that beat it most often
+        self.minimum = np.full(N_decks,np.inf)
+        self.argmin = np.full(N_decks,-1,dtype=np.int64)
+        self.responses = [np.zeros(0,dtype=np.int64) for i in range(N_decks)]
+
+        # mirror matchups are exactly even, with no uncertainty
+        if mirrors:
+            for i in range(N_decks):
+                self.set_cell(i,i,0.5,1.0)
+
+    # build an index from the finished cells of a result store; cells solved
+    # exactly count as having been played infinitely many times
+    @classmethod
+    def from_store(cls,store,k=5):
+        index = cls(store.N_decks(),k=k,mirrors=False)
+        counts = np.asarray(store.counts)
+        status = np.asarray(store.status)
+        done = (status == results.status_done)
+        games = counts.sum(axis=-1)
+        index.wins = np.where(done,counts[...,sw.i_p1_life] + counts[...,sw.i_p1_mill],0).astype(float)
+        index.games = np.where(done,games,0).astype(float)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            index.rates = np.where(done & (games > 0),index.wins/index.games,np.nan)
+        if store.probs is not None:
+            analytic = np.isin(status,results.status_solved)
+            probs = np.asarray(store.probs)
+            index.rates[analytic] = probs[analytic][:,sw.i_p1_life] + probs[analytic][:,sw.i_p1_mill]
+            index.wins[analytic] = index.rates[analytic]
+            index.games[analytic] = np.inf
+        mirror = (status == results.status_mirror)
+        index.wins[mirror] = 0.5
+        index.games[mirror] = 1.0
+        index.rates[mirror] = 0.5
+        index.rebuild()
+        return index
+
+    # number of decks along each side of the grid
+    def N_decks(self):
+        return len(self.rates)
+
+    # recompute every per-deck statistic from the cells
+    def rebuild(self):
+        known = ~np.isnan(self.rates)
+        rates = np.where(known,self.rates,0.0)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            variances = np.where(known & (self.games > 0),rates*(1-rates)/self.games,0.0)
+        np.fill_diagonal(variances,0.0)
+        self.N_known = known.sum(axis=1)
+        self.sums = rates.sum(axis=1)
+        self.variances = variances.sum(axis=1)
+        for i in range(self.N_decks()):
+            self.rescan_minimum(i)
+            self.rescan_responses(i)
+
+    # find a deck's worst matchup by scanning its row
+    def rescan_minimum(self,i):
+        row = np.where(np.isnan(self.rates[i]),np.inf,self.rates[i])
+        self.argmin[i] = np.argmin(row)
+        self.minimum[i] = row[self.argmin[i]]
+        if not np.isfinite(self.minimum[i]):
+            self.argmin[i] = -1
+
+    # find a deck's k best responses by scanning its row
+    def rescan_responses(self,i):
+        row = np.where(np.isnan(self.rates[i]),np.inf,self.rates[i])
+        row[i] = np.inf
+        k = min(self.k,len(row))
+        candidates = np.argpartition(row,k-1)[:k] if k > 0 else np.zeros(0,dtype=np.int64)
+        candidates = candidates[np.isfinite(row[candidates])]
+        self.responses[i] = candidates[np.argsort(row[candidates],kind='stable')]
+
+    # replace the result of a single directed cell, updating deck i's
+    # statistics; mirror matchups never add to the variance, and a cell
+    # solved exactly has infinitely many games, with wins holding its rate
+    def set_cell(self,i,j,wins,games):
+        old = self.rates[i,j]
+        new = wins if np.isinf(games) else (wins/games if games > 0 else np.nan)
+        variance = new*(1-new)/games if (games > 0) and (i != j) else 0.0
+        if not np.isnan(old):
+            self.N_known[i] -= 1
+            self.sums[i] -= old
+            self.variances[i] -= old*(1-old)/self.games[i,j] if (self.games[i,j] > 0) and (i != j) else 0.0
+        self.wins[i,j] = wins
+        self.games[i,j] = games
+        self.rates[i,j] = new
+        if np.isnan(new):
+            self.rescan_minimum(i)
+            self.rescan_responses(i)
+            return
+        self.N_known[i] += 1
+        self.sums[i] += new
+        self.variances[i] += variance
+
+        # the worst matchup only needs a rescan if it just got better
+        if new < self.minimum[i]:
+            self.minimum[i] = new
+            self.argmin[i] = j
+        elif (self.argmin[i] == j) and (new > self.minimum[i]):
+            self.rescan_minimum(i)
+
+        # likewise for the best responses
+        if i != j:
+            responses = self.responses[i]
+            if (j in responses) or (len(responses) < self.k) or (new < self.rates[i,responses[-1]]):
+                self.rescan_responses(i)
+
+    # replace the outcome counts of a set of cells and their transposes
+    def update(self,cells,counts):
+        cells = np.asarray(cells).reshape(-1,2)
+        counts = np.asarray(counts).reshape(len(cells),-1)
+        for (i, j), c in zip(cells,counts):
+            games = float(c.sum())
+            self.set_cell(i,j,float(c[sw.i_p1_life] + c[sw.i_p1_mill]),games)
+            if i != j:
+                self.set_cell(j,i,float(c[sw.i_p2_life] + c[sw.i_p2_mill]),games)
+
+    # record the exact outcome probabilities of a set of cells solved in
+    # closed form, and of their transposes, as from_store does
+    def update_exact(self,cells,probs):
+        cells = np.asarray(cells).reshape(-1,2)
+        probs = np.asarray(probs).reshape(len(cells),-1)
+        for (i, j), p in zip(cells,probs):
+            self.set_cell(i,j,float(p[sw.i_p1_life] + p[sw.i_p1_mill]),np.inf)
+            if i != j:
+                self.set_cell(j,i,float(p[sw.i_p2_life] + p[sw.i_p2_mill]),np.inf)
+
+    # mean win rate of every deck over the opponents played so far
+    def mean(self):
+        with np.errstate(invalid='ignore',divide='ignore'):
+            return self.sums/self.N_known
+
+    # standard error of every deck's mean win rate
+    def stderr(self):
+        with np.errstate(invalid='ignore',divide='ignore'):
+            return np.sqrt(np.maximum(self.variances,0.0))/self.N_known
+
+    # the k decks with the highest average win rate (HAWR), best first
+    def hawr(self,k=1):
+        mean = np.where(self.N_known > 0,self.mean(),-np.inf)
+        return np.argsort(-mean,kind='stable')[:k]
+
+    # the k decks with the highest minimum win rate (HMWR), best first
+    def hmwr(self,k=1):
+        minimum = np.where(self.N_known > 0,self.minimum,-np.inf)
+        return np.argsort(-minimum,kind='stable')[:k]
+
+    # win rate of deck #i+1 against deck #j+1, with its Wilson interval
+    def winrate(self,i,j,z=1.96):
+        low, high = adaptive.wilson_interval(self.wins[i,j],self.games[i,j],z=z)
+        if (i == j) or np.isinf(self.games[i,j]):
+            low, high = self.rates[i,j], self.rates[i,j]
+        return self.rates[i,j], float(low), float(high)
+
+    # the opponents that beat deck #i+1 most often, with their win rates against it
+    def best_responses(self,i):
+        return [(int(j),1.0-self.rates[i,j]) for j in self.responses[i]]
+
+    # everything the index knows about deck #i+1
+    def summary(self,i,z=1.96):
+        mean = self.mean()[i]
+        stderr = self.stderr()[i]
+        j = int(self.argmin[i])
+        minimum = self.winrate(i,j,z=z) if j >= 0 else (np.nan,np.nan,np.nan)
+        return {'mean': mean,
+                'mean_interval': (mean - z*stderr,mean + z*stderr),
+                'minimum': minimum[0],
+                'minimum_interval': minimum[1:],
+                'worst_opponent': j,
+                'best_responses': self.best_responses(i),
+                'opponents': int(self.N_known[i])}
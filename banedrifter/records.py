@@ -0,0 +1,154 @@
+###################################################
+# imports
+
+from collections import namedtuple
+import numpy as np
+import sweep as sw
+
+###################################################
+# game records
+
+# everything kept about a finished game.  As in sweep.outcomes, "1" is the
+# deck from the first list of deck specs and "2" the one from the second,
+# whichever seat they were playing from: winner is 1 or 2 (0 for a draw),
+# swapped is set when deck 2 went first, and turns counts the turns of
+# both players.
+game_record = namedtuple('game_record',['matchup','swapped','winner','loss_reason','turns','life1','life2','library1','library2'])
+
+def make_record(p1,p2,winner,loss_reason,matchup=0,swapped=False):
+    """
+    The record of a game, from the players and results returned by
+    play_game.
+    """
+
+    if swapped:
+        p1, p2 = p2, p1
+        winner = (3 - winner) % 3
+    return game_record(int(matchup),bool(swapped),int(winner),loss_reason,p1.turncount+p2.turncount,
+                       p1.life,p2.life,p1.decksize(),p2.decksize())
+
+def stream_games(decks1,decks2,N_games,rulesets=None,rng=None,seed=None,matchups=None,first_game=0,lazy=False,common_seed=None):
+    """
+    Play N_games games between every deck in decks1 and the deck in the same
+    position of decks2 with the object engine, and yield the record of each
+    game as soon as it's over, so that only one game is ever held in memory.
+    The games are those of sweep.object_games, which sweep.play_matchups
+    plays for the object engine: seats, seeding, lazy decks and common
+    random numbers work the same way, and the same arguments play the same
+    games.
+    """
+
+    if matchups is None:
+        matchups = np.arange(len(np.atleast_2d(decks1)))
+    for i, k, swapped, (p1, p2, winner, loss_reason) in sw.object_games(decks1,decks2,N_games,rulesets=rulesets,rng=rng,seed=seed,matchups=matchups,
+                                                                        first_game=first_game,lazy=lazy,common_seed=common_seed):
+        yield make_record(p1,p2,winner,loss_reason,matchup=matchups[i],swapped=swapped)
+
+###################################################
+# online aggregators
+
+def field_getter(field):
+    """
+    A function picking a value out of a record, from a field name or a
+    function of the record.
+    """
+
+    if callable(field):
+        return field
+    return lambda record: getattr(record,field)
+
+class outcome_counts:
+    """
+    Outcome counts of every matchup, in the layout of sweep.outcomes
+    """
+
+    def __init__(self,N_matchups=1):
+
+        self.counts = np.zeros((N_matchups,len(sw.outcomes)),dtype=np.int64)
+
+    # count a game
+    def add(self,record):
+        if record.winner == 0:
+            i = sw.i_draw
+        elif record.winner == 1:
+            i = sw.i_p1_life if record.loss_reason == 'life' else sw.i_p1_mill
+        else:
+            i = sw.i_p2_life if record.loss_reason == 'life' else sw.i_p2_mill
+        self.counts[record.matchup,i] += 1
+
+    # the counts so far
+    def result(self):
+        return self.counts
+
+class running_stats:
+    """
+    Running count, mean and variance of a record field (or of any function of
+    a record), updated one game at a time with Welford's method
+    """
+
+    def __init__(self,field='turns'):
+
+        self.value = field_getter(field)
+        self.N = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+
+    # include a game
+    def add(self,record):
+        x = self.value(record)
+        self.N += 1
+        delta = x - self.mean
+        self.mean += delta/self.N
+        self.M2 += delta*(x - self.mean)
+
+    # sample variance
+    def variance(self):
+        if self.N < 2:
+            return 0.0
+        return self.M2/(self.N - 1)
+
+    # standard error of the mean
+    def stderr(self):
+        if self.N < 1:
+            return 0.0
+        return np.sqrt(self.variance()/self.N)
+
+    # (count, mean, variance) so far
+    def result(self):
+        return (self.N,self.mean,self.variance())
+
+class histogram:
+    """
+    Counts of every value taken by an integer record field (or function of a
+    record), e.g. the length of games in turns; grows as larger values turn up
+    """
+
+    def __init__(self,field='turns'):
+
+        self.value = field_getter(field)
+        self.counts = np.zeros(64,dtype=np.int64)
+
+    # include a game
+    def add(self,record):
+        x = int(self.value(record))
+        if x < 0:
+            raise Exception("Histograms only count values that aren't negative!")
+        if x >= len(self.counts):
+            self.counts = np.concatenate((self.counts,np.zeros(max(x+1,2*len(self.counts))-len(self.counts),dtype=np.int64)))
+        self.counts[x] += 1
+
+    # counts of every value up to the largest one seen
+    def result(self):
+        seen = np.flatnonzero(self.counts)
+        return self.counts[:seen[-1]+1] if len(seen) else self.counts[:0]
+
+def aggregate(records,*aggregators):
+    """
+    Feed every record from a stream to each of the aggregators, and return
+    the aggregators.
+    """
+
+    for record in records:
+        for aggregator in aggregators:
+            aggregator.add(record)
+    return aggregators
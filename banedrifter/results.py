@@ -0,0 +1,295 @@
+###################################################
+# imports
+
+import os
+import json
+import argparse
+import time
+import numpy as np
+import sweep as sw
+import analytic as an
+import exact
+
+###################################################
+# useful constants
+
+# the status of each cell in a result store
+status_pending = 0
+status_done = 1
+status_mirror = 2
+status_analytic = 3
+status_exact = 4
+
+# the statuses of cells holding exact outcome probabilities rather than counts
+status_solved = (status_analytic,status_exact)
+
+###################################################
+# deck numbering
+
+def deck_number(N_bane,N_mull,decksize=40):
+    """
+    The blog's number (starting from deck #1) of the deck with the given
+    numbers of Baneslayers and Mulldrifters.
+    """
+
+    return N_bane*(decksize+1) - N_bane*(N_bane-1)//2 + N_mull + 1
+
+def deck_from_number(number,decksize=40):
+    """
+    The (N_bane, N_mull, N_land) deck with the given blog number.
+    """
+
+    return tuple([int(N) for N in sw.deck_grid(decksize)[number-1]])
+
+###################################################
+# result store class
+
+class result_store:
+    """
+    On-disk, memory-mapped outcome counts for every matchup between the decks
+    of a given size, indexed by blog deck number minus one
+    """
+
+    def __init__(self,path,mode='r'):
+
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path,'meta.json')) as f:
+            self.meta = json.load(f)
+        self.decksize = self.meta['decksize']
+        self.decks = sw.deck_grid(self.decksize)
+
+        # counts[i,j] holds the outcomes of deck #i+1 against deck #j+1
+        # counts[j,i] always holds the seat-swapped counts of the same games
+        self.counts = np.load(os.path.join(path,'counts.npy'),mmap_mode=mode)
+
+        # the status of each cell is checkpointed separately from the counts
+        self.status = np.load(os.path.join(path,'status.npy'),mmap_mode=mode)
+
+        # exact outcome probabilities of the cells solved in closed form or by
+        # the exact solver (stores made before these existed get them when
+        # opened for writing)
+        probspath = os.path.join(path,'probs.npy')
+        if (not os.path.exists(probspath)) and (mode != 'r'):
+            np.lib.format.open_memmap(probspath,mode='w+',dtype=np.float64,shape=self.counts.shape).flush()
+        self.probs = np.load(probspath,mmap_mode=mode) if os.path.exists(probspath) else None
+
+    # create a new, empty store on disk
+    @classmethod
+    def create(cls,path,decksize=40):
+        os.makedirs(path,exist_ok=True)
+        N_decks = len(sw.deck_grid(decksize))
+        counts = np.lib.format.open_memmap(os.path.join(path,'counts.npy'),mode='w+',dtype=np.int64,shape=(N_decks,N_decks,len(sw.outcomes)))
+        counts.flush()
+        status = np.lib.format.open_memmap(os.path.join(path,'status.npy'),mode='w+',dtype=np.int8,shape=(N_decks,N_decks))
+        np.fill_diagonal(status,status_mirror)
+        status.flush()
+        probs = np.lib.format.open_memmap(os.path.join(path,'probs.npy'),mode='w+',dtype=np.float64,shape=(N_decks,N_decks,len(sw.outcomes)))
+        probs.flush()
+        with open(os.path.join(path,'meta.json'),'w') as f:
+            json.dump({'decksize': decksize, 'outcomes': list(sw.outcomes)},f)
+        return cls(path,mode='r+')
+
+    # open an existing store, or create it if it isn't there yet
+    @classmethod
+    def open(cls,path,decksize=40,mode='r+'):
+        if os.path.exists(os.path.join(path,'meta.json')):
+            store = cls(path,mode=mode)
+            if store.decksize != decksize:
+                raise Exception("This store holds results for a different deck size!")
+            return store
+        return cls.create(path,decksize=decksize)
+
+    # number of decks along each side of the grid
+    def N_decks(self):
+        return len(self.decks)
+
+    # the cells that still need to be played, only counting one of each (i, j) and (j, i) pair
+    def pending(self):
+        return np.argwhere(np.triu(self.status == status_pending,k=1))
+
+    # add some outcome counts to a set of cells and their transposes, in place
+    def add(self,cells,counts):
+        cells = np.asarray(cells).reshape(-1,2)
+        counts = np.asarray(counts).reshape(len(cells),-1)
+        np.add.at(self.counts,(cells[:,0],cells[:,1]),counts)
+        np.add.at(self.counts,(cells[:,1],cells[:,0]),sw.swap_seats(counts))
+
+    # replace the outcome counts of a set of cells and their transposes
+    def set(self,cells,counts):
+        cells = np.asarray(cells).reshape(-1,2)
+        counts = np.asarray(counts).reshape(len(cells),-1)
+        self.counts[cells[:,0],cells[:,1]] = counts
+        self.counts[cells[:,1],cells[:,0]] = sw.swap_seats(counts)
+
+    # fill a set of cells and their transposes with exact outcome
+    # probabilities, from analytic (the default) or from the exact solver
+    def set_analytic(self,cells,probs,status=status_analytic):
+        cells = np.asarray(cells).reshape(-1,2)
+        probs = np.asarray(probs).reshape(len(cells),len(sw.outcomes))
+        self.probs[cells[:,0],cells[:,1]] = probs
+        self.probs[cells[:,1],cells[:,0]] = sw.swap_seats(probs)
+        self.mark(cells,status=status)
+
+    # mark a set of cells and their transposes as finished
+    def mark(self,cells,status=status_done):
+        cells = np.asarray(cells).reshape(-1,2)
+        self.status[cells[:,0],cells[:,1]] = status
+        self.status[cells[:,1],cells[:,0]] = status
+
+    # forget any partial counts left in unfinished cells by an interrupted run
+    def reset_pending(self):
+        pending = (self.status == status_pending)
+        self.counts[pending] = 0
+
+    # write the counts and then the cell status to disk
+    def checkpoint(self):
+        self.counts.flush()
+        if self.probs is not None:
+            self.probs.flush()
+        self.status.flush()
+
+    # win rate of deck #i+1 against deck #j+1, from whatever has been stored
+    def winrate(self,i=slice(None),j=slice(None)):
+        counts = np.asarray(self.counts[i,j],dtype=float)
+        games = counts.sum(axis=-1)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            rates = (counts[...,sw.i_p1_life] + counts[...,sw.i_p1_mill])/games
+
+        # solved cells are exact, and mirror matchups are exactly even
+        if self.probs is not None:
+            probs = np.asarray(self.probs[i,j])
+            rates = np.where(np.isin(self.status[i,j],status_solved),probs[...,sw.i_p1_life] + probs[...,sw.i_p1_mill],rates)
+        return np.where(self.status[i,j] == status_mirror,0.5,rates)
+
+###################################################
+# sweeping into a store
+
+def store_unit(args):
+    """
+    Play a work unit and add its counts straight into the store.
+    """
+
+    path, unit, work = args
+    unit, counts = sw.run_unit((unit,)+work)
+    store = result_store(path,mode='r+')
+    store.add(unit,counts)
+    store.counts.flush()
+    return unit
+
+def sweep_to_store(path,N_games,decksize=40,N_land=None,rulesets=None,engine='batch',processes=None,unitgames=50000,seed=None,replayable=False,lazy=False,common=False,analytic=False,exact_cards=None,checkpoint_every=60.0,index=None,verbose=True):
+    """
+    Sweep all matchups between decks of a given size (or only those running
+    N_land lands) into the store at path, creating it if needed.  Workers add
+    their counts to the memory-mapped store in place; the cell status is
+    checkpointed every checkpoint_every seconds, so that a killed run can be
+    restarted with the same arguments and only replays unfinished cells.
+    If replayable is set, game g of cell (i, j) with i < j can be
+    regenerated with banedrifter.replay_game((seed, i*N_decks + j, g),
+    store.decks[i], store.decks[j], ...); cell (j, i) holds the same games
+    seen from the other deck's side, so its game g is that same replay with
+    the winner flipped.  If lazy is set, cards are picked from the
+    libraries as they're drawn, and if common is set, all cells are
+    shuffled with common random numbers (see sweep.play_matchups).  If
+    analytic is set, the cells that can be solved
+    in closed form (see analytic.analytic_cells) are filled with their exact
+    outcome probabilities instead of being played, and if exact_cards is
+    given, so are the Ruleset 01 cells whose two decks hold at most that
+    many cards in all, by the exact solver (see exact.solve_matchup).  If a
+    ranking.ranking_index is given, every cell is added to it as soon as
+    it's finished.
+    """
+
+    if replayable and (seed is None):
+        raise Exception("A replayable sweep needs a seed!")
+    if common and (seed is None):
+        raise Exception("A sweep with common random numbers needs a seed!")
+
+    store = result_store.open(path,decksize=decksize)
+    store.reset_pending()
+    store.checkpoint()
+
+    # only play the pending cells within the requested slice of the grid
+    cells = store.pending()
+    if N_land is not None:
+        cells = cells[(store.decks[cells[:,0],2] == N_land) & (store.decks[cells[:,1],2] == N_land)]
+
+    # solve whatever can be solved exactly, and only play the rest
+    if analytic:
+        solvable = an.analytic_cells(store.decks,store.decks,cells,rulesets)
+        probs = an.solve_cells(store.decks,store.decks,cells[solvable],verbose=verbose)
+        store.set_analytic(cells[solvable],probs)
+        store.checkpoint()
+        if index is not None:
+            index.update_exact(cells[solvable],probs)
+        cells = cells[~solvable]
+    if (exact_cards is not None) and ((rulesets is None) or (tuple(rulesets) == sw.rulesets_01)):
+        solvable = np.array([exact.tractable(store.decks[i],store.decks[j],max_cards=exact_cards) for i, j in cells],dtype=bool).reshape(-1)
+        probs = exact.solve_cells(store.decks,store.decks,cells[solvable],verbose=verbose)
+        store.set_analytic(cells[solvable],probs,status=status_exact)
+        store.checkpoint()
+        if index is not None:
+            index.update_exact(cells[solvable],probs)
+        cells = cells[~solvable]
+    units = sw.make_units(store.decks,store.decks,N_games,unitgames=unitgames,cells=cells)
+
+    # seeds are tied to a unit's first cell rather than to its place in the queue
+    seeds = [np.random.SeedSequence(seed,spawn_key=(int(unit[0,0]),int(unit[0,1]))) for unit in units]
+    replay_seed = seed if replayable else None
+    common_seed = seed if common else None
+    work = [(path,unit,(store.decks,store.decks,N_games,rulesets,engine,s,replay_seed,lazy,common_seed)) for unit, s in zip(units,seeds)]
+
+    pool, results = sw.start_pool(store_unit,work,processes)
+    N_total = sum([len(unit) for unit in units])
+    N_done = 0
+    starttime = time.time()
+    lastcheckpoint = starttime
+    try:
+        for unit in results:
+            store.mark(unit)
+            if index is not None:
+                index.update(unit,store.counts[unit[:,0],unit[:,1]])
+            N_done += len(unit)
+            if time.time() - lastcheckpoint > checkpoint_every:
+                store.checkpoint()
+                lastcheckpoint = time.time()
+            if verbose:
+                sw.report(N_done,N_total,N_games,starttime)
+    finally:
+        store.checkpoint()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if verbose:
+        sw.report(N_done,N_total,N_games,starttime,end='\n')
+
+    return store
+
+###################################################
+# command line interface
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Sweep Ruleset 01 into a resumable on-disk result store.')
+    parser.add_argument('path',help='directory holding the result store')
+    parser.add_argument('--decksize',type=int,default=40,help='number of cards in every deck')
+    parser.add_argument('--lands',type=int,default=None,help='only sweep the decks running this many lands')
+    parser.add_argument('--games',type=int,default=10000,help='games per matchup, split between both seat orders')
+    parser.add_argument('--engine',default='batch',choices=('batch','object'),help='game engine to use')
+    parser.add_argument('--processes',type=int,default=None,help='size of the process pool (default: all cores)')
+    parser.add_argument('--unitgames',type=int,default=50000,help='approximate number of games per work unit')
+    parser.add_argument('--seed',type=int,default=None,help='seed for the random number generators')
+    parser.add_argument('--replayable',action='store_true',help='give every game its own random number generator, so it can be replayed')
+    parser.add_argument('--lazy',action='store_true',help='pick cards from the libraries as they are drawn instead of shuffling them')
+    parser.add_argument('--common',action='store_true',help='shuffle every matchup with the same random keys (common random numbers)')
+    parser.add_argument('--analytic',action='store_true',help='solve the matchups that have a closed form exactly instead of playing them')
+    parser.add_argument('--exact',type=int,default=None,help='solve the matchups of decks with at most this many cards between them exactly')
+    parser.add_argument('--checkpoint',type=float,default=60.0,help='seconds between checkpoints')
+    args = parser.parse_args(argv)
+
+    sweep_to_store(args.path,args.games,decksize=args.decksize,N_land=args.lands,engine=args.engine,processes=args.processes,
+                   unitgames=args.unitgames,seed=args.seed,replayable=args.replayable,lazy=args.lazy,common=args.common,analytic=args.analytic,exact_cards=args.exact,
+                   checkpoint_every=args.checkpoint)
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 # imports
 
 import banedrifter as bd
-import numpy as np
+from collections import namedtuple
 
 ###################################################
 # card-playing rulesets
@@ -40,28 +40,11 @@ def cardplay_01(p1,p2):
 ###################################################
 # combat rulesets
 
-def combat_01(p1,p2):
-
-    # if you can, attack with all Baneslayers
-    N_attacking = 0
-    attacking_banes = list()
-    attacking_ind = list()
-    for ibane, bane in enumerate(p1.banes):
-        if (not bane.tapped) & (not bane.sick):
-            p1.attack(bd.ba)
-            N_attacking += 1
-            attacking_banes.append(bane)
-            attacking_ind.append(ibane)
-
-    # the opposing player will try to block as many as possible
-    N_blocking = 0
-    blocking_banes = list()
-    blocking_ind = list()
-    for ibane, bane in enumerate(p2.banes):
-        if (not bane.tapped):
-            N_blocking += 1
-            blocking_banes.append(bane)
-            blocking_ind.append(ibane)
+def resolve_blocks(p1,p2,N_attacking,N_blocking):
+    """
+    Resolve combat between N_attacking attacking Baneslayers and N_blocking
+    blocking ones, as in Ruleset 01.
+    """
 
     if N_attacking > 0:
 
@@ -72,12 +55,10 @@ def combat_01(p1,p2):
             p2.gain_life(N_blocking*5)
 
             # all attacking and blocking creatures die
-            p1.banes = np.delete(p1.banes,attacking_ind)
-            p1.grave = np.concatenate((p1.grave,attacking_banes))
-            p1.gamelog += str(N_attacking) + ' ' + bd.ba + 's die attacking.' + '\n'
-            p2.banes = np.delete(p2.banes,blocking_ind)
-            p2.grave = np.concatenate((p2.grave,blocking_banes))
-            p2.gamelog += str(N_blocking) + ' ' + bd.ba + 's die blocking.' + '\n'
+            p1.destroy(bd.ba,N_attacking,tapped=True)
+            p1.log(bd.ev_die_attacking,N_attacking,bd.ba)
+            p2.destroy(bd.ba,N_blocking,tapped=False)
+            p2.log(bd.ev_die_blocking,N_blocking,bd.ba)
 
         # if there are more attackers than blockers
         if (N_attacking > N_blocking):
@@ -89,16 +70,14 @@ def combat_01(p1,p2):
             p2.lose_life((N_attacking-N_blocking)*5)
 
             # all blocking creatures die
-            p2.banes = np.delete(p2.banes,blocking_ind)
-            p2.grave = np.concatenate((p2.grave,blocking_banes))
+            p2.destroy(bd.ba,N_blocking,tapped=False)
             if (N_blocking > 0):
-                p2.gamelog += str(N_blocking) + ' ' + bd.ba + 's die blocking.' + '\n'
+                p2.log(bd.ev_die_blocking,N_blocking,bd.ba)
 
             # a number of attacking creatures equal to the number of blockers dies
-            p1.banes = np.delete(p1.banes,attacking_ind[:N_blocking])
-            p1.grave = np.concatenate((p1.grave,attacking_banes[:N_blocking]))
+            p1.destroy(bd.ba,N_blocking,tapped=True)
             if (N_blocking > 0):
-                p1.gamelog += str(N_blocking) + ' ' + bd.ba + 's die attacking.' + '\n'
+                p1.log(bd.ev_die_attacking,N_blocking,bd.ba)
 
         # if there are more blockers than attackers
         if (N_attacking < N_blocking):
@@ -107,45 +86,184 @@ def combat_01(p1,p2):
             p2.gain_life(N_attacking*5)
 
             # all attacking creatures die
-            p1.banes = np.delete(p1.banes,attacking_ind)
-            p1.grave = np.concatenate((p1.grave,attacking_banes))
-            p1.gamelog += str(N_attacking) + ' ' + bd.ba + 's die attacking.' + '\n'
+            p1.destroy(bd.ba,N_attacking,tapped=True)
+            p1.log(bd.ev_die_attacking,N_attacking,bd.ba)
 
             # a number of blocking creatures equal to the number of attackers dies
-            p2.banes = np.delete(p2.banes,blocking_ind[:N_attacking])
-            p2.grave = np.concatenate((p2.grave,blocking_banes[:N_attacking]))
-            p2.gamelog += str(N_attacking) + ' ' + bd.ba + 's die blocking.' + '\n'
+            p2.destroy(bd.ba,N_attacking,tapped=False)
+            p2.log(bd.ev_die_blocking,N_attacking,bd.ba)
+
+def combat_01(p1,p2):
+
+    # if you can, attack with all Baneslayers
+    N_attacking = p1.count_ready(bd.ba)
+    for i in range(N_attacking):
+        p1.attack(bd.ba)
+
+    # the opposing player will try to block as many as possible
+    N_blocking = p2.count_untapped(bd.ba)
+    resolve_blocks(p1,p2,N_attacking,N_blocking)
 
 ###################################################
 # discard rulesets
 
+def most_common_discard(p1):
+    """
+    The card Ruleset 01 discards next from a player's hand: one of the kind
+    it holds the most of, with ties going to lands, then Mulldrifters.
+    """
+
+    N_banes = (p1.hand.cardnames() == bd.ba).sum()
+    N_mulls = (p1.hand.cardnames() == bd.md).sum()
+    N_lands = (p1.hand.cardnames() == bd.bl).sum()
+
+    if ((N_banes > N_mulls) & (N_banes > N_lands)):
+        return bd.ba
+    elif ((N_mulls > N_banes) & (N_mulls > N_lands)):
+        return bd.md
+    elif ((N_lands >= N_banes) & (N_lands >= N_mulls)):
+        return bd.bl
+    elif ((N_banes == N_mulls) & (N_banes >= N_lands)):
+        return bd.md
+    elif ((N_banes == N_mulls) & (N_banes < N_lands)):
+        return bd.bl
+    elif ((N_banes >= N_mulls) & (N_banes == N_lands)):
+        return bd.bl
+    elif ((N_banes < N_mulls) & (N_banes == N_lands)):
+        return bd.md
+    elif ((N_mulls >= N_banes) & (N_mulls == N_lands)):
+        return bd.bl
+    elif ((N_mulls < N_banes) & (N_mulls == N_lands)):
+        return bd.ba
+
+    else:
+        raise Exception("This case isn't captured!")
+
 def discard_01(p1,p2):
 
     while p1.handsize() > 7:
+        p1.discard(most_common_discard(p1))
+
+###################################################
+# parameterized rulesets
+
+# the choices a ruleset in the Ruleset 01 family makes:
+#   land_first: play the turn's land before casting anything, or only after
+#   cast_at: fewest untapped lands to hard-cast a Baneslayer or Mulldrifter at (5 or more)
+#   evoke_at: fewest untapped lands to evoke a Mulldrifter at (3 or more)
+#   max_hand: hand size to discard down to at the end of the turn
+#   discard_order: card codes (0 for Baneslayer, 1 for Mulldrifter, 2 for
+#       land) in the order they're discarded, or None for the most-common rule
+#   max_blocks: most Baneslayers to block with, or None for as many as possible
+ruleset_params = namedtuple('ruleset_params',['land_first','cast_at','evoke_at','max_hand','discard_order','max_blocks'])
+
+# the parameters of Ruleset 01 itself
+params_01 = ruleset_params(True,5,3,7,None,None)
+
+def check_params(params):
+    """
+    Make sure a set of ruleset parameters describes a playable ruleset, and
+    return it as a ruleset_params with its discard order as a tuple, so it
+    can key the cache of built rulesets.
+    """
+
+    params = ruleset_params(*params)
+    if params.discard_order is not None:
+        params = params._replace(discard_order=tuple([int(code) for code in params.discard_order]))
+    if (params.cast_at < 5) or (params.evoke_at < 3):
+        raise Exception("Cards can't be cast with fewer lands than they cost!")
+    if params.max_hand < 0:
+        raise Exception("Hands can't be discarded down to fewer than 0 cards!")
+    if (params.discard_order is not None) and (sorted(params.discard_order) != [0,1,2]):
+        raise Exception("A discard order has to list every card code once!")
+    if (params.max_blocks is not None) and (params.max_blocks < 0):
+        raise Exception("Can't block with fewer than 0 Baneslayers!")
+    return params
+
+def cardplay_params(p1,p2,params):
+
+    # start by playing a land, unless it waits until the end
+    if params.land_first and (bd.bl in p1.hand.cardnames()):
+        p1.play(bd.bl)
+
+    # then try to play cards regularly, Baneslayers first
+    while p1.count_untapped_lands() >= params.cast_at:
+        if (bd.ba in p1.hand.cardnames()):
+            p1.play(bd.ba)
+        elif ((bd.md in p1.hand.cardnames()) & (p1.decksize() >= 2)):
+            p1.play(bd.md)
+        else:
+            break
+
+    # otherwise, try to evoke a Mulldrifter
+    while p1.count_untapped_lands() >= params.evoke_at:
+        if ((bd.md in p1.hand.cardnames()) & (p1.decksize() >= 2)):
+            p1.play(bd.md,use_altcost=True)
+        else:
+            break
+
+    # play the land now if it waited
+    if (not params.land_first) and (bd.bl in p1.hand.cardnames()):
+        p1.play(bd.bl)
+
+def combat_params(p1,p2,params):
+
+    # attack with all Baneslayers
+    N_attacking = p1.count_ready(bd.ba)
+    for i in range(N_attacking):
+        p1.attack(bd.ba)
+
+    # the opposing player blocks with as many as it's willing to
+    N_blocking = p2.count_untapped(bd.ba)
+    if params.max_blocks is not None:
+        N_blocking = min(N_blocking,params.max_blocks)
+    resolve_blocks(p1,p2,N_attacking,N_blocking)
 
-        N_banes = (p1.hand.cardnames() == bd.ba).sum()
-        N_mulls = (p1.hand.cardnames() == bd.md).sum()
-        N_lands = (p1.hand.cardnames() == bd.bl).sum()
-
-        if ((N_banes > N_mulls) & (N_banes > N_lands)):
-            p1.discard(bd.ba)
-        elif ((N_mulls > N_banes) & (N_mulls > N_lands)):
-            p1.discard(bd.md)
-        elif ((N_lands >= N_banes) & (N_lands >= N_mulls)):
-            p1.discard(bd.bl)
-        elif ((N_banes == N_mulls) & (N_banes >= N_lands)):
-            p1.discard(bd.md)
-        elif ((N_banes == N_mulls) & (N_banes < N_lands)):
-            p1.discard(bd.bl)
-        elif ((N_banes >= N_mulls) & (N_banes == N_lands)):
-            p1.discard(bd.bl)
-        elif ((N_banes < N_mulls) & (N_banes == N_lands)):
-            p1.discard(bd.md)
-        elif ((N_mulls >= N_banes) & (N_mulls == N_lands)):
-            p1.discard(bd.bl)
-        elif ((N_mulls < N_banes) & (N_mulls == N_lands)):
-            p1.discard(bd.ba)
+def discard_params(p1,p2,params):
 
+    while p1.handsize() > params.max_hand:
+        if params.discard_order is None:
+            p1.discard(most_common_discard(p1))
         else:
-            raise Exception("This case isn't captured!")
-            
\ No newline at end of file
+            held = p1.hand_counts()
+            p1.discard(bd.codenames[[code for code in params.discard_order if held[code] > 0][0]])
+
+# every ruleset triple built so far, by parameters
+families = dict()
+
+def make_rulesets(params=params_01):
+    """
+    The (cardplay, combat, discard) ruleset triple that makes the choices in
+    params, for the object engine.  Each set of parameters only gets built
+    once, so that decision tables compiled from it (see tables) are shared;
+    params_01 gives back Ruleset 01 itself.
+    """
+
+    params = check_params(params)
+    if params == params_01:
+        return (cardplay_01,combat_01,discard_01)
+    if params not in families:
+        def cardplay(p1,p2):
+            cardplay_params(p1,p2,params)
+        def combat(p1,p2):
+            combat_params(p1,p2,params)
+        def discard(p1,p2):
+            discard_params(p1,p2,params)
+        families[params] = (cardplay,combat,discard)
+    return families[params]
+
+def fast_forwardable(rulesets):
+    """
+    Whether games under a (cardplay, combat, discard) ruleset triple can be
+    fast-forwarded (see banedrifter.frozen, which assumes Ruleset 01's 5-
+    and 3-land thresholds): only Ruleset 01 itself, and the triples from
+    make_rulesets that cast at 5 and evoke at 3.
+    """
+
+    rulesets = tuple(rulesets)
+    if rulesets == (cardplay_01,combat_01,discard_01):
+        return True
+    for params, triple in families.items():
+        if triple == rulesets:
+            return (params.cast_at == 5) and (params.evoke_at == 3)
+    return False
@@ -0,0 +1,199 @@
+###################################################
+# imports
+
+from math import comb
+import numpy as np
+import banedrifter as bd
+import batch
+import sweep as sw
+
+###################################################
+# opening hands
+
+def opening_hands(deck,handsize=7):
+    """
+    Every opening hand composition of a (N_bane, N_mull, N_land) deck, with
+    its exact (multivariate hypergeometric) probability.  Returns an (N, 3)
+    array of hand counts and an (N,) array of probabilities.
+    """
+
+    N_bane, N_mull, N_land = [int(N) for N in deck]
+    handsize = min(handsize,N_bane+N_mull+N_land)
+    hands = list()
+    probs = list()
+    for h_bane in range(min(N_bane,handsize)+1):
+        for h_mull in range(min(N_mull,handsize-h_bane)+1):
+            h_land = handsize - h_bane - h_mull
+            if h_land <= N_land:
+                hands.append((h_bane,h_mull,h_land))
+                probs.append(comb(N_bane,h_bane)*comb(N_mull,h_mull)*comb(N_land,h_land))
+    probs = np.array(probs,dtype=float)
+    return np.array(hands,dtype=np.int64).reshape(-1,3), probs/probs.sum()
+
+def land_strata(hands,probs,min_weight=0.05):
+    """
+    Coarse strata of one deck's opening hands (as from opening_hands): the
+    number of lands in the hand, with unlikely counts at either end merged
+    into their neighbours so that the end strata hold at least min_weight of
+    the hands.  Returns the stratum of every hand and the number of strata.
+    """
+
+    land = np.bincount(hands[:,2],weights=probs)
+    low = int(np.searchsorted(np.cumsum(land),min_weight))
+    high = len(land) - 1 - int(np.searchsorted(np.cumsum(land[::-1]),min_weight))
+    low, high = min(low,len(land)-1), max(high,0)
+    if low > high:
+        low = high = int(np.argmax(land))
+    return np.clip(hands[:,2],low,high) - low, high - low + 1
+
+###################################################
+# stratified sampling
+
+class matchup_strata:
+    """
+    The strata of one seat order of a matchup: every pair of the two decks'
+    land strata, with the pairs too unlikely to get min_games games of their
+    own pooled into one last stratum, which draws its pairs in proportion to
+    their weights.  Every stratum knows its exact weight and how to draw
+    opening hands from it.
+    """
+
+    def __init__(self,first,second,N_games,handsize=7,min_games=4):
+
+        # the opening hands of each deck, and the land stratum of each hand
+        self.hands1, self.probs1 = opening_hands(first,handsize)
+        self.hands2, self.probs2 = opening_hands(second,handsize)
+        self.keys1, N1 = land_strata(self.hands1,self.probs1)
+        self.keys2, N2 = land_strata(self.hands2,self.probs2)
+        pairs = np.outer(np.bincount(self.keys1,weights=self.probs1,minlength=N1),
+                         np.bincount(self.keys2,weights=self.probs2,minlength=N2)).ravel()
+
+        # pairs[k] is the weight of the hands with land strata (k//N2, k%N2)
+        self.N2 = N2
+        self.pairs = pairs
+        big = np.flatnonzero(pairs*N_games >= min_games)
+        rest = np.flatnonzero((pairs*N_games < min_games) & (pairs > 0))
+        self.members = [big[k:k+1] for k in range(len(big))] + ([rest] if len(rest) > 0 else [])
+        self.weights = np.array([pairs[m].sum() for m in self.members])
+
+    def __len__(self):
+        return len(self.members)
+
+    # draw the opening hands of n games from stratum k
+    def draw(self,k,n,rng):
+        members = self.members[k]
+        pairs = rng.choice(members,size=n,p=self.pairs[members]/self.pairs[members].sum())
+        hand1 = np.zeros((n,3),dtype=np.int64)
+        hand2 = np.zeros((n,3),dtype=np.int64)
+        for key, hands, probs, which, out in ((self.keys1,self.hands1,self.probs1,pairs//self.N2,hand1),
+                                              (self.keys2,self.hands2,self.probs2,pairs%self.N2,hand2)):
+            for stratum in np.unique(which):
+                games = np.flatnonzero(which == stratum)
+                inside = np.flatnonzero(key == stratum)
+                out[games] = hands[rng.choice(inside,size=len(games),p=probs[inside]/probs[inside].sum())]
+        return hand1, hand2
+
+def allocate(weights,N_games,scales=None,minimum=2):
+    """
+    Split N_games between strata with the given weights, in proportion to
+    weights*scales (Neyman allocation, when scales are the strata's standard
+    deviations) or to the weights alone, giving every stratum at least
+    minimum games when there are enough to go around.  Returns the number of
+    games of each stratum.
+    """
+
+    minimum = min(minimum,N_games//len(weights))
+    share = weights if scales is None else weights*scales
+    if share.sum() == 0:
+        share = weights
+    N = np.full(len(weights),minimum,dtype=np.int64)
+    ideal = np.maximum(share/share.sum()*N_games - minimum,0.0)
+    if ideal.sum() > 0:
+        ideal *= max(N_games - N.sum(),0)/ideal.sum()
+
+    # round down, and hand what's left to the largest remainders
+    N += np.floor(ideal).astype(np.int64)
+    left = max(N_games - N.sum(),0)
+    N[np.argsort(np.floor(ideal) - ideal,kind='stable')[:left]] += 1
+    return N
+
+def stratified_estimate(outcomes,strata,weights):
+    """
+    Stratified estimate of the mean outcome, and of the variance of that
+    estimate, from per-game outcomes (along the first axis) and the stratum
+    of every game.
+    """
+
+    shape = outcomes.shape[1:]
+    outcomes = outcomes.reshape(len(strata),-1)
+    N = np.bincount(strata,minlength=len(weights))[:,None]
+    W = weights[:,None]
+
+    sums = np.zeros((len(weights),outcomes.shape[1]))
+    squares = np.zeros((len(weights),outcomes.shape[1]))
+    np.add.at(sums,strata,outcomes)
+    np.add.at(squares,strata,outcomes**2)
+    means = sums/np.maximum(N,1)
+    variances = np.maximum(squares - N*means**2,0.0)/np.maximum(N-1,1)
+
+    return (W*means).sum(axis=0).reshape(shape), (W**2*variances/np.maximum(N,1)).sum(axis=0).reshape(shape)
+
+def play_strata(first,second,strata,N,rng,swapped=False,lazy=False):
+    """
+    Play N[k] games from every stratum k of a matchup_strata.  Returns the
+    stratum of every game and its outcome counts (see sweep.tally).
+    """
+
+    drawn = [strata.draw(k,n,rng) for k, n in enumerate(N)]
+    hands1 = np.concatenate([hand1 for hand1, _ in drawn])
+    hands2 = np.concatenate([hand2 for _, hand2 in drawn])
+    winner, loss_reason = batch.play_games_batch(first,second,len(hands1),rng=rng,lazy=lazy,hands1=hands1,hands2=hands2)
+    return np.repeat(np.arange(len(N)),N), sw.tally(winner[:,None],loss_reason[:,None],swapped=swapped)
+
+def stratified_matchup(deck1,deck2,N_games,rng=None,handsize=7,lazy=False,pilot=0.2):
+    """
+    Play N_games Ruleset 01 games between two decks with the batch engine,
+    half with each deck going first, stratified by the number of lands in
+    both opening hands and weighted by their exact probabilities.  A pilot
+    share of the games is allocated in proportion to the strata's weights;
+    the rest go where the pilot's win rates say they reduce the variance
+    most (Neyman allocation).  Returns the estimated outcome probabilities
+    (in the layout of sweep.outcomes), the estimated win rate of deck1, and
+    the standard error of that win rate.
+    """
+
+    if rng is None:
+        rng = bd.rng
+    deck1 = np.asarray(deck1,dtype=np.int64)
+    deck2 = np.asarray(deck2,dtype=np.int64)
+
+    probs = np.zeros(len(sw.outcomes))
+    rate_variance = 0.0
+    for swapped, N in ((False,N_games-N_games//2),(True,N_games//2)):
+        first, second = (deck2,deck1) if swapped else (deck1,deck2)
+        if N == 0:
+            continue
+        strata = matchup_strata(first,second,N,handsize)
+
+        # the pilot games, allocated in proportion to the weights
+        N_pilot = allocate(strata.weights,min(max(int(pilot*N),2*len(strata)),N))
+        labels, counts = play_strata(first,second,strata,N_pilot,rng,swapped,lazy)
+
+        # the rest go to the strata whose win rates are the most uncertain
+        wins = counts[:,sw.i_p1_life] + counts[:,sw.i_p1_mill]
+        rates = (np.bincount(labels,weights=wins,minlength=len(strata)) + 1)/(N_pilot + 2)
+        N_total = allocate(strata.weights,N,scales=np.sqrt(rates*(1 - rates)))
+        short = np.maximum(N_total - N_pilot,0).astype(float)
+        N_more = allocate(short if short.sum() > 0 else strata.weights,N - N_pilot.sum(),minimum=0)
+        more_labels, more_counts = play_strata(first,second,strata,N_more,rng,swapped,lazy)
+        labels = np.concatenate((labels,more_labels))
+        counts = np.concatenate((counts,more_counts))
+
+        # each seat order makes up half of the matchup
+        means, _ = stratified_estimate(counts.astype(float),labels,strata.weights)
+        _, win_variance = stratified_estimate((counts[:,sw.i_p1_life] + counts[:,sw.i_p1_mill]).astype(float),labels,strata.weights)
+        probs += means/2
+        rate_variance += win_variance/4
+
+    rate = probs[sw.i_p1_life] + probs[sw.i_p1_mill]
+    return probs, rate, np.sqrt(rate_variance)
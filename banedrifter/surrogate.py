@@ -0,0 +1,272 @@
+###################################################
+# imports
+
+import sys
+import argparse
+import numpy as np
+import banedrifter as bd
+import sweep as sw
+
+###################################################
+# the deck lattice
+
+# where win rates can jump: a deck with no Baneslayers, or with too few lands
+# to ever evoke or cast a Mulldrifter or cast a Baneslayer, plays a different
+# game than its neighbors, so smoothing never crosses these boundaries
+bane_segments = (0,1)
+land_segments = (0,3,5)
+
+def lattice_coords(decks):
+    """
+    The (N_bane, N_land) lattice coordinates of every deck; a deck's number
+    of Mulldrifters is fixed by its size.
+    """
+
+    decks = np.atleast_2d(np.asarray(decks,dtype=np.int64))
+    return decks[:,0], decks[:,2]
+
+def segment_ids(length,starts):
+    """
+    The segment of every position along a lattice axis, for segments
+    starting at the given positions.
+    """
+
+    return np.searchsorted(np.asarray(starts),np.arange(length),side='right')
+
+def neighbors(b,l,bandwidth,orders=(0,0)):
+    """
+    Gaussian smoothing weights between the decks at lattice coordinates
+    (b, l), which never mix positions from different segments of an axis.
+    Returns a list of (neighbor, weight) arrays, one pair for every offset
+    within reach: neighbor[k] is the deck at that offset from deck k, or
+    deck k itself with zero weight if there's none.  Along an axis with
+    order n, each neighbor is also weighted by its offset to the nth power,
+    which gives the moments needed for a local linear fit.
+    """
+
+    radius = int(np.ceil(2*bandwidth))
+    size = int(max(b.max(),l.max())) + 1
+    bseg = segment_ids(size,bane_segments)
+    lseg = segment_ids(size,land_segments)
+    index = np.full((size+2*radius,size+2*radius),-1,dtype=np.int64)
+    index[b+radius,l+radius] = np.arange(len(b))
+
+    pairs = list()
+    for db in range(-radius,radius+1):
+        for dl in range(-radius,radius+1):
+            weight = np.exp(-(db**2 + dl**2)/(2.0*bandwidth**2))*float(db)**orders[0]*float(dl)**orders[1]
+            found = index[b+db+radius,l+dl+radius]
+            same = (found >= 0) & (bseg[np.clip(b+db,0,size-1)] == bseg[b]) & (lseg[np.clip(l+dl,0,size-1)] == lseg[l])
+            if (weight != 0) and same.any():
+                pairs.append((np.where(same,found,np.arange(len(b))),np.where(same,weight,0.0)))
+    return pairs
+
+def smooth(values,pairs1,pairs2):
+    """
+    Smooth an (N_decks, N_decks) array of per-matchup values over the 4D
+    lattice of (N_bane1, N_land1, N_bane2, N_land2), with the neighbor
+    weights of the first deck along the rows and of the second along the
+    columns (as from neighbors).  Only matchups are ever on the lattice, so
+    this never needs more than the matchups themselves.
+    """
+
+    rows = np.zeros_like(values)
+    for neighbor, weight in pairs1:
+        rows += weight[:,None]*values[neighbor,:]
+    out = np.zeros_like(values)
+    for neighbor, weight in pairs2:
+        out += weight[None,:]*rows[:,neighbor]
+    return out
+
+###################################################
+# surrogate class
+
+class surrogate:
+    """
+    A local linear, kernel-weighted estimate of the win rate of every
+    matchup between a set of decks, from the matchups simulated so far,
+    along with an estimate of how far off it is.  Matchups live on the 4D
+    lattice of (N_bane1, N_land1, N_bane2, N_land2), and their uncertainty
+    is the local leave-one-out error of the fit over the nearby simulated
+    matchups, less their own sampling noise.
+    """
+
+    def __init__(self,decks,bandwidth=0.75,min_neighbors=1.0,ridge=1e-3,chunksize=100000):
+
+        self.decks = np.atleast_2d(np.asarray(decks,dtype=np.int64))
+        self.bandwidth = bandwidth
+        self.min_neighbors = min_neighbors
+        self.ridge = ridge
+        self.chunksize = chunksize
+        self.b, self.l = lattice_coords(self.decks)
+
+        # the smoothing weights between decks, by the orders of their offsets
+        self.neighbors = dict()
+
+        # one of each (i, j) and (j, i) pair; both are on the lattice, but
+        # the second is just the seat-swapped first
+        self.cells = sw.symmetric_cells(len(self.decks))
+        self.wins = np.zeros(len(self.cells))
+        self.losses = np.zeros(len(self.cells))
+        self.games = np.zeros(len(self.cells))
+
+        self.estimate = np.full(len(self.cells),np.nan)
+        self.uncertainty = np.full(len(self.cells),np.inf)
+
+    # add the outcome counts of some of the cells (by index into self.cells)
+    def add(self,chosen,counts):
+        counts = np.asarray(counts).reshape(len(chosen),-1)
+        np.add.at(self.wins,chosen,counts[:,sw.i_p1_life] + counts[:,sw.i_p1_mill])
+        np.add.at(self.losses,chosen,counts[:,sw.i_p2_life] + counts[:,sw.i_p2_mill])
+        np.add.at(self.games,chosen,counts.sum(axis=-1))
+
+    # the smoothing weights between decks for offsets of the given orders
+    def weights(self,orders):
+        if orders not in self.neighbors:
+            self.neighbors[orders] = neighbors(self.b,self.l,self.bandwidth,orders)
+        return self.neighbors[orders]
+
+    # smooth per-cell values (and the transposes' values) over the lattice,
+    # and read off the result at every cell
+    def lattice(self,values,transposed_values,orders=(0,0,0,0)):
+        i, j = self.cells[:,0], self.cells[:,1]
+        array = np.zeros((len(self.decks),len(self.decks)))
+        array[i,j] = values
+        array[j,i] = transposed_values
+        return smooth(array,self.weights(tuple(orders[:2])),self.weights(tuple(orders[2:])))[i,j]
+
+    # refit to every simulated cell
+    def fit(self):
+        observed = (self.games > 0)
+        g = self.games
+        with np.errstate(invalid='ignore',divide='ignore'):
+            rate = np.where(observed,self.wins/g,0.0)
+            swapped = np.where(observed,self.losses/g,0.0)
+
+        # weighted least squares of the win rate on the lattice offsets
+        # around each cell: A holds the moments of the offsets, and y the
+        # moments of the win rates
+        A = np.zeros((len(self.cells),5,5))
+        y = np.zeros((len(self.cells),5))
+        A[:,0,0] = self.lattice(g,g)
+        y[:,0] = self.lattice(g*rate,g*swapped)
+        for a in range(4):
+            orders = [0,0,0,0]
+            orders[a] = 1
+            A[:,0,a+1] = A[:,a+1,0] = self.lattice(g,g,orders)
+            y[:,a+1] = self.lattice(g*rate,g*swapped,orders)
+            for c in range(a,4):
+                orders = [0,0,0,0]
+                orders[a] += 1
+                orders[c] += 1
+                A[:,a+1,c+1] = A[:,c+1,a+1] = self.lattice(g,g,orders)
+
+        # a little ridge keeps the slopes solvable with few neighbors
+        fitted = (A[:,0,0] > 0)
+        A[:,range(1,5),range(1,5)] += (self.ridge*A[:,0,0] + 1e-9)[:,None]
+        estimate = np.full(len(self.cells),np.nan)
+        leverage = np.zeros(len(self.cells))
+        for start in range(0,len(self.cells),self.chunksize):
+            k = np.flatnonzero(fitted[start:start+self.chunksize]) + start
+            rhs = np.stack((y[k],np.eye(5)[np.zeros(len(k),dtype=np.int64)]),axis=-1)
+            solution = np.linalg.solve(A[k],rhs)
+            estimate[k] = solution[:,0,0]
+            leverage[k] = g[k]*solution[:,0,1]
+
+        # leave-one-out errors of the simulated cells, less their sampling noise
+        with np.errstate(invalid='ignore',divide='ignore'):
+            loo = np.where(observed & (leverage < 1),(rate - estimate)/(1 - leverage),0.0)
+            errors = np.where(observed,loo**2 - rate*(1-rate)/g,0.0)
+        counted = (observed & (leverage < 1)).astype(float)
+        neighbors = self.lattice(counted,counted)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            error = self.lattice(errors*counted,errors*counted)/neighbors
+
+        self.estimate = np.where(observed,rate,np.clip(estimate,0.0,1.0))
+        self.uncertainty = np.where(fitted & (neighbors >= self.min_neighbors),np.sqrt(np.maximum(error,0.0)),np.inf)
+        self.uncertainty[observed] = 0.0
+        return self.estimate, self.uncertainty
+
+    # the estimated win rates and their uncertainties as full grids, with
+    # the transposed cells seen from the other deck's side
+    def grids(self):
+        N_decks = len(self.decks)
+        i, j = self.cells[:,0], self.cells[:,1]
+        rates = np.full((N_decks,N_decks),0.5)
+        uncertainty = np.zeros((N_decks,N_decks))
+        simulated = np.zeros((N_decks,N_decks),dtype=bool)
+        with np.errstate(invalid='ignore',divide='ignore'):
+            swapped = np.where(self.games > 0,self.losses/self.games,1.0 - self.estimate)
+        rates[i,j] = self.estimate
+        rates[j,i] = swapped
+        uncertainty[i,j] = uncertainty[j,i] = self.uncertainty
+        simulated[i,j] = simulated[j,i] = (self.games > 0)
+        return rates, simulated, uncertainty
+
+###################################################
+# surrogate-guided sweep
+
+def surrogate_sweep(decksize,N_games=1000,initial=0.05,batchcells=None,tolerance=0.02,max_fraction=0.5,bandwidth=0.75,engine='batch',rng=None,verbose=True):
+    """
+    Estimate the win rate of every matchup between the decks of a given
+    size while only simulating some of them.  A random initial fraction of
+    the matchups is played first, N_games games each; then a surrogate is
+    fitted to what's been played, and each round plays the batchcells
+    matchups whose estimates are the most uncertain, until no unplayed
+    matchup is estimated to be off by more than tolerance or max_fraction
+    of the matchups have been played.  Returns the win rate of every
+    matchup (deck index as in sweep.deck_grid, mirrors at 50%), whether
+    each one was simulated rather than filled in by the surrogate, and the
+    estimated error of every filled-in rate.
+    """
+
+    if rng is None:
+        rng = bd.rng
+    decks = sw.deck_grid(decksize)
+    model = surrogate(decks,bandwidth=bandwidth)
+    cells = model.cells
+    if batchcells is None:
+        batchcells = max(len(cells)//50,1)
+    played = np.zeros(len(cells),dtype=bool)
+
+    # a first look at a random subset of the matchups
+    chosen = rng.choice(len(cells),size=max(int(initial*len(cells)),1),replace=False)
+    while True:
+        model.add(chosen,sw.play_matchups(decks[cells[chosen,0]],decks[cells[chosen,1]],N_games,engine=engine,rng=rng))
+        played[chosen] = True
+        estimate, uncertainty = model.fit()
+        N_left = min(batchcells,int(max_fraction*len(cells)) - played.sum())
+        N_unsure = (uncertainty > tolerance).sum()
+        if verbose:
+            print('\r%d/%d matchups played, %d estimated to be off by more than %g' % (played.sum(),len(cells),N_unsure,tolerance),
+                  end='',file=sys.stderr,flush=True)
+        if (N_left <= 0) or (N_unsure == 0):
+            break
+        order = np.argsort(-uncertainty,kind='stable')[:N_left]
+        chosen = order[uncertainty[order] > tolerance]
+    if verbose:
+        print('',file=sys.stderr)
+
+    return model.grids()
+
+###################################################
+# command line interface
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Estimate a Ruleset 01 win rate grid, simulating only where a surrogate is unsure.')
+    parser.add_argument('output',help='where to save the win rates, simulated flags and estimated errors (.npz)')
+    parser.add_argument('--decksize',type=int,default=40,help='number of cards in every deck')
+    parser.add_argument('--games',type=int,default=1000,help='games per simulated matchup')
+    parser.add_argument('--tolerance',type=float,default=0.02,help='largest estimated error of a filled-in win rate')
+    parser.add_argument('--maxfraction',type=float,default=0.5,help='largest fraction of the matchups to simulate')
+    parser.add_argument('--bandwidth',type=float,default=0.75,help='smoothing bandwidth, in cards')
+    parser.add_argument('--seed',type=int,default=None,help='seed for the random number generator')
+    args = parser.parse_args(argv)
+
+    rates, simulated, uncertainty = surrogate_sweep(args.decksize,N_games=args.games,tolerance=args.tolerance,max_fraction=args.maxfraction,
+                                                    bandwidth=args.bandwidth,rng=np.random.default_rng(args.seed))
+    np.savez(args.output,rates=rates,simulated=simulated,uncertainty=uncertainty)
+
+if __name__ == '__main__':
+    main()
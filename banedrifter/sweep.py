@@ -0,0 +1,518 @@
+###################################################
+# imports
+
+import sys
+import time
+import argparse
+import multiprocessing
+import numpy as np
+import banedrifter as bd
+import rulesets as rs
+import batch
+import tables as tb
+
+###################################################
+# useful constants
+
+# the outcomes counted for every matchup; "p1" is always the deck from the
+# first list of deck specs, whichever seat it happened to be playing from
+outcomes = ('p1_life','p1_mill','p2_life','p2_mill','draw')
+i_p1_life = 0
+i_p1_mill = 1
+i_p2_life = 2
+i_p2_mill = 3
+i_draw = 4
+
+# the rulesets implemented by the batch engine
+rulesets_01 = (rs.cardplay_01,rs.combat_01,rs.discard_01)
+
+###################################################
+# deck enumeration
+
+def deck_grid(decksize=40,N_land=None):
+    """
+    All (N_bane, N_mull, N_land) decks of a given size, in the order used on
+    the blog: deck #1 is all lands, the number of Baneslayers is the outer
+    index and the number of Mulldrifters the inner one.  If N_land is given,
+    only the decks running that many lands are returned.
+    """
+
+    decks = list()
+    for N_bane in range(decksize+1):
+        for N_mull in range(decksize+1-N_bane):
+            if (N_land is None) or (decksize-N_bane-N_mull == N_land):
+                decks.append((N_bane,N_mull,decksize-N_bane-N_mull))
+    return np.array(decks,dtype=np.int64).reshape(-1,3)
+
+###################################################
+# seat symmetry
+
+def swap_seats(counts):
+    """
+    The same outcome counts, seen from the other deck's side.
+    """
+
+    return np.asarray(counts)[...,[i_p2_life,i_p2_mill,i_p1_life,i_p1_mill,i_draw]]
+
+def winrate(counts,mirrors=False):
+    """
+    Win rate of the first deck in every cell of an outcome count array.  If
+    mirrors is set, the diagonal is a grid of mirror matchups and is exactly
+    50% whether or not it was played.
+    """
+
+    counts = np.asarray(counts,dtype=float)
+    games = counts.sum(axis=-1)
+    with np.errstate(invalid='ignore',divide='ignore'):
+        rates = (counts[...,i_p1_life] + counts[...,i_p1_mill])/games
+    if mirrors:
+        np.fill_diagonal(rates,0.5)
+    return rates
+
+def symmetric_cells(N_decks,mirrors=False):
+    """
+    The (i, j) cells with i < j of a square grid, which together with their
+    transposes cover it, plus the diagonal if mirrors is set.
+    """
+
+    return np.argwhere(np.triu(np.ones((N_decks,N_decks),dtype=bool),k=0 if mirrors else 1))
+
+###################################################
+# playing matchups
+
+def tally(winner,loss_reason,swapped=False):
+    """
+    Count the outcomes of a set of games along the last axis.  If swapped,
+    the deck of interest was sitting in the second seat.
+    """
+
+    winner = np.asarray(winner)
+    loss_reason = np.asarray(loss_reason)
+    first = (winner == 1)
+    second = (winner == 2)
+    if swapped:
+        first, second = second, first
+    counts = np.zeros(winner.shape[:-1]+(len(outcomes),),dtype=np.int64)
+    counts[...,i_p1_life] = (first & (loss_reason == 'life')).sum(axis=-1)
+    counts[...,i_p1_mill] = (first & (loss_reason == 'mill')).sum(axis=-1)
+    counts[...,i_p2_life] = (second & (loss_reason == 'life')).sum(axis=-1)
+    counts[...,i_p2_mill] = (second & (loss_reason == 'mill')).sum(axis=-1)
+    counts[...,i_draw] = (winner == 0).sum(axis=-1)
+    return counts
+
+def object_games(decks1,decks2,N_games,rulesets=None,rng=None,seed=None,matchups=None,first_game=0,lazy=False,common_seed=None):
+    """
+    Play N_games games between every deck in decks1 and the deck in the same
+    position of decks2 with the object engine, one at a time, with seats,
+    seeding, lazy decks and common random numbers as in play_matchups;
+    unless a seed is given, decks are shuffled with rng.  Yields the position of the matchup, the game's position within it,
+    whether the decks2 player went first, and what play_game returned, as
+    soon as each game is over.  Games are only fast-forwarded under
+    rulesets that banedrifter.frozen holds for (see
+    rulesets.fast_forwardable).
+    """
+
+    if rulesets is None:
+        rulesets = rulesets_01
+    if rng is None:
+        rng = bd.rng
+    decks1 = np.atleast_2d(np.asarray(decks1,dtype=np.int64))
+    decks2 = np.atleast_2d(np.asarray(decks2,dtype=np.int64))
+    if lazy and ((seed is not None) or (common_seed is not None)):
+        raise Exception("Replayable games need shuffled libraries, not lazy ones!")
+    if (seed is not None) and (common_seed is not None):
+        raise Exception("Games can either be replayable or use common random numbers, not both!")
+    if matchups is None:
+        matchups = np.arange(len(decks1))
+    games = np.arange(first_game,first_game+N_games)
+    if seed is None:
+        going_first = (games < first_game + N_games - N_games//2)
+    else:
+        going_first = (games % 2 == 0)
+
+    # Ruleset 01 has been checked against its decision tables (see tables.check)
+    fast_forward = rs.fast_forwardable(rulesets)
+    if tuple(rulesets) == rulesets_01:
+        rulesets = tb.compile_rulesets(rulesets)
+    for i, (d1, d2) in enumerate(zip(decks1,decks2)):
+        if common_seed is not None:
+            orders1 = batch.common_orders(d1,common_seed,1,games)
+            orders2 = batch.common_orders(d2,common_seed,2,games)
+        for k, game in enumerate(games):
+            # games that can't be replayed are shuffled with the caller's rng,
+            # so that workers with their own seeds play different games
+            game_generator = rng
+            if seed is not None:
+                game_generator = bd.game_rng(seed,int(matchups[i]),int(game))
+            deck_a = bd.deck(*d1,compact=True,rng=game_generator,lazy=lazy)
+            deck_b = bd.deck(*d2,compact=True,rng=game_generator,lazy=lazy)
+            if common_seed is not None:
+                deck_a.cards = np.repeat(np.arange(3,dtype=np.int8),d1)[orders1[k,:d1.sum()]]
+                deck_b.cards = np.repeat(np.arange(3,dtype=np.int8),d2)[orders2[k,:d2.sum()]]
+            pa = bd.player(deck_a,loglevel=bd.log_off)
+            pb = bd.player(deck_b,loglevel=bd.log_off)
+            if not going_first[k]:
+                pa, pb = pb, pa
+            yield i, k, not going_first[k], bd.play_game(pa,pb,*rulesets,fast_forward=fast_forward)
+
+def play_matchups(decks1,decks2,N_games,rulesets=None,engine='batch',rng=None,seed=None,matchups=None,first_game=0,lazy=False,common_seed=None):
+    """
+    Play N_games games between every deck in decks1 and the deck in the same
+    position of decks2, half of them with each deck going first.  Returns the
+    outcome counts, of shape (len(decks1), 5).
+
+    If seed is given, every game is shuffled with its own random number
+    generator spawned from (seed, matchup index, game index), so that any
+    single game can be regenerated with banedrifter.replay_game.  matchups
+    gives the matchup index of each pair of decks (by default, its position
+    in the lists), games are numbered from first_game, and decks1 goes first
+    in the even-numbered games.
+
+    If lazy is set, libraries are never shuffled, and every card is picked
+    from what's left in the library as it's drawn (see
+    banedrifter.lazy_deck), which keeps large decks cheap.
+
+    If common_seed is given, game g of every matchup shuffles the decks from
+    decks1 with the same random keys, and likewise the decks from decks2 (see
+    batch.common_orders), so that matchups between neighboring decks are
+    played with common random numbers and their differences are much less
+    noisy.
+    """
+
+    if rulesets is None:
+        rulesets = rulesets_01
+    if rng is None:
+        rng = bd.rng
+    decks1 = np.atleast_2d(np.asarray(decks1,dtype=np.int64))
+    decks2 = np.atleast_2d(np.asarray(decks2,dtype=np.int64))
+    if lazy and ((seed is not None) or (common_seed is not None)):
+        raise Exception("Replayable games need shuffled libraries, not lazy ones!")
+    if (seed is not None) and (common_seed is not None):
+        raise Exception("Games can either be replayable or use common random numbers, not both!")
+    if matchups is None:
+        matchups = np.arange(len(decks1))
+    games = np.arange(first_game,first_game+N_games)
+    if seed is None:
+        going_first = (games < first_game + N_games - N_games//2)
+    else:
+        going_first = (games % 2 == 0)
+    counts = np.zeros((len(decks1),len(outcomes)),dtype=np.int64)
+
+    if engine == 'batch':
+        if tuple(rulesets) != rulesets_01:
+            raise Exception("The batch engine only knows how to play Ruleset 01!")
+        for swapped in (False,True):
+            seatgames = games[going_first != swapped]
+            if len(seatgames) == 0:
+                continue
+            orders1, orders2 = None, None
+            if seed is not None:
+                orders1, orders2 = batch.game_orders(np.repeat(decks1,len(seatgames),axis=0),np.repeat(decks2,len(seatgames),axis=0),
+                                                     seed,np.repeat(matchups,len(seatgames)),np.tile(seatgames,len(decks1)))
+            if common_seed is not None:
+                orders1 = batch.common_orders(decks1,common_seed,1,seatgames)
+                orders2 = batch.common_orders(decks2,common_seed,2,seatgames)
+            if swapped:
+                counts += tally(*batch.play_games_batch(decks2,decks1,len(seatgames),rng=rng,orders1=orders2,orders2=orders1,lazy=lazy),swapped=True)
+            else:
+                counts += tally(*batch.play_games_batch(decks1,decks2,len(seatgames),rng=rng,orders1=orders1,orders2=orders2,lazy=lazy))
+        return counts
+
+    if engine == 'object':
+        winners = np.zeros((len(decks1),N_games),dtype=np.int8)
+        reasons = np.full((len(decks1),N_games),None,dtype=object)
+        for i, k, swapped, (p1, p2, winner, loss_reason) in object_games(decks1,decks2,N_games,rulesets=rulesets,rng=rng,seed=seed,matchups=matchups,
+                                                                          first_game=first_game,lazy=lazy,common_seed=common_seed):
+            winners[i,k] = winner
+            reasons[i,k] = loss_reason
+        counts += tally(winners[:,going_first],reasons[:,going_first])
+        counts += tally(winners[:,~going_first],reasons[:,~going_first],swapped=True)
+        return counts
+
+    raise Exception("Engine not recognized!")
+
+def play_variants(decks1,decks2,N_games,variants,rng=None,seed=None,matchups=None,first_game=0,common_seed=None):
+    """
+    Play N_games games of every matchup, as in play_matchups, under each of
+    a list of ruleset variants (see rulesets.ruleset_params), all in one
+    batch.  Game g of a matchup is dealt the same libraries under every
+    variant, so differences between variants are measured with common random
+    numbers.  Returns the outcome counts, of shape
+    (len(variants), len(decks1), 5).
+
+    seed and common_seed work as in play_matchups; with a seed, every game
+    under a variant can also be regenerated by banedrifter.replay_game with
+    that variant's rulesets.make_rulesets.
+    """
+
+    if rng is None:
+        rng = bd.rng
+    decks1 = np.atleast_2d(np.asarray(decks1,dtype=np.int64))
+    decks2 = np.atleast_2d(np.asarray(decks2,dtype=np.int64))
+    if (seed is not None) and (common_seed is not None):
+        raise Exception("Games can either be replayable or use common random numbers, not both!")
+    if matchups is None:
+        matchups = np.arange(len(decks1))
+    N_variants = len(variants)
+    games = np.arange(first_game,first_game+N_games)
+    if seed is None:
+        going_first = (games < first_game + N_games - N_games//2)
+    else:
+        going_first = (games % 2 == 0)
+    counts = np.zeros((N_variants,len(decks1),len(outcomes)),dtype=np.int64)
+
+    for swapped in (False,True):
+        seatgames = games[going_first != swapped]
+        if len(seatgames) == 0:
+            continue
+
+        # shuffle every game once, and deal the same libraries to every variant
+        if seed is not None:
+            orders1, orders2 = batch.game_orders(np.repeat(decks1,len(seatgames),axis=0),np.repeat(decks2,len(seatgames),axis=0),
+                                                 seed,np.repeat(matchups,len(seatgames)),np.tile(seatgames,len(decks1)))
+        elif common_seed is not None:
+            orders1 = batch.common_orders(decks1,common_seed,1,seatgames)
+            orders2 = batch.common_orders(decks2,common_seed,2,seatgames)
+        else:
+            orders1 = batch.random_orders(decks1,len(seatgames),rng)
+            orders2 = batch.random_orders(decks2,len(seatgames),rng)
+        table = batch.variant_table(variants,np.repeat(np.arange(N_variants),len(decks1)*len(seatgames)))
+
+        first, second = (decks1,orders1), (decks2,orders2)
+        if swapped:
+            first, second = second, first
+        winner, loss_reason = batch.play_games_batch(np.tile(first[0],(N_variants,1)),np.tile(second[0],(N_variants,1)),len(seatgames),rng=rng,
+                                                     orders1=np.tile(first[1],(N_variants,1)),orders2=np.tile(second[1],(N_variants,1)),variants=table)
+        counts += tally(winner,loss_reason,swapped=swapped).reshape(N_variants,len(decks1),-1)
+    return counts
+
+###################################################
+# work units
+
+def estimated_cost(decks):
+    """
+    A rough relative cost of playing games with each deck: games run longer
+    when fewer Baneslayers can ever be cast, mostly ending in mills.
+    """
+
+    decks = np.atleast_2d(decks)
+    decksize = np.maximum(decks.sum(axis=1),1)
+    castable = np.where(decks[:,2] >= 5,decks[:,0],0)
+    return 1.0 + decksize*(1.0 - castable/decksize)
+
+def make_units(deck_specs_1,deck_specs_2,N_games,unitgames=50000,cells=None):
+    """
+    Split a matchup grid into work units of roughly equal estimated cost.
+    Each unit is an array of (i, j) cell indices; units come back ordered
+    from most to least expensive, so that a pool finishes them evenly.
+    """
+
+    if cells is None:
+        i, j = np.meshgrid(np.arange(len(deck_specs_1)),np.arange(len(deck_specs_2)),indexing='ij')
+        cells = np.stack((i.ravel(),j.ravel()),axis=1)
+    cells = np.asarray(cells,dtype=np.int64).reshape(-1,2)
+    if len(cells) == 0:
+        return list()
+
+    # cut the grid into runs of cells with about the same total cost
+    cost = estimated_cost(deck_specs_1)[cells[:,0]] + estimated_cost(deck_specs_2)[cells[:,1]]
+    budget = max(unitgames//max(N_games,1),1)*cost.mean()
+    bounds = np.searchsorted(np.cumsum(cost),budget*np.arange(1,int(cost.sum()/budget)+1),side='right')
+    pieces = [piece for piece in np.split(np.arange(len(cells)),np.unique(bounds)) if len(piece) > 0]
+
+    unitcost = np.array([cost[piece].sum() for piece in pieces])
+    return [cells[pieces[k]] for k in np.argsort(-unitcost,kind='stable')]
+
+def run_unit(args):
+    """
+    Play all matchups in a single work unit.
+    """
+
+    unit, deck_specs_1, deck_specs_2, N_games, rulesets, engine, seedseq, replay_seed, lazy, common_seed = args
+    rng = np.random.default_rng(seedseq)
+    matchups = unit[:,0]*len(deck_specs_2) + unit[:,1]
+    counts = play_matchups(deck_specs_1[unit[:,0]],deck_specs_2[unit[:,1]],N_games,rulesets=rulesets,engine=engine,rng=rng,
+                           seed=replay_seed,matchups=matchups,lazy=lazy,common_seed=common_seed)
+    return unit, counts
+
+###################################################
+# running work units
+
+def start_pool(function,work,processes=None):
+    """
+    Start mapping a function over a list of work units, on a process pool
+    unless only one process is asked for.  Returns the pool (or None) and an
+    iterator over the results in the order they finish.
+    """
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        return pool, pool.imap_unordered(function,work)
+    return None, map(function,work)
+
+def report(N_done,N_total,N_games,starttime,end=''):
+    """
+    Print the progress of a sweep and its overall rate of play.
+    """
+
+    elapsed = time.time() - starttime
+    rate = N_done*N_games/max(elapsed,1e-9)
+    eta = (N_total-N_done)*N_games/max(rate,1e-9)
+    print('\r%d/%d matchups, %.0f games/sec, %.0f s remaining' % (N_done,N_total,rate,eta),end=end,file=sys.stderr,flush=True)
+
+###################################################
+# sweep function
+
+def sweep(deck_specs_1,deck_specs_2,N_games,rulesets=None,engine='batch',processes=None,unitgames=50000,seed=None,replayable=False,lazy=False,common=False,play_mirrors=False,verbose=True):
+    """
+    Play N_games games for every matchup between a deck in deck_specs_1 and a
+    deck in deck_specs_2, half with each deck going first, sharding the grid
+    across a process pool.  Returns the outcome counts, of shape
+    (len(deck_specs_1), len(deck_specs_2), 5).
+
+    When both lists hold the same decks, each pair of decks is only played
+    once and the transposed cell is filled with the seat-swapped counts of
+    the same games.  Mirror matchups are then left empty (they are exactly
+    50%, see winrate) unless play_mirrors is set.
+
+    If replayable is set, every game draws from its own random number
+    generator, so that game g of the matchup in cell (i, j) can be
+    regenerated afterwards with
+    banedrifter.replay_game((seed, i*len(deck_specs_2) + j, g),
+    deck_specs_1[i], deck_specs_2[j], ...).  In a symmetric sweep, only the
+    cells with i <= j are played: game g of a cell (i, j) with i > j is
+    the replay of (seed, j*len(deck_specs_2) + i, g) with decks
+    (deck_specs_1[j], deck_specs_2[i]), with the winner flipped.  If
+    lazy is set, cards are picked from the libraries as they're drawn rather
+    than shuffled up front (see play_matchups).  If common is set, every
+    matchup is played with the same random keys for its shuffles, so that
+    differences between neighboring cells are measured with common random
+    numbers.
+    """
+
+    if replayable and (seed is None):
+        raise Exception("A replayable sweep needs a seed!")
+    if common and (seed is None):
+        raise Exception("A sweep with common random numbers needs a seed!")
+
+    deck_specs_1 = np.atleast_2d(np.asarray(deck_specs_1,dtype=np.int64))
+    deck_specs_2 = np.atleast_2d(np.asarray(deck_specs_2,dtype=np.int64))
+    counts = np.zeros((len(deck_specs_1),len(deck_specs_2),len(outcomes)),dtype=np.int64)
+
+    symmetric = (deck_specs_1.shape == deck_specs_2.shape) and (deck_specs_1 == deck_specs_2).all()
+    cells = None
+    if symmetric:
+        cells = symmetric_cells(len(deck_specs_1),mirrors=play_mirrors)
+    units = make_units(deck_specs_1,deck_specs_2,N_games,unitgames=unitgames,cells=cells)
+    seeds = np.random.SeedSequence(seed).spawn(len(units))
+    replay_seed = seed if replayable else None
+    common_seed = seed if common else None
+    work = [(unit,deck_specs_1,deck_specs_2,N_games,rulesets,engine,s,replay_seed,lazy,common_seed) for unit, s in zip(units,seeds)]
+
+    # collect the results as they come in
+    pool, results = start_pool(run_unit,work,processes)
+    N_total = sum([len(unit) for unit in units])
+    N_done = 0
+    starttime = time.time()
+    try:
+        for unit, unitcounts in results:
+            if symmetric:
+                counts[unit[:,1],unit[:,0]] = swap_seats(unitcounts)
+            counts[unit[:,0],unit[:,1]] = unitcounts
+            N_done += len(unit)
+            if verbose:
+                report(N_done,N_total,N_games,starttime)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if verbose:
+        report(N_done,N_total,N_games,starttime,end='\n')
+
+    return counts
+
+def run_variant_unit(args):
+    """
+    Play all matchups in a single work unit under every ruleset variant.
+    """
+
+    unit, deck_specs_1, deck_specs_2, N_games, variants, seedseq, common_seed = args
+    rng = np.random.default_rng(seedseq)
+    counts = play_variants(deck_specs_1[unit[:,0]],deck_specs_2[unit[:,1]],N_games,variants,rng=rng,common_seed=common_seed)
+    return unit, counts
+
+def sweep_variants(deck_specs_1,deck_specs_2,N_games,variants,processes=None,unitgames=50000,seed=None,common=False,play_mirrors=False,verbose=True):
+    """
+    Sweep a matchup grid as in sweep, under each of a list of ruleset
+    variants (see rulesets.ruleset_params) at once, with every game dealt
+    the same libraries under every variant (see play_variants).  Returns
+    the outcome counts, of shape
+    (len(variants), len(deck_specs_1), len(deck_specs_2), 5).
+    """
+
+    if common and (seed is None):
+        raise Exception("A sweep with common random numbers needs a seed!")
+
+    deck_specs_1 = np.atleast_2d(np.asarray(deck_specs_1,dtype=np.int64))
+    deck_specs_2 = np.atleast_2d(np.asarray(deck_specs_2,dtype=np.int64))
+    counts = np.zeros((len(variants),len(deck_specs_1),len(deck_specs_2),len(outcomes)),dtype=np.int64)
+
+    # every cell costs as much as playing it once per variant
+    symmetric = (deck_specs_1.shape == deck_specs_2.shape) and (deck_specs_1 == deck_specs_2).all()
+    cells = None
+    if symmetric:
+        cells = symmetric_cells(len(deck_specs_1),mirrors=play_mirrors)
+    units = make_units(deck_specs_1,deck_specs_2,N_games,unitgames=max(unitgames//len(variants),1),cells=cells)
+    seeds = np.random.SeedSequence(seed).spawn(len(units))
+    common_seed = seed if common else None
+    work = [(unit,deck_specs_1,deck_specs_2,N_games,variants,s,common_seed) for unit, s in zip(units,seeds)]
+
+    pool, results = start_pool(run_variant_unit,work,processes)
+    N_total = sum([len(unit) for unit in units])
+    N_done = 0
+    starttime = time.time()
+    try:
+        for unit, unitcounts in results:
+            if symmetric:
+                counts[:,unit[:,1],unit[:,0]] = swap_seats(unitcounts)
+            counts[:,unit[:,0],unit[:,1]] = unitcounts
+            N_done += len(unit)
+            if verbose:
+                report(N_done,N_total,N_games*len(variants),starttime)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if verbose:
+        report(N_done,N_total,N_games*len(variants),starttime,end='\n')
+
+    return counts
+
+###################################################
+# command line interface
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Sweep Ruleset 01 over a grid of deck matchups.')
+    parser.add_argument('output',help='where to save the (N_decks, N_decks, 5) array of outcome counts (.npy)')
+    parser.add_argument('--decksize',type=int,default=40,help='number of cards in every deck')
+    parser.add_argument('--lands',type=int,default=None,help='only sweep the decks running this many lands')
+    parser.add_argument('--games',type=int,default=10000,help='games per matchup, split between both seat orders')
+    parser.add_argument('--engine',default='batch',choices=('batch','object'),help='game engine to use')
+    parser.add_argument('--processes',type=int,default=None,help='size of the process pool (default: all cores)')
+    parser.add_argument('--unitgames',type=int,default=50000,help='approximate number of games per work unit')
+    parser.add_argument('--seed',type=int,default=None,help='seed for the random number generators')
+    parser.add_argument('--replayable',action='store_true',help='give every game its own random number generator, so it can be replayed')
+    parser.add_argument('--lazy',action='store_true',help='pick cards from the libraries as they are drawn instead of shuffling them')
+    parser.add_argument('--common',action='store_true',help='shuffle every matchup with the same random keys (common random numbers)')
+    args = parser.parse_args(argv)
+
+    decks = deck_grid(args.decksize,N_land=args.lands)
+    counts = sweep(decks,decks,args.games,engine=args.engine,processes=args.processes,unitgames=args.unitgames,seed=args.seed,
+                   replayable=args.replayable,lazy=args.lazy,common=args.common)
+    np.save(args.output,counts)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+###################################################
+# imports
+
+import numpy as np
+import banedrifter as bd
+
+###################################################
+# probe player class
+
+class segment_end(Exception):
+    """
+    Raised when a ruleset asks a probe player for a card it hasn't been given
+    """
+
+class probe_player(bd.compact_player):
+    """
+    A compact player set up from zone counts, which records the cards a
+    ruleset plays and discards, and stops the ruleset as soon as it would
+    draw a card that it hasn't been told about
+    """
+
+    def __init__(self,hand_counts,untapped,library,drawn=()):
+
+        # the library starts with the cards already drawn this phase, and the
+        # rest of it is unknown
+        starting_deck = bd.deck(0,0,0,compact=True)
+        starting_deck.cards = np.concatenate((np.array(drawn,dtype=np.int8),np.full(library-len(drawn),-1,dtype=np.int8)))
+        self.N_known = len(drawn)
+        super().__init__(starting_deck,handsize=0,loglevel=bd.log_off)
+
+        self.hand.counts = list(hand_counts)
+        self.lands.counts = [[untapped, 0], [0, 0]]
+        self.actions = list()
+
+    # draw some cards, as long as they're known
+    def draw(self,N=1):
+        if (N <= self.deck.count()) & (self.deck.top + N > self.N_known):
+            raise segment_end()
+        return super().draw(N)
+
+    # discard a card, and remember it
+    def discard(self,cardname):
+        self.actions.append(('discard',cardname))
+        super().discard(cardname)
+
+    # play a card, and remember it
+    def play(self,cardname,use_altcost=False):
+        self.actions.append(('play',cardname,use_altcost))
+        super().play(cardname,use_altcost)
+
+###################################################
+# decision table class
+
+class decision_table:
+    """
+    A ruleset's decisions for a phase, compiled into a lookup table keyed on
+    zone counts and filled in by probing the ruleset the first time each key
+    is needed
+    """
+
+    def __init__(self,ruleset,max_library=2,hand_only=False):
+
+        self.ruleset = ruleset
+
+        # the ruleset can't tell libraries with at least max_library cards apart
+        self.max_library = max_library
+
+        # a ruleset that only looks at the hand (e.g., discarding) is keyed on the hand alone
+        self.hand_only = hand_only
+
+        # (hand counts, untapped lands, library size, cards drawn so far) -> (actions, finished)
+        self.table = dict()
+
+        # dense arrays of per-code discard counts, for the batch engine
+        self.arrays = dict()
+
+    # number of keys compiled so far
+    def __len__(self):
+        return len(self.table)
+
+    # the key for a phase that started from the given zone counts
+    def key(self,hand_counts,untapped,library,drawn=()):
+        if self.hand_only:
+            return (hand_counts,0,0,drawn)
+        return (hand_counts,untapped,min(library,self.max_library+len(drawn)),drawn)
+
+    # the actions the ruleset takes from the start of the phase, up to the
+    # first card it would draw after the known ones, and whether it's done
+    def lookup(self,key):
+        if key in self.table:
+            return self.table[key]
+        hand_counts, untapped, library, drawn = key
+        probe = probe_player(hand_counts,untapped,library,drawn)
+        try:
+            self.ruleset(probe,probe)
+            finished = True
+        except segment_end:
+            finished = False
+        entry = (tuple(probe.actions),finished)
+        self.table[key] = entry
+        return entry
+
+    # apply the ruleset's whole phase to a player
+    def apply(self,p1,p2):
+        hand_counts = p1.hand_counts()
+        untapped = p1.count_untapped_lands()
+        library = p1.decksize()
+        drawn = ()
+        N_done = 0
+        while True:
+            actions, finished = self.lookup(self.key(hand_counts,untapped,library,drawn))
+            for action in actions[N_done:-1]:
+                getattr(p1,action[0])(*action[1:])
+            if len(actions) > N_done:
+                before = p1.hand_counts()
+                getattr(p1,actions[-1][0])(*actions[-1][1:])
+            if finished:
+                return
+
+            # a segment only stops on a play that draws, and the next one is
+            # looked up by the cards it drew
+            after = p1.hand_counts()
+            played = bd.codes[actions[-1][1]]
+            drawn = drawn + tuple([code for code in range(3) for i in range(after[code]-before[code]+(code == played))])
+            N_done = len(actions)
+
+    # discard counts for every hand of up to max_hand cards, as a dense array
+    def discard_array(self,max_hand):
+        size = 8
+        while size < max_hand:
+            size *= 2
+        if size not in self.arrays:
+            array = np.zeros((size+1,size+1,size+1,3),dtype=np.int64)
+            for N_bane in range(size+1):
+                for N_mull in range(size+1-N_bane):
+                    for N_land in range(size+1-N_bane-N_mull):
+                        actions, finished = self.lookup(self.key((N_bane,N_mull,N_land),0,0))
+                        for action in actions:
+                            array[N_bane,N_mull,N_land,bd.codes[action[1]]] += 1
+            self.arrays[size] = array
+        return self.arrays[size]
+
+###################################################
+# compiled rulesets
+
+# every decision table built so far, by ruleset and options
+tables = dict()
+
+def get_table(ruleset,max_library=2,hand_only=False):
+    """
+    The (cached) decision table for a ruleset.
+    """
+
+    key = (ruleset,max_library,hand_only)
+    if key not in tables:
+        tables[key] = decision_table(ruleset,max_library=max_library,hand_only=hand_only)
+    return tables[key]
+
+def compiled(ruleset,max_library=2,hand_only=False):
+    """
+    A drop-in replacement for a cardplay or discard ruleset that applies
+    each phase from its decision table.  The ruleset must only look at the
+    active player's hand, untapped lands and library size (or only at the
+    hand, if hand_only is set), and must only draw cards by playing them.
+    """
+
+    table = get_table(ruleset,max_library=max_library,hand_only=hand_only)
+    return table.apply
+
+def compile_rulesets(rulesets):
+    """
+    A (cardplay, combat, discard) ruleset triple with its cardplay and
+    discard rulesets compiled; combat looks at the whole board, so it's
+    left as it is.
+    """
+
+    cardplay_ruleset, combat_ruleset, discard_ruleset = rulesets
+    return (compiled(cardplay_ruleset),combat_ruleset,compiled(discard_ruleset,hand_only=True))
+
+def check(rulesets,compiled_rulesets,decks,N_games=100,seed=0,compact=True):
+    """
+    Play the same games with the original and the compiled rulesets, and
+    return the number of games whose logged events or results differ.
+    """
+
+    N_differ = 0
+    for matchup, (deck1, deck2) in enumerate(decks):
+        for game in range(N_games):
+            results = list()
+            for which in (rulesets,compiled_rulesets):
+                game_generator = bd.game_rng(seed,matchup,game)
+                p1 = bd.player(bd.deck(*deck1,compact=compact,rng=game_generator),loglevel=bd.log_events)
+                p2 = bd.player(bd.deck(*deck2,compact=compact,rng=game_generator),loglevel=bd.log_events)
+                p1, p2, winner, loss_reason = bd.play_game(p1,p2,*which)
+                results.append((p1.events[:p1.N_events],p2.events[:p2.N_events],winner,loss_reason))
+            if results[0] != results[1]:
+                N_differ += 1
+    return N_differ
@@ -0,0 +1,31 @@
+###################################################
+# imports
+
+import numpy as np
+import sweep as sw
+import adaptive
+
+###################################################
+# symmetric grids
+
+def test_symmetric_grid_plays_each_pair_once():
+    decks = sw.deck_grid(8)[::4]
+    budget = 200*len(decks)**2
+    counts = adaptive.adaptive_sweep(decks,decks,budget=budget,batchsize=100,min_games=100,max_games=400,
+                                     rng=np.random.default_rng(2),verbose=False)
+
+    # mirrors are left empty, and every transpose is the seat-swapped cell
+    assert (counts[np.arange(len(decks)),np.arange(len(decks))] == 0).all()
+    assert (counts == sw.swap_seats(counts.transpose(1,0,2))).all()
+    rates = sw.winrate(counts,mirrors=True)
+    assert (np.diag(rates) == 0.5).all()
+
+    # and the budget only covers the pairs that were actually played
+    i, j = sw.symmetric_cells(len(decks)).T
+    assert counts[i,j].sum() <= budget
+    assert (counts[i,j].sum(axis=-1) >= 100).all()
+
+def test_other_grids_play_every_cell():
+    decks = sw.deck_grid(8)
+    counts = adaptive.adaptive_sweep(decks[:3],decks[3:7],budget=0,min_games=50,rng=np.random.default_rng(2),verbose=False)
+    assert (counts.sum(axis=-1) == 50).all()
@@ -0,0 +1,38 @@
+###################################################
+# imports
+
+import copy
+import pickle
+import numpy as np
+import pytest
+import banedrifter as bd
+import sweep as sw
+
+###################################################
+# copying players
+
+def midgame_players(compact):
+    rng = np.random.default_rng(4)
+    p1 = bd.player(bd.deck(8,8,16,compact=compact,rng=rng))
+    p2 = bd.player(bd.deck(10,6,16,compact=compact,rng=rng))
+    for turn in range(6):
+        for active, opponent in ((p1,p2),(p2,p1)):
+            if active.alive and opponent.alive:
+                bd.play_turn(active,opponent,*sw.rulesets_01)
+    return p1, p2
+
+@pytest.mark.parametrize('compact',[False,True])
+@pytest.mark.parametrize('roundtrip',[copy.deepcopy,lambda p: pickle.loads(pickle.dumps(p))])
+def test_players_survive_copying(compact,roundtrip):
+    p1, p2 = midgame_players(compact)
+    for p in (p1,p2):
+        q = roundtrip(p)
+        assert type(q) is type(p)
+        assert q.hand_counts() == p.hand_counts()
+        assert q.deck.count_codes() == p.deck.count_codes()
+        assert (q.life, q.decksize(), len(q.lands), len(q.banes), q.turncount) == (p.life, p.decksize(), len(p.lands), len(p.banes), p.turncount)
+        assert q.gamelog == p.gamelog
+
+        # the copy plays on by itself
+        q.draw(1)
+        assert q.decksize() == p.decksize() - 1
@@ -0,0 +1,90 @@
+###################################################
+# imports
+
+import json
+import time
+import multiprocessing
+import numpy as np
+import sweep as sw
+import results
+import coordinator
+
+###################################################
+# helpers
+
+def stalled_worker(path,lease_seconds):
+    """
+    A worker that leases a unit and then hangs while playing it, until it's
+    killed.
+    """
+
+    sw.run_unit = lambda args: time.sleep(600)
+    coordinator.work(path,worker='stalled',lease_seconds=lease_seconds,verbose=False)
+
+def leased_to(path,worker):
+    """
+    The ids of the units leased to a worker and not finished yet.
+    """
+
+    conn = coordinator.connect(path)
+    ids = [row[0] for row in conn.execute('SELECT id FROM units WHERE status = ? AND worker = ?',(coordinator.job_leased,worker))]
+    conn.close()
+    return ids
+
+###################################################
+# killed workers, re-leasing and merging
+
+def test_killed_worker_is_replaced_and_merge_is_idempotent(tmp_path):
+    db = str(tmp_path/'jobs.sqlite')
+    N_units = coordinator.create_jobs(db,20,decksize=10,unitgames=2000,seed=7)
+    assert N_units > 3
+
+    # a worker dies in the middle of its first unit
+    stalled = multiprocessing.get_context('fork').Process(target=stalled_worker,args=(db,1.0))
+    stalled.start()
+    start = time.time()
+    while (len(leased_to(db,'stalled')) == 0) and (time.time() - start < 30):
+        time.sleep(0.05)
+    stalled.terminate()
+    stalled.join()
+    orphaned = leased_to(db,'stalled')
+    assert len(orphaned) == 1
+
+    # its unit isn't handed out again until the lease runs out
+    conn = coordinator.connect(db)
+    assert conn.execute('SELECT COUNT(*) FROM partials WHERE unit = ?',(orphaned[0],)).fetchone()[0] == 0
+    leased = coordinator.lease(conn,'early',lease_seconds=60.0)
+    assert leased[0] != orphaned[0]
+    conn.execute('UPDATE units SET status = ?, worker = NULL, lease_until = 0 WHERE id = ?',(coordinator.job_pending,leased[0]))
+    time.sleep(1.5)
+
+    # local workers pick everything up, including the expired lease
+    coordinator.work_locally(db,processes=3,lease_seconds=60.0,verbose=False)
+    status = coordinator.progress(conn)
+    assert (status['done'] == N_units) and (status['pending'] == 0) and (status['leased'] == 0)
+    worker, attempts = conn.execute('SELECT worker, attempts FROM units WHERE id = ?',(orphaned[0],)).fetchone()
+    assert (worker != 'stalled') and (attempts == 2)
+    conn.close()
+
+    # the merged store matches a single-process sweep with the same seed
+    store = coordinator.merge(db,str(tmp_path/'merged'))
+    reference = results.sweep_to_store(str(tmp_path/'reference'),20,decksize=10,processes=1,unitgames=2000,seed=7,verbose=False)
+    assert (np.asarray(store.counts) == np.asarray(reference.counts)).all()
+    assert (np.asarray(store.status) == np.asarray(reference.status)).all()
+
+    # merging again changes nothing
+    counts = np.array(store.counts)
+    status = np.array(store.status)
+    store = coordinator.merge(db,str(tmp_path/'merged'))
+    assert (np.asarray(store.counts) == counts).all()
+    assert (np.asarray(store.status) == status).all()
+
+def test_units_cover_every_cell_once(tmp_path):
+    db = str(tmp_path/'jobs.sqlite')
+    coordinator.create_jobs(db,20,decksize=10,unitgames=2000,seed=7)
+    conn = coordinator.connect(db)
+    cells = np.concatenate([np.array(json.loads(row[0])).reshape(-1,2) for row in conn.execute('SELECT cells FROM units')])
+    conn.close()
+    expected = sw.symmetric_cells(len(sw.deck_grid(10)))
+    assert len(cells) == len(expected)
+    assert (np.unique(cells,axis=0) == np.unique(expected,axis=0)).all()
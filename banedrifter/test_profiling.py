@@ -0,0 +1,43 @@
+###################################################
+# imports
+
+import banedrifter as bd
+import rulesets as rs
+import tables as tb
+import profiling
+
+###################################################
+# helpers
+
+def profile_games(rulesets,N_games=20,seed=3):
+    """
+    The profile of a few compact games played with the given rulesets.
+    """
+
+    with profiling.profiler() as prof:
+        for game in range(N_games):
+            game_generator = bd.game_rng(seed,0,game)
+            p1 = bd.player(bd.deck(8,8,16,compact=True,rng=game_generator))
+            p2 = bd.player(bd.deck(12,4,16,compact=True,rng=game_generator))
+            bd.play_game(p1,p2,*rulesets)
+    return prof.summary()
+
+###################################################
+# decision tables built while profiling
+
+def test_table_probes_are_not_counted():
+
+    # rulesets of their own, so that their tables start out empty
+    def cardplay(p1,p2):
+        return rs.cardplay_01(p1,p2)
+    def discard(p1,p2):
+        return rs.discard_01(p1,p2)
+    rulesets = tb.compile_rulesets((cardplay,rs.combat_01,discard))
+
+    building = profile_games(rulesets)
+    assert len(tb.get_table(cardplay)) > 0
+    built = profile_games(rulesets)
+    plain = profile_games((rs.cardplay_01,rs.combat_01,rs.discard_01))
+    for summary in (built,plain):
+        assert building['cards_drawn'] == summary['cards_drawn']
+        assert building['methods']['draw']['calls'] == summary['methods']['draw']['calls']
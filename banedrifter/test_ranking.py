@@ -0,0 +1,45 @@
+###################################################
+# imports
+
+import numpy as np
+import sweep as sw
+import exact
+import results
+import ranking
+
+###################################################
+# live index against a rebuilt one
+
+def test_live_index_includes_analytic_cells(tmp_path):
+    store = results.result_store.create(str(tmp_path/'store'),decksize=8)
+    index = ranking.ranking_index(store.N_decks())
+    results.sweep_to_store(str(tmp_path/'store'),20,decksize=8,processes=1,seed=1,analytic=True,index=index,verbose=False)
+    rebuilt = ranking.ranking_index.from_store(store)
+
+    assert np.isinf(index.games).any()
+    assert (index.N_known == store.N_decks()).all()
+    assert np.allclose(index.rates,rebuilt.rates,equal_nan=True)
+    assert np.allclose(index.mean(),rebuilt.mean())
+    assert np.allclose(index.stderr(),rebuilt.stderr())
+    assert np.allclose(index.minimum,rebuilt.minimum)
+    assert (index.hawr(5) == rebuilt.hawr(5)).all()
+    assert (index.hmwr(5) == rebuilt.hmwr(5)).all()
+
+def test_tractable_cells_are_solved_exactly(tmp_path):
+    store = results.result_store.create(str(tmp_path/'store'),decksize=8)
+    index = ranking.ranking_index(store.N_decks())
+    results.sweep_to_store(str(tmp_path/'store'),20,decksize=8,processes=1,seed=1,analytic=True,exact_cards=16,index=index,verbose=False)
+    rebuilt = ranking.ranking_index.from_store(store)
+
+    status = np.asarray(store.status)
+    solved = np.argwhere(status == results.status_exact)
+    assert len(solved) > 0
+    rates = store.winrate()
+    for i, j in solved:
+        assert exact.tractable(store.decks[i],store.decks[j],max_cards=16)
+        probs = exact.solve_matchup(store.decks[i],store.decks[j])
+        assert np.isclose(rates[i,j],probs[sw.i_p1_life] + probs[sw.i_p1_mill])
+    assert (status == results.status_analytic).any()
+    assert not (status == results.status_pending).any()
+    assert np.isinf(index.games[status == results.status_exact]).all()
+    assert np.allclose(index.rates,rebuilt.rates,equal_nan=True)
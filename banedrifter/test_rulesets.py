@@ -0,0 +1,48 @@
+###################################################
+# imports
+
+import numpy as np
+import pytest
+import rulesets as rs
+import sweep as sw
+
+###################################################
+# parameterized rulesets
+
+decks = np.array([(8,8,16),(12,4,16),(0,14,16),(6,6,12)])
+
+def test_params_01_gives_ruleset_01():
+    assert rs.make_rulesets(rs.params_01) == sw.rulesets_01
+
+def test_list_discard_order_is_normalized():
+    as_list = rs.ruleset_params(True,5,3,5,[2,1,0],None)
+    as_tuple = rs.ruleset_params(True,5,3,5,(2,1,0),None)
+    assert rs.check_params(as_list) == as_tuple
+    assert rs.make_rulesets(as_list) is rs.make_rulesets(as_tuple)
+
+def test_list_discard_order_plays_like_tuple():
+    as_list = sw.play_variants(decks,decks[::-1],20,[rs.ruleset_params(True,5,3,5,[2,1,0],None)],seed=3)
+    as_tuple = sw.play_variants(decks,decks[::-1],20,[rs.ruleset_params(True,5,3,5,(2,1,0),None)],seed=3)
+    assert (as_list == as_tuple).all()
+
+@pytest.mark.parametrize('params',[rs.ruleset_params(True,5,3,7,(0,1),None),
+                                   rs.ruleset_params(True,4,3,7,None,None),
+                                   rs.ruleset_params(True,5,2,7,None,None),
+                                   rs.ruleset_params(True,5,3,7,None,-1)])
+def test_unplayable_params_are_rejected(params):
+    with pytest.raises(Exception):
+        rs.make_rulesets(params)
+
+def test_batch_variants_match_object_engine():
+    variants = [rs.params_01,rs.ruleset_params(False,6,4,6,[1,2,0],1)]
+    counts = sw.play_variants(decks,decks[::-1],10,variants,seed=5)
+    assert (counts[0] == sw.play_matchups(decks,decks[::-1],10,seed=5)).all()
+    for k, params in enumerate(variants):
+        assert (counts[k] == sw.play_matchups(decks,decks[::-1],10,rulesets=rs.make_rulesets(params),engine='object',seed=5)).all()
+
+def test_fast_forward_only_under_ruleset_01_thresholds():
+    assert rs.fast_forwardable(sw.rulesets_01)
+    assert rs.fast_forwardable(rs.make_rulesets(rs.ruleset_params(False,5,3,6,[2,1,0],1)))
+    assert not rs.fast_forwardable(rs.make_rulesets(rs.ruleset_params(True,6,3,7,None,None)))
+    assert not rs.fast_forwardable(rs.make_rulesets(rs.ruleset_params(True,5,4,7,None,None)))
+    assert not rs.fast_forwardable((rs.cardplay_01,rs.combat_01,lambda p1, p2: None))
@@ -0,0 +1,34 @@
+###################################################
+# imports
+
+import numpy as np
+import sweep as sw
+import stratified as st
+
+###################################################
+# allocation and variance reduction
+
+def test_allocation_spends_every_game():
+    weights = np.array([0.5,0.3,0.15,0.05])
+    for scales in (None,np.array([0.1,0.5,0.5,0.0])):
+        N = st.allocate(weights,100,scales=scales)
+        assert (N.sum() == 100) and (N >= 2).all()
+    assert (st.allocate(weights,100) == [50,30,15,5]).all()
+
+def test_lower_variance_than_plain_sampling():
+    rng = np.random.default_rng(0)
+    deck1, deck2 = (20,4,16), (12,12,16)
+    stratified = list()
+    stderrs = list()
+    plain = list()
+    for r in range(60):
+        _, rate, stderr = st.stratified_matchup(deck1,deck2,400,rng=rng)
+        stratified.append(rate)
+        stderrs.append(stderr)
+        counts = sw.play_matchups(np.array([deck1]),np.array([deck2]),400,rng=rng)[0]
+        plain.append(sw.winrate(counts))
+
+    # the estimates spread less, and about as much as their standard errors say
+    assert np.var(stratified) < np.var(plain)
+    assert 0.8 < np.mean(stderrs)/np.std(stratified) < 1.25
+    assert abs(np.mean(stratified) - np.mean(plain)) < 3*np.std(plain)/np.sqrt(len(plain))
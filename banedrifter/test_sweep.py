@@ -0,0 +1,24 @@
+###################################################
+# imports
+
+import numpy as np
+import sweep as sw
+
+###################################################
+# seeding the object engine
+
+deck1 = np.array([(8,8,16)])
+deck2 = np.array([(10,6,16)])
+
+def unit_counts(seedseq,engine='object'):
+    unit = np.array([[0,0]])
+    return sw.run_unit((unit,deck1,deck2,40,None,engine,seedseq,None,False,None))[1]
+
+def test_object_units_are_seeded_by_their_seed_sequence():
+    first = unit_counts(np.random.SeedSequence(1))
+    assert (first == unit_counts(np.random.SeedSequence(1))).all()
+    assert (first != unit_counts(np.random.SeedSequence(2))).any()
+
+def test_pooled_object_sweep_plays_different_games_in_every_cell():
+    counts = sw.sweep(np.repeat(deck1,8,axis=0),np.repeat(deck2,2,axis=0),20,engine='object',processes=2,unitgames=20,seed=3,verbose=False)
+    assert len(np.unique(counts.reshape(-1,len(sw.outcomes)),axis=0)) > 8